@@ -1,6 +1,7 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from backend.app.routers import (
@@ -8,8 +9,38 @@ from backend.app.routers import (
     transactions, admin, admin_dashboard, wishlist, 
     subscriptions
 )
+from backend.app.services.email_service import outbox_workers, EMAIL_WORKERS
+from backend.app.services.stripe_webhook_service import stripe_event_workers, STRIPE_EVENT_WORKERS
+from backend.app.services.subscriptions_service import renewal_scheduler, SUBSCRIPTION_SCHEDULER
+from backend.app.repositories.dashboard_summary import dashboard_summary
+from backend.app.repositories.users_repo import UsersRepo
+from backend.app.utils.passwords import password_hasher, highest_rounds
+from backend.app.utils.request_scope import UnitOfWorkMiddleware
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # build the admin dashboard aggregates once, writes keep them current from here
+    dashboard_summary.snapshot()
+    # bcrypt cost for new and upgraded password hashes, measured on this machine and
+    # never below what the stored hashes already use
+    password_hasher.calibrate(floor=highest_rounds(u.get("password") for u in UsersRepo.load_users()))
+    # background work started with the app and stopped with it
+    if EMAIL_WORKERS > 0:
+        outbox_workers.start(EMAIL_WORKERS)
+    if STRIPE_EVENT_WORKERS > 0:
+        stripe_event_workers.start(STRIPE_EVENT_WORKERS)
+    if SUBSCRIPTION_SCHEDULER:
+        renewal_scheduler.start()
+    yield
+    renewal_scheduler.stop()
+    stripe_event_workers.stop()
+    outbox_workers.stop()
+    password_hasher.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+
+# each request reads a data file at most once (see repositories/identity_map.py)
+app.add_middleware(UnitOfWorkMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
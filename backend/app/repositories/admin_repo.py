@@ -1,5 +1,5 @@
 from pathlib import Path
-import json
+from backend.app.repositories import storage
 
 DATA_DIR = Path(__file__).parent.parent / "data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -8,49 +8,46 @@ class AdminRepository:
     def __init__(self):
         self.users_path = DATA_DIR / "users.json"
         self.penalties_path = DATA_DIR / "penalties.json"
-
-        if not self.users_path.exists():
-            self.save_users([])
-        if not self.penalties_path.exists():
-            self.save_penalties([])
+        self.admins_path = DATA_DIR / "admins.json"
+        self.products_of_week_path = DATA_DIR / "products_of_week.json"
+        self.discounts_path = DATA_DIR / "discounts.json"
 
     def load_users(self):
-        with open(self.users_path, "r") as f:
-            return json.load(f)
+        return storage.collection("users", self.users_path).all()
 
     def save_users(self, data):
-        with open(self.users_path, "w") as f:
-            json.dump(data, f, indent=2)
+        storage.collection("users", self.users_path).save_all(data)
+
+    def users_lock(self):
+        return storage.collection("users", self.users_path).lock()
 
     def load_penalties(self):
-        with open(self.penalties_path, "r") as f:
-            return json.load(f)
+        return storage.collection("penalties", self.penalties_path).all()
 
     def save_penalties(self, data):
-        with open(self.penalties_path, "w") as f:
-            json.dump(data, f, indent=2)
+        storage.collection("penalties", self.penalties_path).save_all(data)
+
+    def add_penalty(self, penalty):
+        storage.collection("penalties", self.penalties_path).insert(penalty)
+
+    def penalties_lock(self):
+        return storage.collection("penalties", self.penalties_path).lock()
 
     def load_admins(self):
-        with open(self.admins_path, "r") as f:
-            return json.load(f)
+        return storage.collection("admins", self.admins_path).all()
 
     def save_admins(self, data):
-        with open(self.admins_path, "w") as f:
-            json.dump(data, f, indent=2)
+        storage.collection("admins", self.admins_path).save_all(data)
 
     def load_products_of_week(self):
-        with open(self.products_of_week_path, "r") as f:
-            return json.load(f)
+        return storage.collection("products_of_week", self.products_of_week_path).all()
 
     def save_products_of_week(self, product_ids):
-        with open(self.products_of_week_path, "w") as f:
-            json.dump(product_ids, f, indent=2)
+        storage.collection("products_of_week", self.products_of_week_path).save_all(product_ids)
 
     def load_discounts(self):
-        with open(self.discounts_path, "r") as f:
-            return json.load(f)
+        return storage.collection("discounts", self.discounts_path).all()
 
     def save_discounts(self, discounts):
         #product_id = int, discount_percent = float
-        with open(self.discounts_path, "w") as f:
-            json.dump(discounts, f, indent=2)
\ No newline at end of file
+        storage.collection("discounts", self.discounts_path).save_all(discounts)
@@ -1,77 +1,63 @@
 from pathlib import Path
-import json
 from fastapi import HTTPException
+from backend.app.repositories import storage
 
 DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "cart.json"
 
 class CartRepo:
+    @staticmethod
+    def _collection():
+        return storage.collection("carts", DATA_PATH)
+
     @staticmethod
     def load_carts():
-        if not DATA_PATH.exists():
-            with open(DATA_PATH, "w", encoding="utf-8") as f:
-                json.dump([], f)
-            return []
-
-        with open(DATA_PATH, "r", encoding="utf-8") as f:
-            try:
-                data = json.load(f)
-            except json.JSONDecodeError:
-                data = []
-        
-        return data if isinstance(data, list) else []
+        return CartRepo._collection().all()
 
     @staticmethod
     def save_carts(carts):
-        with open(DATA_PATH, "w", encoding="utf-8") as f:
-            json.dump(carts, f, indent=4)
+        CartRepo._collection().save_all(carts)
 
     @staticmethod
     def get_cart(user_id: int):
-        carts = CartRepo.load_carts()
-        return next((c for c in carts if c.get("user_id") == user_id), None)
+        return CartRepo._collection().get(user_id)
 
 
     @staticmethod
     def update_cart(user_id: int, items):
-        carts = CartRepo.load_carts()
-        
-        for cart in carts:
-            if cart.get("user_id") == user_id:
-                cart["items"] = items
-                CartRepo.save_carts(carts)
-                return
-
-        raise HTTPException(status_code=404, detail="Cart not found")
+        if CartRepo._collection().update(user_id, {"items": items}) is None:
+            raise HTTPException(status_code=404, detail="Cart not found")
 
     @staticmethod
     def add_item(user_id: int, product_id: str, quantity: int = 1):
-        cart = CartRepo.get_cart(user_id)
+        with CartRepo._collection().lock():
+            cart = CartRepo.get_cart(user_id)
 
-        if cart is None:
-            raise HTTPException(status_code=404, detail="Cart not found")
+            if cart is None:
+                raise HTTPException(status_code=404, detail="Cart not found")
 
-        items = cart["items"]
+            items = cart["items"]
 
-        existing = next((i for i in items if i.get("product_id") == product_id), None)
+            existing = next((i for i in items if i.get("product_id") == product_id), None)
 
-        if existing:
-            existing["quantity"] += quantity
-        else:
-            items.append({"product_id": product_id, "quantity": quantity})
+            if existing:
+                existing["quantity"] += quantity
+            else:
+                items.append({"product_id": product_id, "quantity": quantity})
 
-        CartRepo.update_cart(user_id, items)
+            CartRepo.update_cart(user_id, items)
 
     @staticmethod
     def remove_item(user_id: int, product_id: str):
-        cart = CartRepo.get_cart(user_id)
+        with CartRepo._collection().lock():
+            cart = CartRepo.get_cart(user_id)
         
-        if cart is None:
-            raise HTTPException(status_code=404, detail="Cart not found")
+            if cart is None:
+                raise HTTPException(status_code=404, detail="Cart not found")
 
-        items = cart["items"]
-        new_items = [i for i in items if i.get("product_id") != product_id]
+            items = cart["items"]
+            new_items = [i for i in items if i.get("product_id") != product_id]
 
-        CartRepo.update_cart(user_id, new_items)
+            CartRepo.update_cart(user_id, new_items)
 
     @staticmethod
     def clear_cart(user_id: int):
@@ -79,29 +65,29 @@ class CartRepo:
 
     @staticmethod
     def update_quantity(user_id: int, product_id: str, quantity: int):
-        cart = CartRepo.get_cart(user_id)
+        with CartRepo._collection().lock():
+            cart = CartRepo.get_cart(user_id)
 
-        items = cart["items"]
+            items = cart["items"]
 
-        found = False
+            found = False
 
-        for item in items:
-            if item.get("product_id") == product_id:
-                found = True
-                if quantity <= 0:
-                    items.remove(item)
-                else:
-                    item["quantity"] = quantity
-                break
+            for item in items:
+                if item.get("product_id") == product_id:
+                    found = True
+                    if quantity <= 0:
+                        items.remove(item)
+                    else:
+                        item["quantity"] = quantity
+                    break
                 
-        if not found:
-            raise HTTPException(status_code=404, detail="Item not found in cart")
+            if not found:
+                raise HTTPException(status_code=404, detail="Item not found in cart")
         
-        CartRepo.update_cart(user_id, items)
+            CartRepo.update_cart(user_id, items)
 
     def cart_exists(user_id: int) -> bool:
-        carts = CartRepo.load_carts()
-        return any(c.get("user_id") == user_id for c in carts)
+        return CartRepo._collection().get(user_id) is not None
     
     def item_in_cart(user_id: int, product_id: str) -> bool:
         cart = CartRepo.get_cart(user_id)
@@ -110,15 +96,15 @@ class CartRepo:
         return any(i.get("product_id") == product_id for i in items)
     
     def create_cart_for_user(user_id: int):
-        carts = CartRepo.load_carts()
+        with CartRepo._collection().lock():
+            carts = CartRepo._collection()
 
-        if any(c.get("user_id") == user_id for c in carts):
-            return
+            if carts.get(user_id) is not None:
+                return
 
-        new_cart = {
-            "user_id": user_id,
-            "items": []
-        }
+            new_cart = {
+                "user_id": user_id,
+                "items": []
+            }
 
-        carts.append(new_cart)
-        CartRepo.save_carts(carts)
+            carts.insert(new_cart)
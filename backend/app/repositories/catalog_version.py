@@ -0,0 +1,53 @@
+import os
+import threading
+from pathlib import Path
+from backend.app.repositories.file_lock import file_lock, write_atomic
+
+
+class CatalogVersion:
+    """
+    Monotonic catalog version kept in a one-line file (catalog.version) next to the
+    product data, so every worker process sees the same number.
+
+    ProductsRepo bumps it on every write. Reading it is a stat() plus, only when the
+    file was replaced, a read of a few bytes; the product files themselves are never
+    opened, which is what lets conditional GETs answer 304 cheaply.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cached = (None, None, 0)  # path, stat signature, value
+
+    @staticmethod
+    def _signature(path: Path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def current(self, path: Path) -> int:
+        signature = CatalogVersion._signature(path)
+        if signature is None:
+            return 0
+        cached_path, cached_signature, value = self._cached
+        if cached_path == path and cached_signature == signature:
+            return value
+        try:
+            value = int(path.read_text().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            value = 0
+        with self._lock:
+            self._cached = (path, signature, value)
+        return value
+
+    def bump(self, path: Path) -> int:
+        with file_lock(path):
+            value = self.current(path) + 1
+            write_atomic(path, str(value))
+            with self._lock:
+                self._cached = (path, CatalogVersion._signature(path), value)
+        return value
+
+
+catalog_version = CatalogVersion()
@@ -0,0 +1,64 @@
+from typing import List, Dict, Any
+
+SEPARATOR = "|"
+
+
+class CategoryNode:
+    """One level of a category path; rows are the catalog positions of every product at or below it."""
+
+    __slots__ = ("name", "path", "children", "rows")
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.path = path
+        self.children: Dict[str, "CategoryNode"] = {}
+        self.rows: List[int] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.rows)
+
+    def to_dict(self, depth: int = 1) -> Dict[str, Any]:
+        node = {"name": self.name, "path": self.path, "count": self.count}
+        if depth > 0:
+            node["children"] = [
+                child.to_dict(depth - 1)
+                for child in sorted(self.children.values(), key=lambda c: c.name.lower())
+            ]
+        return node
+
+
+class CategoryTree:
+    """
+    Trie over the pipe-delimited category paths of the catalog, e.g.
+    Home&Kitchen|HomeStorage&Organization|LaundryOrganization|LaundryBaskets.
+
+    Built in one pass over the products; every node keeps the rows of the products
+    filed under it (so its count), which makes browsing a dictionary walk and an
+    exact-prefix category filter a lookup instead of a scan.
+    """
+
+    def __init__(self, products: List[Dict[str, Any]]):
+        self.root = CategoryNode("", "")
+        for row, product in enumerate(products):
+            node = self.root
+            node.rows.append(row)
+            for name in CategoryTree.split(product.get("category")):
+                child = node.children.get(name)
+                if child is None:
+                    path = f"{node.path}{SEPARATOR}{name}" if node.path else name
+                    child = node.children[name] = CategoryNode(name, path)
+                child.rows.append(row)
+                node = child
+
+    @staticmethod
+    def split(path) -> List[str]:
+        return [part.strip() for part in str(path or "").split(SEPARATOR) if part.strip()]
+
+    def find(self, path: str | None) -> CategoryNode | None:
+        node = self.root
+        for name in CategoryTree.split(path):
+            node = node.children.get(name)
+            if node is None:
+                return None
+        return node
@@ -0,0 +1,147 @@
+import heapq
+import itertools
+import threading
+from typing import Callable, List, Dict, Any
+from backend.app.repositories import storage, users_repo, transactions_repo, penalties_repo
+from backend.app.repositories.transactions_repo import transaction_date
+
+RECENT_LIMIT = 10
+
+
+def penalty_date(penalty: Dict[str, Any]) -> str:
+    return penalty.get("date_issued") or ""
+
+
+class RecentBuffer:
+    """The `limit` newest records by `key`, in a min-heap so adding one costs O(log limit)."""
+
+    def __init__(self, key: Callable, identity: Callable, limit: int = RECENT_LIMIT):
+        self.key = key
+        self.identity = identity
+        self.limit = limit
+        self._heap = []
+        self._seq = itertools.count()
+
+    def clear(self) -> None:
+        self._heap = []
+
+    def add(self, record: Dict[str, Any]) -> None:
+        # later records win ties, so the newest of equally dated records are kept
+        entry = (self.key(record), next(self._seq), record)
+        if len(self._heap) < self.limit:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def replace(self, record: Dict[str, Any]) -> None:
+        """Swaps in the updated copy of a record that is in the buffer."""
+        identity = self.identity(record)
+        for i, (key, seq, held) in enumerate(self._heap):
+            if self.identity(held) == identity:
+                self._heap[i] = (key, seq, record)
+                return
+
+    def items(self) -> List[Dict[str, Any]]:
+        return [record for _, _, record in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
+
+
+class DashboardSummary:
+    """
+    Totals and most recent transactions and penalties for the admin dashboard, kept
+    up to date as records are written instead of recomputed per request.
+
+    Every write to users, transactions or penalties reaches on_write listeners with
+    the collection signature before and after it. If the summary had seen exactly the
+    "before" state the write is applied in O(log RECENT_LIMIT); anything else (a
+    rewrite of the whole collection, a delete, a write from another process) marks
+    that part stale, and the next read rebuilds it from storage once. Reads compare
+    each collection's signature with the one last seen, so they stay O(1) while
+    nothing changed behind the summary's back.
+    """
+
+    SOURCES = ("users", "transactions", "penalties")
+
+    def __init__(self, limit: int = RECENT_LIMIT):
+        self._lock = threading.Lock()
+        self._counts = {name: 0 for name in DashboardSummary.SOURCES}
+        self._recent = {
+            "transactions": RecentBuffer(transaction_date, lambda t: t.get("transaction_id") or t.get("id"), limit),
+            "penalties": RecentBuffer(penalty_date, lambda p: p.get("id"), limit),
+        }
+        self._seen: Dict[str, tuple] = {}
+        for name in DashboardSummary.SOURCES:
+            storage.on_write(name, lambda collection, *args, name=name: self._on_write(name, collection, *args))
+
+    @staticmethod
+    def _collection(name: str):
+        paths = {
+            "users": users_repo.DATA_PATH,
+            "transactions": transactions_repo.DATA_PATH,
+            "penalties": penalties_repo.DATA_PATH,
+        }
+        return storage.collection(name, paths[name])
+
+    def _on_write(self, name: str, collection, op: str, record, before, after) -> None:
+        with self._lock:
+            if self._seen.pop(name, None) != (collection.source, before):
+                return
+            if op == "add":
+                self._counts[name] += 1
+                if name in self._recent:
+                    self._recent[name].add(record)
+            elif op == "add_many":
+                self._counts[name] += len(record)
+                if name in self._recent:
+                    for added in record:
+                        self._recent[name].add(added)
+            elif op == "update":
+                if name in self._recent:
+                    self._recent[name].replace(record)
+            else:
+                return
+            self._seen[name] = (collection.source, after)
+
+    def _rebuild(self, name: str, collection) -> None:
+        # read outside the summary lock (writers call in holding the collection lock);
+        # only trust the result if nothing was written while reading (reading a missing
+        # file creates it, hence the second try)
+        for _ in range(2):
+            signature = collection.signature()
+            records = collection.all()
+            unchanged = collection.signature() == signature
+            if unchanged:
+                break
+
+        with self._lock:
+            self._counts[name] = len(records)
+            if name in self._recent:
+                buffer = self._recent[name]
+                buffer.clear()
+                for record in records:
+                    buffer.add(record)
+            if unchanged:
+                self._seen[name] = (collection.source, signature)
+            else:
+                self._seen.pop(name, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        for name in DashboardSummary.SOURCES:
+            collection = DashboardSummary._collection(name)
+            if self._seen.get(name) != (collection.source, collection.signature()):
+                self._rebuild(name, collection)
+
+        with self._lock:
+            return {
+                "totals": {
+                    "total_users": self._counts["users"],
+                    "total_transactions": self._counts["transactions"],
+                    "total_penalties": self._counts["penalties"]
+                },
+                "latest": {
+                    "recent_transactions": self._recent["transactions"].items(),
+                    "recent_penalties": self._recent["penalties"].items()
+                }
+            }
+
+
+dashboard_summary = DashboardSummary()
@@ -0,0 +1,95 @@
+import time
+import uuid
+from pathlib import Path
+from typing import List, Dict, Any
+from backend.app.repositories import storage
+
+DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "email_outbox.json"
+DEAD_LETTER_PATH = DATA_PATH.with_name("email_dead_letters.json")
+
+
+class EmailOutboxRepo:
+    """
+    Durable queue of emails waiting to be sent.
+
+    A message is "pending" until a worker claims it, which marks it "sending" with a
+    lease; a worker that dies mid-send leaves the lease to run out and the message is
+    claimed again. Sent messages are deleted, messages that keep failing are moved to
+    the dead letter store.
+
+    The outbox is a journaled collection, so enqueueing, claiming a batch and
+    finishing a message each append to the journal instead of rewriting the file.
+    """
+
+    def _collection():
+        return storage.collection("email_outbox", DATA_PATH)
+
+    def _dead_letters():
+        return storage.collection("email_dead_letters", DEAD_LETTER_PATH)
+
+    def enqueue(to_email: str, subject: str, html_body: str) -> Dict[str, Any]:
+        now = time.time()
+        message = {
+            "id": str(uuid.uuid4()),
+            "to_email": to_email,
+            "subject": subject,
+            "html_body": html_body,
+            "status": "pending",
+            "attempts": 0,
+            "created_at": now,
+            "next_attempt_at": now,
+            "lease_until": None,
+            "last_error": None
+        }
+        return EmailOutboxRepo._collection().insert(message)
+
+    def claim_due(limit: int, lease_seconds: float, now: float | None = None) -> List[Dict[str, Any]]:
+        """Marks up to `limit` due messages as sending with one write and returns them."""
+        now = time.time() if now is None else now
+        outbox = EmailOutboxRepo._collection()
+        with outbox.lock():
+            due = [m for m in outbox.find("status", "pending") if m["next_attempt_at"] <= now]
+            due += [m for m in outbox.find("status", "sending") if (m.get("lease_until") or 0) <= now]
+            due.sort(key=lambda m: m["next_attempt_at"])
+            lease = {"status": "sending", "lease_until": now + lease_seconds}
+            claimed = outbox.update_many({m["id"]: lease for m in due[:limit]})
+            claimed.sort(key=lambda m: m["next_attempt_at"])
+            return [dict(m) for m in claimed]
+
+    def mark_sent(message_id: str) -> None:
+        EmailOutboxRepo._collection().delete(message_id)
+
+    def retry_later(message_id: str, attempts: int, next_attempt_at: float, error: str) -> None:
+        EmailOutboxRepo._collection().update(message_id, {
+            "status": "pending",
+            "attempts": attempts,
+            "next_attempt_at": next_attempt_at,
+            "lease_until": None,
+            "last_error": error
+        })
+
+    def dead_letter(message: Dict[str, Any], error: str) -> None:
+        outbox = EmailOutboxRepo._collection()
+        with outbox.lock():
+            EmailOutboxRepo._dead_letters().insert({
+                **message,
+                "status": "dead",
+                "last_error": error,
+                "failed_at": time.time()
+            })
+            outbox.delete(message["id"])
+
+    def load_dead_letters() -> List[Dict[str, Any]]:
+        return EmailOutboxRepo._dead_letters().all()
+
+    def stats(now: float | None = None) -> Dict[str, Any]:
+        now = time.time() if now is None else now
+        messages = EmailOutboxRepo._collection().all()
+        pending = [m for m in messages if m["status"] == "pending"]
+        return {
+            "pending": len(pending),
+            "sending": sum(1 for m in messages if m["status"] == "sending"),
+            "retrying": sum(1 for m in pending if m["attempts"] > 0),
+            "dead_letters": len(EmailOutboxRepo.load_dead_letters()),
+            "oldest_pending_age_seconds": round(now - min(m["created_at"] for m in pending), 1) if pending else None
+        }
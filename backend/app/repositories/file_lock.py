@@ -0,0 +1,75 @@
+import os
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+
+class FileLock:
+    """
+    Exclusive lock on <path>.lock shared by every worker process (fcntl.flock).
+
+    Re-entrant within a thread, so a repository method can hold the lock around a
+    read-modify-write and still call collection operations that take it themselves.
+    """
+
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, path: Path):
+        self.lock_path = Path(f"{path}.lock")
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    @classmethod
+    def for_path(cls, path: Path) -> "FileLock":
+        key = str(Path(path).resolve())
+        with cls._registry_lock:
+            lock = cls._registry.get(key)
+            if lock is None:
+                lock = cls._registry[key] = cls(Path(path))
+            return lock
+
+    def __enter__(self) -> "FileLock":
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.lock_path, "a")
+                if fcntl is not None:
+                    fcntl.flock(self._file, fcntl.LOCK_EX)
+            except Exception:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+
+def file_lock(path: Path) -> FileLock:
+    return FileLock.for_path(path)
+
+
+def write_atomic(path: Path, text: str) -> None:
+    """Writes text to a temp file next to path, fsyncs it, then swaps it in with os.replace."""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
@@ -0,0 +1,55 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Dict, Any
+
+# source -> (signature, records) for the unit of work in progress, None outside one
+_current: ContextVar[Dict[Any, tuple] | None] = ContextVar("identity_map", default=None)
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Scope (one HTTP request) in which each JSON collection is parsed at most once.
+
+    Inside it JsonCollection keeps the parsed records of a file for as long as its
+    signature is unchanged, so a service that checks a cart, reads it and updates it
+    reads cart.json once. Reads still stat the file, so a write by another process is
+    picked up at once. The records in the map are never changed in place: callers get
+    detached copies, and writes build new records and a new list. Writes stay
+    write-through (they happen under the file's cross-process lock and must reach disk
+    before it is released) and put what they saved in the map, so reading after a
+    write needs no re-read either. The map is thrown away when the scope ends, also
+    when it ends in an error.
+    """
+    token = _current.set({})
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def active() -> bool:
+    return _current.get() is not None
+
+
+def detach(value):
+    """Deep copy of JSON data (dicts, lists and scalars), so the map's records stay as saved."""
+    if isinstance(value, dict):
+        return {k: detach(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [detach(v) for v in value]
+    return value
+
+
+def lookup(source, signature) -> List[Any] | None:
+    entries = _current.get()
+    if entries is None or signature is None:
+        return None
+    entry = entries.get(source)
+    return entry[1] if entry is not None and entry[0] == signature else None
+
+
+def remember(source, signature, records: List[Any]) -> None:
+    entries = _current.get()
+    if entries is not None and signature is not None:
+        entries[source] = (signature, records)
@@ -1,11 +1,9 @@
-import json
 from pathlib import Path
+from backend.app.repositories import storage
 
 DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "penalties.json"
 
 class PenaltiesRepo:
     
     def get_penalties_by_user(user_id: int):
-        with open(DATA_PATH) as file:
-            penalties = json.load(file)
-        return [p for p in penalties if p["user_id"] == user_id]
\ No newline at end of file
+        return storage.collection("penalties", DATA_PATH).find("user_id", user_id)
@@ -0,0 +1,119 @@
+import threading
+from bisect import bisect_right
+from pathlib import Path
+from typing import List, Dict, Any
+from backend.app.repositories import storage
+from backend.app.repositories.search_index import SearchIndex
+from backend.app.repositories.product_columns import ProductColumns
+from backend.app.repositories.category_tree import CategoryTree
+
+
+class ProductCatalog:
+    """
+    In-process copy of the product catalog, parsed once and indexed by product_id.
+
+    The catalog is only re-read when the storage backend reports a change (file
+    mtime/size for JSON, the collection version for sqlite), so repeated reads
+    (cart adds, item views, checkout lookups) cost a stat() instead of a json.load.
+
+    The full-text search index is built from the first search after a load and then
+    kept up to date as the catalog's own writes replace the product list. The NumPy
+    columns used by filters, the category tree and the product_id ordering used for
+    pages are likewise built on first use after every change.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.source = None
+        self.signature = None
+        self.products: List[Dict[str, Any]] = []
+        self.index: Dict[str, Dict[str, Any]] = {}
+        self._search: SearchIndex | None = None
+        self._columns: ProductColumns | None = None
+        self._ordered: List[str] | None = None
+        self._categories: CategoryTree | None = None
+
+    def refresh(self, path: Path) -> "ProductCatalog":
+        products = storage.collection("products", path)
+        # raises FileNotFoundError for a missing JSON catalog, same as opening it did
+        signature = products.signature()
+        with self._lock:
+            if products.source != self.source or signature != self.signature:
+                self._set(products.source, products.all(), signature)
+        return self
+
+    def replace(self, path: Path, items: List[Dict[str, Any]]) -> None:
+        """Adopts a product list that was just saved, without re-reading it."""
+        products = storage.collection("products", path)
+        with self._lock:
+            search = self._search if products.source == self.source else None
+            if search is not None:
+                search.update(self.products, items)
+            self._set(products.source, items, products.signature())
+            self._search = search
+
+    def _set(self, source, products: List[Dict[str, Any]], signature) -> None:
+        index = {}
+        for p in products:
+            # first occurrence wins, matching the old next(...) linear scans
+            index.setdefault(p.get("product_id"), p)
+        self.source = source
+        self.signature = signature
+        self.products = products
+        self.index = index
+        self._search = None
+        self._columns = None
+        self._ordered = None
+        self._categories = None
+
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            if self._search is None:
+                self._search = SearchIndex(self.products)
+            return self._search.search(query)
+
+    def categories(self) -> CategoryTree:
+        with self._lock:
+            if self._categories is None:
+                self._categories = CategoryTree(self.products)
+            return self._categories
+
+    def filter(self, category_path: str | None = None, **criteria) -> List[Dict[str, Any]]:
+        # columns and tree node from the same product list, or rows would index the wrong products
+        with self._lock:
+            if self._columns is None:
+                self._columns = ProductColumns(self.products)
+            columns = self._columns
+            if category_path:
+                node = self.categories().find(category_path)
+                if node is None:
+                    return []
+                criteria["rows"] = node.rows
+        return columns.filter(**criteria)
+
+    def page(self, cursor: str | None, limit: int):
+        """
+        Keyset page: up to `limit` products ordered by product_id, starting after
+        `cursor` (the last product_id of the previous page). Returns the page and the
+        cursor for the next one, or None when this was the last page.
+        """
+        with self._lock:
+            if self._ordered is None:
+                self._ordered = sorted(k for k in self.index if isinstance(k, str))
+            ordered, index = self._ordered, self.index
+        start = bisect_right(ordered, cursor) if cursor else 0
+        keys = ordered[start:start + limit]
+        next_cursor = keys[-1] if keys and start + limit < len(ordered) else None
+        return [index[k] for k in keys], next_cursor
+
+    def get(self, product_id: str) -> Dict[str, Any] | None:
+        return self.index.get(product_id)
+
+    def __contains__(self, product_id: str) -> bool:
+        return product_id in self.index
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+
+catalog = ProductCatalog()
@@ -0,0 +1,78 @@
+from typing import List, Dict, Any
+import numpy as np
+
+
+def parse_number(value) -> float:
+    """"$1,299.00" -> 1299.0, anything unparsable -> nan."""
+    try:
+        return float(str(value).replace("$", "").replace(",", "").replace("|", "").strip())
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class ProductColumns:
+    """
+    Numeric product fields parsed once into NumPy arrays, one slot per product in
+    catalog order.
+
+    Prices, ratings and counts are stored as strings in the dataset; here they are
+    parsed a single time (nan when missing or malformed) so every filter request is a
+    handful of vectorized comparisons combined into one boolean mask. Categories are
+    stored as codes into the list of distinct category paths, so a category match is
+    checked once per distinct path rather than once per product.
+    """
+
+    def __init__(self, products: List[Dict[str, Any]]):
+        self.products = products
+        self.price = np.array([parse_number(p.get("discounted_price")) for p in products], dtype=np.float64)
+        self.rating = np.array([parse_number(p.get("rating")) for p in products], dtype=np.float64)
+        self.rating_count = np.array([parse_number(p.get("rating_count")) for p in products], dtype=np.float64)
+        self.quantity = np.array([parse_number(p.get("quantity")) for p in products], dtype=np.float64)
+
+        codes = {}
+        self.category_code = np.array(
+            [codes.setdefault((p.get("category") or "").lower(), len(codes)) for p in products],
+            dtype=np.int32
+        )
+        self.categories = list(codes)
+        # a list, not a fixed-width str array, which would pad every name to the longest one
+        self.names = [(p.get("product_name") or "").lower() for p in products]
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def mask(self, keyword=None, min_price=None, max_price=None, category=None, rating=None,
+             min_rating_count=None, in_stock=None, rows=None) -> np.ndarray:
+        if rows is None:
+            mask = np.ones(len(self), dtype=bool)
+        else:
+            # start from a preselected set of rows, e.g. one category tree node
+            mask = np.zeros(len(self), dtype=bool)
+            mask[np.asarray(rows, dtype=np.intp)] = True
+
+        # nan never compares true, so products with unparsable values drop out of range filters
+        if min_price is not None:
+            mask &= self.price >= min_price
+        if max_price is not None:
+            mask &= self.price <= max_price
+        if rating is not None:
+            mask &= self.rating >= rating
+        if min_rating_count is not None:
+            mask &= self.rating_count >= min_rating_count
+        if in_stock:
+            mask &= self.quantity > 0
+        if category:
+            c = category.lower()
+            matching = np.array([c in name for name in self.categories], dtype=bool)
+            mask &= matching[self.category_code]
+        if keyword:
+            # substring match, only over the rows the cheaper filters kept
+            k = keyword.lower()
+            names = self.names
+            rows = np.flatnonzero(mask)
+            mask[rows] = np.fromiter((k in names[i] for i in rows), dtype=bool, count=len(rows))
+
+        return mask
+
+    def filter(self, **criteria) -> List[Dict[str, Any]]:
+        return [self.products[i] for i in np.flatnonzero(self.mask(**criteria))]
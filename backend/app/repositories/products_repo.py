@@ -1,7 +1,9 @@
-import json, os
 from pathlib import Path
 from typing import List, Dict, Any
 from fastapi import HTTPException
+from backend.app.repositories import storage
+from backend.app.repositories.product_catalog import catalog
+from backend.app.repositories.catalog_version import catalog_version
 
 DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "amazon_cad.json"
 POW_PATH = DATA_PATH.with_name("products_of_week.json")
@@ -10,33 +12,59 @@ DISCOUNTS_PATH = DATA_PATH.with_name("discounts.json")
 class ProductsRepo:
     
     def load_products():
-        with open(DATA_PATH, "r", encoding="utf-8", errors="replace") as f:
-            return json.load(f)
+        return list(catalog.refresh(DATA_PATH).products)
         
     def get_products(product_id: str):
-        return next((p for p in ProductsRepo.load_products() if p["product_id"] == product_id), None)
+        return catalog.refresh(DATA_PATH).get(product_id)
+
+    def get_many(product_ids) -> Dict[str, Dict[str, Any]]:
+        """Looks up several products against one catalog snapshot; unknown ids are left out."""
+        current = catalog.refresh(DATA_PATH)
+        found = {}
+        for product_id in product_ids:
+            product = current.get(product_id)
+            if product is not None:
+                found[product_id] = product
+        return found
     
     # Functions from FastAPI Demo
     @staticmethod
     def load_all():
-        with open(DATA_PATH, "r", encoding="utf-8", errors="replace") as f:
-            return json.load(f)
+        """A new list of the catalog's own product dicts: replace an entry with a changed copy, never edit it."""
+        return list(catalog.refresh(DATA_PATH).products)
 
     def save_all(items: List[Dict[str, Any]]) -> None:
-        tmp = DATA_PATH.with_suffix(".tmp")
-        with tmp.open("w", encoding="utf-8") as f:
-            json.dump(items, f, ensure_ascii=False, indent=2)
-        os.replace(tmp, DATA_PATH)
+        storage.collection("products", DATA_PATH).save_all(items)
+        catalog.replace(DATA_PATH, list(items))
+        ProductsRepo.bump_version()
+
+    def version() -> int:
+        """Catalog version, bumped after every ProductsRepo write; used for ETags."""
+        return catalog_version.current(DATA_PATH.with_name("catalog.version"))
+
+    def bump_version() -> int:
+        return catalog_version.bump(DATA_PATH.with_name("catalog.version"))
+
+    def get_category(path: str | None):
+        """Node of the category tree at path (the root for None), or None if no product is filed there."""
+        return catalog.refresh(DATA_PATH).categories().find(path)
+
+    def iter_products():
+        """Iterates the current catalog without copying it; later saves swap in a new list and do not disturb it."""
+        return iter(catalog.refresh(DATA_PATH).products)
+
+    def page(cursor: str | None, limit: int):
+        return catalog.refresh(DATA_PATH).page(cursor, limit)
+
+    def lock():
+        """Cross-process lock to hold around a load_all() ... save_all() sequence."""
+        return storage.collection("products", DATA_PATH).lock()
 
     def product_exists(product_id: str) -> bool:
-        items = ProductsRepo.load_all()
-        return any(item["product_id"] == product_id for item in items)
+        return product_id in catalog.refresh(DATA_PATH)
     
     def search_products(keyword: str):
-        products = ProductsRepo.load_products()
-        k = keyword.lower()
-
-        results = [p for p in products if k in p.get("product_name", "").lower()]
+        results = catalog.refresh(DATA_PATH).search(keyword)
 
         if not results:
             raise HTTPException(status_code=404, detail=f"Looks like we don\'t have {keyword}, sorry :(")
@@ -44,58 +72,14 @@ class ProductsRepo:
         return results
     
     def filter_products(keyword=None, min_price=None, max_price=None,
-                    category=None, rating=None):
-
-        products = ProductsRepo.load_products()
-        results = products
-
-        if keyword:
-            k = keyword.lower()
-            results = [
-                p for p in results
-                if k in p.get("product_name", "").lower()
-            ]
-
-        def parse_price(price_str):
-            try:
-                return float(price_str.replace("$", "").replace(",", ""))
-            except:
-                return None
-            
-        def parse_rating(r):
-            try:
-                cleaned = str(r).replace("|", "").strip()
-                if cleaned == "":
-                    return None
-                return float(cleaned)
-            except:
-                return None
-
-        if min_price is not None:
-            results = [
-                p for p in results
-                if parse_price(p.get("discounted_price")) is not None and
-                    parse_price(p.get("discounted_price")) >= min_price
-            ]
-
-        if max_price is not None:
-            results = [
-                p for p in results
-                if parse_price(p.get("discounted_price")) is not None and
-                    parse_price(p.get("discounted_price")) <= max_price
-            ]
-
-        if category:
-            c = category.lower()
-            results = [
-                p for p in results
-                if c in p.get("category", "").lower()
-            ]
-
-        if rating is not None:
-            results = [
-                p for p in results
-                if parse_rating(p.get("rating")) is not None and parse_rating(p.get("rating")) >= rating]
+                    category=None, rating=None, min_rating_count=None, in_stock=None,
+                    category_path=None):
+
+        results = catalog.refresh(DATA_PATH).filter(
+            keyword=keyword, min_price=min_price, max_price=max_price, category=category,
+            rating=rating, min_rating_count=min_rating_count, in_stock=in_stock,
+            category_path=category_path
+        )
 
         if not results:
             raise HTTPException(status_code=404, detail="No products found matching the filter criteria.")
@@ -103,46 +87,24 @@ class ProductsRepo:
         return results
 
     #product of the week
-    @staticmethod
-    def _ensure_pow_exists():
-        if not POW_PATH.exists():
-            with open(POW_PATH, "w", encoding="utf-8") as f:
-                json.dump([], f, indent=2)
     #allows for mutiple products of the week
     @staticmethod
     def set_products_of_the_week(product_ids: List[str]) -> None:
-        ProductsRepo._ensure_pow_exists()
-        tmp = POW_PATH.with_suffix(".tmp")
-        with tmp.open("w", encoding="utf-8") as f:
-            json.dump(product_ids, f, indent=2)
-        os.replace(tmp, POW_PATH)
+        storage.collection("products_of_week", POW_PATH).save_all(product_ids)
+        ProductsRepo.bump_version()
 
     @staticmethod
     def get_products_of_the_week() -> List[str]:
-        ProductsRepo._ensure_pow_exists()
-        with open(POW_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return storage.collection("products_of_week", POW_PATH).all()
 
     #discounts
-    @staticmethod
-    def _ensure_discounts_exists():
-        if not DISCOUNTS_PATH.exists():
-            with open(DISCOUNTS_PATH, "w", encoding="utf-8") as f:
-                json.dump([], f, indent=2)
-
     @staticmethod
     def load_discounts() -> List[Dict[str, Any]]:
-        ProductsRepo._ensure_discounts_exists()
-        with open(DISCOUNTS_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return storage.collection("discounts", DISCOUNTS_PATH).all()
 
     @staticmethod
     def save_discounts(discounts: List[Dict[str, Any]]) -> None:
-        ProductsRepo._ensure_discounts_exists()
-        tmp = DISCOUNTS_PATH.with_suffix(".tmp")
-        with tmp.open("w", encoding="utf-8") as f:
-            json.dump(discounts, f, indent=2)
-        os.replace(tmp, DISCOUNTS_PATH)
+        storage.collection("discounts", DISCOUNTS_PATH).save_all(discounts)
 
     @staticmethod
     def apply_discount(product_id: str, discount_percent: float) -> bool:
@@ -150,57 +112,59 @@ class ProductsRepo:
         applies a discount to product in the main products file, updates the product's 'discount_percentage' and 'discounted_price' fields.
         returns true if product found and updated, false otherwise.
         """
-        items = ProductsRepo.load_all()
-        updated = False
-        for it in items:
-            if it.get("product_id") == product_id:
-                #try to use the number given as actual_price
-                try:
-                    actual_price = float(it.get("actual_price", "0").replace("$", "").replace(",", ""))
-                except Exception:
-                    actual_price = 0.0
-                #discount must be within 0-100
-                disprice = max(0.0, min(float(discount_percent), 100.0))
-                discounted_price = actual_price * (1.0 - disprice / 100.0)
-                #store values as strings to match existing schema
-                it["discount_percentage"] = str(disprice)
-                #2 decimal place, if original had $, if not add it back
-                formatted = f"{discounted_price:.2f}"
-                if isinstance(it.get("actual_price", ""), str) and it.get("actual_price", "").strip().startswith("$"):
-                    it["discounted_price"] = f"${formatted}"
-                else:
-                    it["discounted_price"] = formatted
-                updated = True
-                break
-
-        if updated:
-            ProductsRepo.save_all(items)
-            #also record in small discounts index for quick lookup
-            discounts = ProductsRepo.load_discounts()
-            #remove any existing entry for product_id
-            discounts = [d for d in discounts if d.get("product_id") != product_id]
-            discounts.append({"product_id": product_id, "discount_percent": float(discount_percent)})
-            ProductsRepo.save_discounts(discounts)
-        return updated
+        with ProductsRepo.lock():
+            items = ProductsRepo.load_all()
+            updated = False
+            for idx, it in enumerate(items):
+                if it.get("product_id") == product_id:
+                    #copy, the catalog keeps serving the old product until the save succeeds
+                    it = items[idx] = dict(it)
+                    #try to use the number given as actual_price
+                    try:
+                        actual_price = float(it.get("actual_price", "0").replace("$", "").replace(",", ""))
+                    except Exception:
+                        actual_price = 0.0
+                    #discount must be within 0-100
+                    disprice = max(0.0, min(float(discount_percent), 100.0))
+                    discounted_price = actual_price * (1.0 - disprice / 100.0)
+                    #store values as strings to match existing schema
+                    it["discount_percentage"] = str(disprice)
+                    #2 decimal place, if original had $, if not add it back
+                    formatted = f"{discounted_price:.2f}"
+                    if isinstance(it.get("actual_price", ""), str) and it.get("actual_price", "").strip().startswith("$"):
+                        it["discounted_price"] = f"${formatted}"
+                    else:
+                        it["discounted_price"] = formatted
+                    updated = True
+                    break
+
+            if updated:
+                ProductsRepo.save_all(items)
+                #also record in small discounts index for quick lookup
+                discounts = ProductsRepo.load_discounts()
+                #remove any existing entry for product_id
+                discounts = [d for d in discounts if d.get("product_id") != product_id]
+                discounts.append({"product_id": product_id, "discount_percent": float(discount_percent)})
+                ProductsRepo.save_discounts(discounts)
+            return updated
 
     #remove discount
     @staticmethod
     def remove_discount(product_id: str) -> bool:
-        items = ProductsRepo.load_all()
-        updated = False
-        for it in items:
-            if it.get("product_id") == product_id:
-                it.pop("discount_percentage", None)
-                it.pop("discounted_price", None)
-                updated = True
-                break
-        if updated:
-            ProductsRepo.save_all(items)
-            discounts = ProductsRepo.load_discounts()
-            discounts = [d for d in discounts if d.get("product_id") != product_id]
-            ProductsRepo.save_discounts(discounts)
-        return updated
-        return updated
+        with ProductsRepo.lock():
+            items = ProductsRepo.load_all()
+            updated = False
+            for idx, it in enumerate(items):
+                if it.get("product_id") == product_id:
+                    items[idx] = {k: v for k, v in it.items() if k not in ("discount_percentage", "discounted_price")}
+                    updated = True
+                    break
+            if updated:
+                ProductsRepo.save_all(items)
+                discounts = ProductsRepo.load_discounts()
+                discounts = [d for d in discounts if d.get("product_id") != product_id]
+                ProductsRepo.save_discounts(discounts)
+            return updated
 
     @staticmethod
     def update_stock(product_id: str, quantity_change: int) -> bool:
@@ -209,25 +173,36 @@ class ProductsRepo:
         quantity_change: positive number to add stock, negative to subtract (on purchase).
         Returns True if product found and updated, False otherwise.
         """
-        items = ProductsRepo.load_all()
-        updated = False
+        return product_id in ProductsRepo.adjust_stock({product_id: quantity_change})
+
+    def adjust_stock(deltas: Dict[str, int]) -> Dict[str, int]:
+        """
+        Applies {product_id: quantity_change} to the stock of several products in one
+        load and one save of the catalog, so an order costs one rewrite however many
+        lines it has. Stock never goes below 0. Returns the new stock of every product
+        found; unknown ids are skipped and nothing is written if none was found.
+        """
+        deltas = {str(product_id): change for product_id, change in deltas.items() if change}
+        if not deltas:
+            return {}
+
+        with ProductsRepo.lock():
+            items = ProductsRepo.load_all()
+            updated = {}
 
-        for it in items:
-            if it.get("product_id") == product_id:
-                current_stock = int(it.get("quantity", 0)) if it.get("quantity") else 0
-                new_stock = max(0, current_stock + quantity_change)
-                it["quantity"] = new_stock
-                updated = True
-                break
+            for idx, it in enumerate(items):
+                product_id = it.get("product_id")
+                if product_id in deltas:
+                    current_stock = int(it.get("quantity", 0)) if it.get("quantity") else 0
+                    items[idx] = {**it, "quantity": max(0, current_stock + deltas[product_id])}
+                    updated[product_id] = items[idx]["quantity"]
+                    if len(updated) == len(deltas):
+                        break
 
-        if updated:
-            ProductsRepo.save_all(items)
+            if updated:
+                ProductsRepo.save_all(items)
 
-        return updated
+            return updated
 
 def get_product_by_id(item_id: int):
-    products = ProductsRepo.load_products()
-    for product in products:
-        if product["product_id"] == item_id:
-            return product
-    return None
\ No newline at end of file
+    return catalog.refresh(DATA_PATH).get(item_id)
\ No newline at end of file
@@ -0,0 +1,33 @@
+from pathlib import Path
+from typing import List, Dict, Any
+from backend.app.repositories import storage
+
+DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "stock_reservations.json"
+
+
+class ReservationsRepo:
+    """
+    Stock holds of payments in progress, one record per transaction:
+    {"id": transaction_id, "quantities": {product_id: quantity}, "expires_at": epoch seconds}.
+
+    Shared by every worker process, so whichever worker finalizes or cancels a payment
+    drops the hold the creating worker took. Callers doing check-then-hold take lock().
+    """
+
+    def _collection():
+        return storage.collection("stock_reservations", DATA_PATH)
+
+    def lock():
+        return ReservationsRepo._collection().lock()
+
+    def load() -> List[Dict[str, Any]]:
+        return ReservationsRepo._collection().all()
+
+    def add(key: str, quantities: Dict[str, int], expires_at: float) -> Dict[str, Any]:
+        return ReservationsRepo._collection().insert({"id": key, "quantities": dict(quantities), "expires_at": expires_at})
+
+    def delete(key: str) -> bool:
+        return ReservationsRepo._collection().delete(key)
+
+    def delete_many(keys) -> int:
+        return ReservationsRepo._collection().delete_many(keys)
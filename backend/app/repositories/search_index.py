@@ -0,0 +1,117 @@
+import re
+from bisect import bisect_left, insort
+from typing import List, Dict, Any, Iterable
+
+SEARCH_FIELDS = ("product_name", "category", "about_product")
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text) -> List[str]:
+    return TOKEN_RE.findall(str(text).lower()) if text else []
+
+
+class SearchIndex:
+    """
+    Inverted index over product_name, category and about_product.
+
+    Every product gets an integer document id (catalog order) and each token maps to
+    the set of documents containing it. A multi-word query intersects the posting sets,
+    smallest first, so a selective word keeps the work small however big the catalog
+    is. The last word of a query also matches as a prefix ("iph" finds "iPhone"),
+    which keeps search-as-you-type working.
+    """
+
+    def __init__(self, products: Iterable[Dict[str, Any]] = ()):
+        self.postings: Dict[str, set] = {}
+        self.vocabulary: List[str] = []  # sorted, for prefix lookups
+        self.docs: Dict[int, Dict[str, Any]] = {}
+        self.terms: Dict[int, set] = {}
+        self._doc_of: Dict[int, int] = {}  # id(product dict) -> document id
+        self._next = 0
+        for product in products:
+            self.add(product)
+
+    def add(self, product: Dict[str, Any], doc: int | None = None) -> None:
+        if doc is None:
+            doc = self._next
+            self._next += 1
+        terms = {t for field in SEARCH_FIELDS for t in tokenize(product.get(field))}
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = set()
+                insort(self.vocabulary, term)
+            posting.add(doc)
+        self.docs[doc] = product
+        self.terms[doc] = terms
+        self._doc_of[id(product)] = doc
+
+    def remove(self, product: Dict[str, Any]) -> int | None:
+        doc = self._doc_of.pop(id(product), None)
+        if doc is None:
+            return None
+        for term in self.terms.pop(doc):
+            posting = self.postings[term]
+            posting.discard(doc)
+            if not posting:
+                del self.postings[term]
+                del self.vocabulary[bisect_left(self.vocabulary, term)]
+        del self.docs[doc]
+        return doc
+
+    def update(self, old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> None:
+        """
+        Applies the difference between two versions of the product list.
+
+        Products are compared by identity: repository writes keep the dicts they did
+        not touch, so only created, replaced and deleted products are re-tokenized.
+        A replaced product keeps its document id and therefore its place in results.
+        """
+        new_objects = {id(p) for p in new}
+        freed = {}
+        for product in old:
+            if id(product) not in new_objects:
+                doc = self.remove(product)
+                if doc is not None:
+                    freed.setdefault(product.get("product_id"), doc)
+        for product in new:
+            if id(product) not in self._doc_of:
+                self.add(product, freed.pop(product.get("product_id"), None))
+
+    def _prefix_matches(self, prefix: str) -> set:
+        matches = set()
+        for i in range(bisect_left(self.vocabulary, prefix), len(self.vocabulary)):
+            term = self.vocabulary[i]
+            if not term.startswith(prefix):
+                break
+            matches |= self.postings[term]
+        return matches
+
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        words = tokenize(query)
+        if not words:
+            return []
+
+        *exact, last = words
+        postings = []
+        for word in exact:
+            posting = self.postings.get(word)
+            if not posting:
+                return []
+            postings.append(posting)
+
+        postings.sort(key=len)
+        if postings and len(postings[0]) < 64:
+            # a selective word: check candidates directly instead of expanding the prefix
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates &= posting
+            candidates = {d for d in candidates if any(t.startswith(last) for t in self.terms[d])}
+        else:
+            candidates = self._prefix_matches(last)
+            for posting in postings:
+                candidates &= posting
+                if not candidates:
+                    break
+
+        return [self.docs[d] for d in sorted(candidates)]
@@ -0,0 +1,611 @@
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Iterator, List, Dict, Any
+from backend.app.repositories.file_lock import file_lock, write_atomic
+from backend.app.repositories import identity_map
+from backend.app.repositories.transactions_journal import RecordJournal, journal
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+
+# "json" keeps everything in the files under backend/app/data, "sqlite" uses one WAL-mode database
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json").lower()
+SQLITE_PATH = Path(os.getenv("SQLITE_PATH", str(DATA_DIR / "stacksquad.db")))
+
+# key: field used for point lookups (None for plain lists such as products_of_week)
+# indexes: extra fields that get an index in sqlite
+# file: default JSON file, used by the migration command
+# journal: on the json backend, kept as snapshot plus append-only journal (see RecordJournal)
+COLLECTIONS = {
+    "users": {"file": "users.json", "key": "user_id", "indexes": ["email", "username"], "indent": 4},
+    "carts": {"file": "cart.json", "key": "user_id", "indexes": [], "indent": 4},
+    "wishlists": {"file": "wishlists.json", "key": "user_id", "indexes": [], "indent": 2},
+    "transactions": {"file": "transactions.json", "key": "transaction_id", "indexes": ["user_id", "payment_intent_id", "id"], "indent": 4, "journal": True},
+    "subscriptions": {"file": "subscriptions.json", "key": "id", "indexes": ["user_id", "product_id"], "indent": 4},
+    "penalties": {"file": "penalties.json", "key": "id", "indexes": ["user_id"], "indent": 2},
+    "admins": {"file": "admins.json", "key": "user_id", "indexes": [], "indent": 2},
+    "products": {"file": "amazon_cad.json", "key": "product_id", "indexes": [], "indent": 2, "ensure_ascii": False, "create": False},
+    "products_of_week": {"file": "products_of_week.json", "key": None, "indexes": [], "indent": 2},
+    "discounts": {"file": "discounts.json", "key": "product_id", "indexes": [], "indent": 2},
+    "email_outbox": {"file": "email_outbox.json", "key": "id", "indexes": ["status"], "indent": 2, "journal": True},
+    "email_dead_letters": {"file": "email_dead_letters.json", "key": "id", "indexes": [], "indent": 2},
+    "stripe_events": {"file": "stripe_events.json", "key": "id", "indexes": ["status"], "indent": 2, "journal": True},
+    "sequences": {"file": "sequences.json", "key": "name", "indexes": [], "indent": 2},
+    "stock_reservations": {"file": "stock_reservations.json", "key": "id", "indexes": [], "indent": 2, "journal": True},
+}
+
+# write listeners per collection name, called as listener(collection, op, record, before, after)
+# with op "add", "add_many" (record is then the list added), "update", "update_many" (the list
+# updated) or "reset" and the collection signature before and after the write
+_listeners: Dict[str, List[Callable]] = {}
+
+
+def on_write(name: str, listener: Callable) -> None:
+    """Registers a listener that sees every write to the named collection, on any backend."""
+    _listeners.setdefault(name, []).append(listener)
+
+
+def _notify(collection, op: str, record, before, after) -> None:
+    for listener in _listeners.get(collection.name, ()):
+        listener(collection, op, record, before, after)
+
+
+class JsonCollection:
+    """
+    A collection stored as one JSON list in a file; every write is a read-modify-write
+    done under the file's cross-process lock and saved with temp file + os.replace,
+    so readers never see a half-written file and concurrent workers never lose updates.
+    """
+
+    def __init__(self, name: str, path: Path):
+        self.name = name
+        self.path = path
+        self.source = path
+        self.config = COLLECTIONS[name]
+        self.key = self.config["key"]
+
+    def lock(self):
+        """Hold this around a multi-step read-modify-write done outside the collection."""
+        return file_lock(self.path)
+
+    def signature(self):
+        if not self.path.exists():
+            if not self.config.get("create", True):
+                raise FileNotFoundError(self.path)
+            return None
+        # writes replace the file, so the inode changes even when mtime and size do not
+        stat = os.stat(self.path)
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _records(self) -> List[Any]:
+        """The parsed records; inside a request they are shared with the identity map, so never change them."""
+        if not self.path.exists() and self.config.get("create", True):
+            self.save_all([])
+            return []
+        signature = self.signature()
+        records = identity_map.lookup(self.source, signature)
+        if records is None:
+            records = self._read()
+            identity_map.remember(self.source, signature, records)
+        return records
+
+    @staticmethod
+    def _handout(value):
+        # outside a request nothing else holds the parsed records
+        return identity_map.detach(value) if identity_map.active() else value
+
+    def all(self) -> List[Any]:
+        return self._handout(self._records())
+
+    def iterate(self) -> Iterator[Any]:
+        """The records one at a time, each handed out as all() would, without copying the whole list."""
+        for record in self._records():
+            yield self._handout(record)
+
+    def _read(self) -> List[Any]:
+        with open(self.path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        if not text.strip():
+            return []
+        data = json.loads(text)
+        return data if isinstance(data, list) else []
+
+    def _save(self, records: List[Any]) -> None:
+        text = json.dumps(records, indent=self.config["indent"], ensure_ascii=self.config.get("ensure_ascii", True), default=str)
+        write_atomic(self.path, text)
+        identity_map.remember(self.source, self.signature(), records)
+
+    def save_all(self, records: List[Any]) -> None:
+        with self.lock():
+            before = self.signature()
+            # the caller keeps its list, the identity map gets its own copy
+            self._save(self._handout(records))
+            _notify(self, "reset", None, before, self.signature())
+
+    def get(self, key) -> Dict[str, Any] | None:
+        if key is None:
+            return None
+        return self._handout(next((r for r in self._records() if r.get(self.key) == key), None))
+
+    def find(self, field: str, value) -> List[Dict[str, Any]]:
+        return self._handout([r for r in self._records() if r.get(field) == value])
+
+    def find_one(self, field: str, value) -> Dict[str, Any] | None:
+        return self._handout(next((r for r in self._records() if r.get(field) == value), None))
+
+    def insert(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        with self.lock():
+            before = self.signature()
+            self._save(self._records() + [self._handout(record)])
+            _notify(self, "add", record, before, self.signature())
+        return record
+
+    def insert_many(self, new_records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Adds all records with one write."""
+        if not new_records:
+            return new_records
+        with self.lock():
+            before = self.signature()
+            self._save(self._records() + self._handout(new_records))
+            _notify(self, "add_many", new_records, before, self.signature())
+        return new_records
+
+    def update(self, key, updates: Dict[str, Any]) -> Dict[str, Any] | None:
+        with self.lock():
+            before = self.signature()
+            records = list(self._records())
+            for i, r in enumerate(records):
+                if r.get(self.key) == key:
+                    # a new record in a new list: the saved one may be shared with the identity map
+                    records[i] = {**r, **self._handout(updates)}
+                    self._save(records)
+                    _notify(self, "update", records[i], before, self.signature())
+                    return self._handout(records[i])
+        return None
+
+    def update_many(self, changes: Dict[Any, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Applies {key: updates} with one write; returns the updated records."""
+        if not changes:
+            return []
+        with self.lock():
+            before = self.signature()
+            records = list(self._records())
+            updated = []
+            for i, r in enumerate(records):
+                if r.get(self.key) in changes:
+                    records[i] = {**r, **self._handout(changes[r.get(self.key)])}
+                    updated.append(records[i])
+            if updated:
+                self._save(records)
+                _notify(self, "update_many", updated, before, self.signature())
+        return self._handout(updated)
+
+    def delete(self, key) -> bool:
+        with self.lock():
+            before = self.signature()
+            records = self._records()
+            remaining = [r for r in records if r.get(self.key) != key]
+            self._save(remaining)
+            _notify(self, "reset", None, before, self.signature())
+        return len(remaining) < len(records)
+
+    def delete_many(self, keys) -> int:
+        """Removes the records with these keys with one write; returns how many were removed."""
+        keys = set(keys)
+        with self.lock():
+            before = self.signature()
+            records = self._records()
+            remaining = [r for r in records if r.get(self.key) not in keys]
+            if len(remaining) < len(records):
+                self._save(remaining)
+                _notify(self, "reset", None, before, self.signature())
+        return len(records) - len(remaining)
+
+    def compact(self) -> None:
+        pass
+
+
+# one in-memory replay per journaled collection, shared by every JournalCollection on it
+_journals: Dict[str, RecordJournal] = {"transactions": journal}
+
+
+def _journal(name: str) -> RecordJournal:
+    if name not in _journals:
+        config = COLLECTIONS[name]
+        _journals[name] = RecordJournal(config["key"], config["indexes"], config["indent"])
+    return _journals[name]
+
+
+class JournalCollection(JsonCollection):
+    """A collection kept as snapshot plus append-only journal, replayed into memory (see RecordJournal)."""
+
+    def __init__(self, name: str, path: Path):
+        super().__init__(name, path)
+        self.journal = _journal(name)
+
+    def signature(self):
+        state = self.journal.refresh(self.path)
+        return (state.signature, state.offset)
+
+    def _records(self) -> List[Any]:
+        return self.journal.refresh(self.path).records
+
+    @staticmethod
+    def _handout(value):
+        # the replayed records are shared by every caller in the process, request or not
+        return identity_map.detach(value)
+
+    def save_all(self, records: List[Any]) -> None:
+        with self.lock():
+            before = self.signature()
+            self.journal.write_snapshot(self.path, records)
+            _notify(self, "reset", None, before, self.signature())
+
+    def get(self, key) -> Dict[str, Any] | None:
+        return self._handout(self.journal.refresh(self.path).get(key))
+
+    def find(self, field: str, value) -> List[Dict[str, Any]]:
+        found = self.journal.refresh(self.path).find(field, value)
+        return super().find(field, value) if found is None else self._handout(found)
+
+    def find_one(self, field: str, value) -> Dict[str, Any] | None:
+        found = self.journal.refresh(self.path).find(field, value)
+        if found is None:
+            return super().find_one(field, value)
+        return self._handout(found[0]) if found else None
+
+    def insert(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        with self.lock():
+            before = self.signature()
+            self.journal.append(self.path, {"op": "add", "record": record})
+            _notify(self, "add", record, before, self.signature())
+        return record
+
+    def insert_many(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not records:
+            return records
+        with self.lock():
+            before = self.signature()
+            self.journal.append_many(self.path, [{"op": "add", "record": record} for record in records])
+            _notify(self, "add_many", records, before, self.signature())
+        return records
+
+    def update(self, key, updates: Dict[str, Any]) -> Dict[str, Any] | None:
+        with self.lock():
+            if self.journal.refresh(self.path).get(key) is None:
+                return None
+            before = self.signature()
+            self.journal.append(self.path, {"op": "update", self.key: key, "updates": updates})
+            record = self._handout(self.journal.get(key))
+            _notify(self, "update", record, before, self.signature())
+            return record
+
+    def update_many(self, changes: Dict[Any, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        with self.lock():
+            current = self.journal.refresh(self.path)
+            keys = [key for key in changes if current.get(key) is not None]
+            if not keys:
+                return []
+            before = self.signature()
+            self.journal.append_many(self.path, [{"op": "update", self.key: key, "updates": changes[key]} for key in keys])
+            updated = self._handout([self.journal.get(key) for key in keys])
+            _notify(self, "update_many", updated, before, self.signature())
+            return updated
+
+    def delete(self, key) -> bool:
+        return self.delete_many([key]) > 0
+
+    def delete_many(self, keys) -> int:
+        with self.lock():
+            current = self.journal.refresh(self.path)
+            keys = [key for key in dict.fromkeys(keys) if current.get(key) is not None]
+            if not keys:
+                return 0
+            before = self.signature()
+            self.journal.append(self.path, {"op": "delete", "keys": keys})
+            _notify(self, "reset", None, before, self.signature())
+            return len(keys)
+
+    def compact(self) -> None:
+        self.journal.compact(self.path)
+
+
+class JsonBackend:
+    name = "json"
+
+    def collection(self, name: str, path: Path):
+        if COLLECTIONS[name].get("journal"):
+            return JournalCollection(name, path)
+        return JsonCollection(name, path)
+
+
+class SqliteCollection:
+    """
+    A collection stored as rows of one sqlite table: the record as JSON text plus
+    indexed copies of its key and lookup fields. Rows keep insertion order (rowid),
+    so all() returns the same list the JSON file would hold.
+    """
+
+    def __init__(self, backend: "SqliteBackend", name: str):
+        self.backend = backend
+        self.name = name
+        self.source = (backend.db_path, name)
+        self.config = COLLECTIONS[name]
+        self.key = self.config["key"]
+        self.columns = ["pk"] + self.config["indexes"]
+
+    def _row(self, record):
+        data = json.dumps(record, ensure_ascii=False, default=str)
+        pk = record.get(self.key) if self.key and isinstance(record, dict) else None
+        values = [pk] + [record.get(f) if isinstance(record, dict) else None for f in self.config["indexes"]]
+        return data, values
+
+    def _column(self, field: str):
+        if field == self.key:
+            return "pk"
+        if field in self.config["indexes"]:
+            return field
+        return None
+
+    def lock(self):
+        """Hold this around a multi-step read-modify-write done outside the collection."""
+        return file_lock(Path(f"{self.backend.db_path}.{self.name}"))
+
+    def _bump(self, conn) -> int:
+        """Bumps the collection version inside the write transaction and returns the version before it."""
+        before = conn.execute("SELECT version FROM meta WHERE name = ?", (self.name,)).fetchone()[0]
+        conn.execute("UPDATE meta SET version = version + 1 WHERE name = ?", (self.name,))
+        return before
+
+    def signature(self):
+        row = self.backend.connect().execute("SELECT version FROM meta WHERE name = ?", (self.name,)).fetchone()
+        return row[0]
+
+    def all(self) -> List[Any]:
+        rows = self.backend.connect().execute(f'SELECT data FROM "{self.name}" ORDER BY rowid').fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def iterate(self, batch: int = 500) -> Iterator[Any]:
+        """The records in rowid order, `batch` rows per query, so no cursor stays open between threads."""
+        last = 0
+        while True:
+            rows = self.backend.connect().execute(
+                f'SELECT rowid, data FROM "{self.name}" WHERE rowid > ? ORDER BY rowid LIMIT ?', (last, batch)
+            ).fetchall()
+            for _, data in rows:
+                yield json.loads(data)
+            if len(rows) < batch:
+                return
+            last = rows[-1][0]
+
+    def save_all(self, records: List[Any]) -> None:
+        # positional diff against what is stored, so only changed rows are written
+        conn = self.backend.connect()
+        cols = ", ".join(self.columns)
+        assign = ", ".join(f"{c} = ?" for c in self.columns)
+        marks = ", ".join("?" for _ in self.columns)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            existing = conn.execute(f'SELECT rowid, data FROM "{self.name}" ORDER BY rowid').fetchall()
+            changed = False
+            for i, record in enumerate(records):
+                data, values = self._row(record)
+                if i < len(existing):
+                    rowid, old = existing[i]
+                    if old != data:
+                        conn.execute(f'UPDATE "{self.name}" SET data = ?, {assign} WHERE rowid = ?', [data, *values, rowid])
+                        changed = True
+                else:
+                    conn.execute(f'INSERT INTO "{self.name}" (data, {cols}) VALUES (?, {marks})', [data, *values])
+                    changed = True
+            if len(existing) > len(records):
+                conn.execute(f'DELETE FROM "{self.name}" WHERE rowid >= ?', (existing[len(records)][0],))
+                changed = True
+            if changed:
+                before = self._bump(conn)
+        if changed:
+            _notify(self, "reset", None, before, before + 1)
+
+    def get(self, key) -> Dict[str, Any] | None:
+        if key is None:
+            return None
+        return self.find_one(self.key, key)
+
+    def find(self, field: str, value) -> List[Dict[str, Any]]:
+        column = self._column(field)
+        if column is None:
+            return [r for r in self.all() if r.get(field) == value]
+        rows = self.backend.connect().execute(
+            f'SELECT data FROM "{self.name}" WHERE {column} = ? ORDER BY rowid', (value,)
+        ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def find_one(self, field: str, value) -> Dict[str, Any] | None:
+        column = self._column(field)
+        if column is None:
+            return next((r for r in self.all() if r.get(field) == value), None)
+        row = self.backend.connect().execute(
+            f'SELECT data FROM "{self.name}" WHERE {column} = ? ORDER BY rowid LIMIT 1', (value,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def insert(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        data, values = self._row(record)
+        conn = self.backend.connect()
+        marks = ", ".join("?" for _ in self.columns)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(f'INSERT INTO "{self.name}" (data, {", ".join(self.columns)}) VALUES (?, {marks})', [data, *values])
+            before = self._bump(conn)
+        _notify(self, "add", record, before, before + 1)
+        return record
+
+    def insert_many(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not records:
+            return records
+        rows = [self._row(record) for record in records]
+        conn = self.backend.connect()
+        marks = ", ".join("?" for _ in self.columns)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                f'INSERT INTO "{self.name}" (data, {", ".join(self.columns)}) VALUES (?, {marks})',
+                [[data, *values] for data, values in rows]
+            )
+            before = self._bump(conn)
+        _notify(self, "add_many", records, before, before + 1)
+        return records
+
+    def update(self, key, updates: Dict[str, Any]) -> Dict[str, Any] | None:
+        conn = self.backend.connect()
+        assign = ", ".join(f"{c} = ?" for c in self.columns)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                f'SELECT rowid, data FROM "{self.name}" WHERE pk = ? ORDER BY rowid LIMIT 1', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            record = json.loads(row[1])
+            record.update(updates)
+            data, values = self._row(record)
+            conn.execute(f'UPDATE "{self.name}" SET data = ?, {assign} WHERE rowid = ?', [data, *values, row[0]])
+            before = self._bump(conn)
+        record = json.loads(data)
+        _notify(self, "update", record, before, before + 1)
+        return record
+
+    def update_many(self, changes: Dict[Any, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Applies {key: updates} in one transaction; returns the updated records."""
+        if not changes:
+            return []
+        conn = self.backend.connect()
+        assign = ", ".join(f"{c} = ?" for c in self.columns)
+        marks = ", ".join("?" for _ in changes)
+        updated = []
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                f'SELECT rowid, data FROM "{self.name}" WHERE pk IN ({marks}) ORDER BY rowid', list(changes)
+            ).fetchall()
+            for rowid, old in rows:
+                record = json.loads(old)
+                record.update(changes[record.get(self.key)])
+                data, values = self._row(record)
+                conn.execute(f'UPDATE "{self.name}" SET data = ?, {assign} WHERE rowid = ?', [data, *values, rowid])
+                updated.append(record)
+            if updated:
+                before = self._bump(conn)
+        if updated:
+            _notify(self, "update_many", updated, before, before + 1)
+        return updated
+
+    def delete(self, key) -> bool:
+        conn = self.backend.connect()
+        with conn:
+            deleted = conn.execute(f'DELETE FROM "{self.name}" WHERE pk = ?', (key,)).rowcount
+            if deleted:
+                before = self._bump(conn)
+        if deleted:
+            _notify(self, "reset", None, before, before + 1)
+        return deleted > 0
+
+    def delete_many(self, keys) -> int:
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return 0
+        conn = self.backend.connect()
+        marks = ", ".join("?" for _ in keys)
+        with conn:
+            deleted = conn.execute(f'DELETE FROM "{self.name}" WHERE pk IN ({marks})', keys).rowcount
+            if deleted:
+                before = self._bump(conn)
+        if deleted:
+            _notify(self, "reset", None, before, before + 1)
+        return deleted
+
+    def compact(self) -> None:
+        pass
+
+
+class SqliteBackend:
+    name = "sqlite"
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._tables = set()
+
+    def connect(self) -> sqlite3.Connection:
+        # sqlite connections are not shared between threads, so each worker thread gets its own
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _ensure_table(self, name: str) -> None:
+        if name in self._tables:
+            return
+        with self._lock:
+            config = COLLECTIONS[name]
+            conn = self.connect()
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+                conn.execute("INSERT OR IGNORE INTO meta (name, version) VALUES (?, 0)", (name,))
+                # untyped columns so 5 and "5" stay distinct, like they are in the JSON files
+                extra = "".join(f", {f}" for f in config["indexes"])
+                conn.execute(f'CREATE TABLE IF NOT EXISTS "{name}" (data TEXT NOT NULL, pk{extra})')
+                conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}_pk" ON "{name}" (pk)')
+                for f in config["indexes"]:
+                    conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}_{f}" ON "{name}" ({f})')
+            self._tables.add(name)
+
+    def collection(self, name: str, path: Path = None):
+        self._ensure_table(name)
+        return SqliteCollection(self, name)
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if STORAGE_BACKEND == "sqlite":
+            _backend = SqliteBackend(SQLITE_PATH)
+        elif STORAGE_BACKEND == "json":
+            _backend = JsonBackend()
+        else:
+            raise RuntimeError(f"Unknown STORAGE_BACKEND '{STORAGE_BACKEND}', expected 'json' or 'sqlite'")
+    return _backend
+
+
+def set_backend(backend) -> None:
+    global _backend
+    _backend = backend
+
+
+def collection(name: str, path: Path):
+    """Returns the named collection on the configured backend; path is the JSON file it lives in."""
+    return get_backend().collection(name, path)
+
+
+def migrate_json_to_sqlite(data_dir: Path = DATA_DIR, db_path: Path = SQLITE_PATH) -> Dict[str, int]:
+    """Imports every JSON data file found in data_dir into the sqlite database at db_path."""
+    source = JsonBackend()
+    target = SqliteBackend(db_path)
+    counts = {}
+    for name, config in COLLECTIONS.items():
+        path = Path(data_dir) / config["file"]
+        if not path.exists():
+            continue
+        records = source.collection(name, path).all()
+        target.collection(name).save_all(records)
+        counts[name] = len(records)
+    return counts
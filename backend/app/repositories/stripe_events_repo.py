@@ -0,0 +1,105 @@
+import time
+from pathlib import Path
+from typing import List, Dict, Any
+from backend.app.repositories import storage
+
+DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "stripe_events.json"
+
+
+class StripeEventsRepo:
+    """
+    Inbox of verified Stripe webhook events, keyed by the Stripe event id.
+
+    The webhook only records the event and answers; a worker claims "pending" events
+    with a lease, fulfils them and marks them "processed". Processed events are kept
+    (until pruned) so a redelivery of the same event id is recognised and dropped.
+    Events that keep failing end up "failed" for an admin to look at.
+
+    The inbox is a journaled collection with a hash index on the event id, so
+    recording an event is a dict lookup plus one appended line, and a processed
+    event keeps only what deduplication needs, not the payload.
+    """
+
+    def _collection():
+        return storage.collection("stripe_events", DATA_PATH)
+
+    def record(event: Dict[str, Any]) -> bool:
+        """Stores a new event; returns False if an event with this id was already received."""
+        now = time.time()
+        events = StripeEventsRepo._collection()
+        with events.lock():
+            if events.get(event["id"]) is not None:
+                return False
+            events.insert({
+                "id": event["id"],
+                "type": event.get("type"),
+                "event": event,
+                "status": "pending",
+                "attempts": 0,
+                "received_at": now,
+                "next_attempt_at": now,
+                "lease_until": None,
+                "last_error": None,
+                "processed_at": None
+            })
+        return True
+
+    def get(event_id: str) -> Dict[str, Any] | None:
+        return StripeEventsRepo._collection().get(event_id)
+
+    def claim_due(limit: int, lease_seconds: float, now: float | None = None) -> List[Dict[str, Any]]:
+        """Marks up to `limit` due events as processing, oldest first, and returns them."""
+        now = time.time() if now is None else now
+        events = StripeEventsRepo._collection()
+        with events.lock():
+            due = [e for e in events.find("status", "pending") if e["next_attempt_at"] <= now]
+            due += [e for e in events.find("status", "processing") if (e.get("lease_until") or 0) <= now]
+            due.sort(key=lambda e: e["received_at"])
+            lease = {"status": "processing", "lease_until": now + lease_seconds}
+            claimed = events.update_many({e["id"]: lease for e in due[:limit]})
+            claimed.sort(key=lambda e: e["received_at"])
+            return [dict(e) for e in claimed]
+
+    def mark_processed(event_id: str) -> None:
+        StripeEventsRepo._collection().update(event_id, {
+            "status": "processed",
+            "event": None,
+            "lease_until": None,
+            "processed_at": time.time()
+        })
+
+    def retry_later(event_id: str, attempts: int, next_attempt_at: float, error: str) -> None:
+        StripeEventsRepo._collection().update(event_id, {
+            "status": "pending",
+            "attempts": attempts,
+            "next_attempt_at": next_attempt_at,
+            "lease_until": None,
+            "last_error": error
+        })
+
+    def mark_failed(event_id: str, attempts: int, error: str) -> None:
+        StripeEventsRepo._collection().update(event_id, {
+            "status": "failed",
+            "attempts": attempts,
+            "lease_until": None,
+            "last_error": error
+        })
+
+    def prune(older_than: float) -> int:
+        """Drops processed events handled before `older_than`; returns how many were dropped."""
+        events = StripeEventsRepo._collection()
+        with events.lock():
+            expired = [e["id"] for e in events.find("status", "processed") if (e.get("processed_at") or 0) < older_than]
+            return events.delete_many(expired)
+
+    def stats(now: float | None = None) -> Dict[str, Any]:
+        now = time.time() if now is None else now
+        events = StripeEventsRepo._collection()
+        pending = events.find("status", "pending")
+        return {
+            "pending": len(pending),
+            "processing": len(events.find("status", "processing")),
+            "processed": len(events.find("status", "processed")),
+            "failed": len(events.find("status", "failed")),
+            "oldest_pending_age_seconds": round(now - min(e["received_at"] for e in pending), 1) if pending else None
+        }
@@ -1,49 +1,74 @@
-import json
 from pathlib import Path
 from datetime import datetime, timedelta
+from backend.app.repositories import storage
 
 DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "subscriptions.json"
 
 class SubscriptionsRepo:
 
+    def _collection():
+        return storage.collection("subscriptions", DATA_PATH)
+
     def load_subscriptions():
-        with open(DATA_PATH, "r") as f:
-            return json.load(f)
+        return SubscriptionsRepo._collection().all()
         
     def save_subscriptions(subs):
-        with open(DATA_PATH, "w") as f:
-            json.dump(subs, f, indent=4)
+        SubscriptionsRepo._collection().save_all(subs)
+
+    def lock():
+        return SubscriptionsRepo._collection().lock()
+
+    def signature():
+        """Changes whenever subscriptions are written, by any worker process."""
+        return SubscriptionsRepo._collection().signature()
 
     def add_subscription(data):
-        subs = SubscriptionsRepo.load_subscriptions()
-        new_id = max([s["id"] for s in subs], default=0) + 1
+        with SubscriptionsRepo._collection().lock():
+            subs = SubscriptionsRepo.load_subscriptions()
+            new_id = max([s["id"] for s in subs], default=0) + 1
 
-        subscription = {
-            "id": new_id,
-            "user_id": data.user_id,
-            "product_id": data.item_id,
-            "interval_days": data.interval_days,
-            "next_renewal": (datetime.now() + timedelta(days=data.interval_days)).isoformat(),
-            "active": True
-        }
+            subscription = {
+                "id": new_id,
+                "user_id": data.user_id,
+                "product_id": data.item_id,
+                "interval_days": data.interval_days,
+                "next_renewal": (datetime.now() + timedelta(days=data.interval_days)).isoformat(),
+                "active": True
+            }
 
-        subs.append(subscription)
-        SubscriptionsRepo.save_subscriptions(subs)
+            SubscriptionsRepo._collection().insert(subscription)
 
-        return subscription
+            return subscription
     
-    def get_active_subscriptions():
+    def get_active_subscriptions(now: datetime | None = None):
         subs = SubscriptionsRepo.load_subscriptions()
-        now = datetime.now()
+        now = now or datetime.now()
+
+        return [s for s in subs if s.get("active") and datetime.fromisoformat(s["next_renewal"]) <= now]
 
-        return [s for s in subs if s["activate"] and datetime.fromisoformat(s["next_renewal"]) <= now]
-    
     def update_subscription(subscription):
-        subs = SubscriptionsRepo.load()
+        SubscriptionsRepo._collection().update(subscription["id"], subscription)
 
-        for i, s in enumerate(subs):
-            if s["id"] == subscription["id"]:
-                subs[i] = subscription
-                break
+    def renew_due(ids, now: datetime, charge):
+        """
+        Moves the active subscriptions among `ids` that are due at `now` to their next
+        renewal (now + interval_days) with one write and returns them.
 
-        SubscriptionsRepo.save_subscriptions(subs)
\ No newline at end of file
+        charge(due) is called first, under the same lock, and nothing is saved if it
+        raises; a subscription another worker already renewed is no longer due here,
+        so each renewal is charged once.
+        """
+        collection = SubscriptionsRepo._collection()
+        wanted = set(ids)
+        with collection.lock():
+            subs = collection.all()
+            due = [
+                s for s in subs
+                if s["id"] in wanted and s.get("active") and datetime.fromisoformat(s["next_renewal"]) <= now
+            ]
+            if due:
+                charge(due)
+                for s in due:
+                    s["next_renewal"] = (now + timedelta(days=s["interval_days"])).isoformat()
+                collection.save_all(subs)
+            return due
@@ -0,0 +1,241 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import List, Dict, Any
+from backend.app.repositories.file_lock import file_lock, write_atomic
+
+COMPACT_EVERY = int(os.getenv("TRANSACTIONS_COMPACT_EVERY", "500"))
+
+logger = logging.getLogger(__name__)
+
+# secondary hash indexes kept next to the transaction_id one: legacy checkout id, Stripe intent, owner
+INDEXED_FIELDS = ("id", "payment_intent_id", "user_id")
+
+
+class RecordJournal:
+    """
+    A JSON collection stored as a snapshot plus an append-only journal
+    (<name>.journal next to <name>.json, one JSON entry per line). Used for
+    transactions.json and for the queues that take a write per message or event.
+
+    Adding, updating or deleting records appends a single line, so write cost stays the
+    same as the collection grows. Snapshot and journal are replayed into memory once;
+    later reads only pick up journal lines appended since the last read. When the
+    journal passes COMPACT_EVERY lines it is folded into the snapshot on a
+    background thread.
+
+    The in-memory copy keeps a hash index on the key field and on `indexed_fields`,
+    updated as every entry is applied, so point lookups never scan the list.
+
+    Appends and compaction hold the snapshot's cross-process file lock, and a reader
+    that sees the files change re-reads them under the same lock, so a worker never
+    replays a journal that another worker is halfway through compacting. Compaction
+    stages the new snapshot and sets the journal aside before swapping the snapshot in,
+    so one interrupted by a crash is finished by the next reader: the journal is never
+    replayed over a snapshot that already holds it.
+    """
+
+    def __init__(self, key: str = "transaction_id", indexed_fields=INDEXED_FIELDS, indent: int = 4):
+        self._lock = threading.RLock()
+        self._compacting = False
+        self.key = key
+        self.indexed_fields = tuple(indexed_fields)
+        self.indent = indent
+        self.path = None
+        self.signature = None
+        self.offset = 0
+        self.pending = 0
+        self.records: List[Dict[str, Any]] = []
+        self._by_id: Dict[Any, Dict[str, Any]] = {}
+        self._indexes: Dict[str, Dict[Any, List[Dict[str, Any]]]] = {field: {} for field in self.indexed_fields}
+
+    @staticmethod
+    def journal_path(path: Path) -> Path:
+        return path.with_suffix(".journal")
+
+    @staticmethod
+    def staged_path(path: Path) -> Path:
+        return path.with_name(path.name + ".next")
+
+    @staticmethod
+    def folded_path(path: Path) -> Path:
+        journal = RecordJournal.journal_path(path)
+        return journal.with_name(journal.name + ".folded")
+
+    @staticmethod
+    def _signature(path: Path):
+        if not path.exists():
+            return None
+        stat = os.stat(path)
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _state(self, path: Path):
+        journal = RecordJournal.journal_path(path)
+        size = journal.stat().st_size if journal.exists() else 0
+        return size, RecordJournal._signature(path)
+
+    def refresh(self, path: Path) -> "RecordJournal":
+        size, signature = self._state(path)
+        if path == self.path and signature == self.signature and size == self.offset:
+            return self
+
+        with file_lock(path), self._lock:
+            self._recover(path)
+            size, signature = self._state(path)
+            # a new snapshot or a shorter journal means someone compacted: start over
+            if path != self.path or signature != self.signature or size < self.offset:
+                self._load(path, signature)
+            if size > self.offset:
+                self._replay(RecordJournal.journal_path(path))
+        return self
+
+    def get(self, key) -> Dict[str, Any] | None:
+        return self._by_id.get(key)
+
+    def find(self, field: str, value) -> List[Dict[str, Any]] | None:
+        """Records whose `field` equals value, in insertion order; None if the field is not indexed."""
+        if field == self.key:
+            record = self._by_id.get(value)
+            return [record] if record is not None else []
+        index = self._indexes.get(field)
+        if index is None:
+            return None
+        return list(index.get(value, ()))
+
+    def append(self, path: Path, entry: Dict[str, Any]) -> None:
+        self.append_many(path, [entry])
+
+    def append_many(self, path: Path, entries: List[Dict[str, Any]]) -> None:
+        """Appends the entries as consecutive lines with a single write."""
+        lines = "".join(json.dumps(entry, default=str) + "\n" for entry in entries)
+        with file_lock(path), self._lock:
+            self.refresh(path)
+            size, _ = self._state(path)
+            with open(RecordJournal.journal_path(path), "a", encoding="utf-8") as f:
+                # a torn line left by a crashed writer must not swallow ours
+                f.write(("\n" if size > self.offset else "") + lines)
+            # read our own lines back so memory always matches what is on disk
+            self._replay(RecordJournal.journal_path(path))
+            if self.pending >= COMPACT_EVERY and not self._compacting:
+                self._compacting = True
+                threading.Thread(target=self._background_compact, args=(path,), daemon=True).start()
+
+    def write_snapshot(self, path: Path, records: List[Dict[str, Any]]) -> None:
+        """
+        Replaces the snapshot with `records` and empties the journal. Renaming the journal
+        to <name>.journal.folded is the commit point: from then on the staged <name>.json.next
+        is the collection, and _recover() finishes the swap if we crash before it is done.
+        """
+        text = json.dumps(records, indent=self.indent, default=str)
+        with file_lock(path), self._lock:
+            self._recover(path)
+            staged = RecordJournal.staged_path(path)
+            write_atomic(staged, text)
+            journal = RecordJournal.journal_path(path)
+            if journal.exists():
+                os.replace(journal, RecordJournal.folded_path(path))
+            os.replace(staged, path)
+            RecordJournal.folded_path(path).unlink(missing_ok=True)
+            self._load(path, RecordJournal._signature(path))
+
+    def compact(self, path: Path) -> None:
+        with file_lock(path), self._lock:
+            self.refresh(path)
+            if self.pending:
+                self.write_snapshot(path, self.records)
+
+    def _background_compact(self, path: Path) -> None:
+        try:
+            self.compact(path)
+        except Exception:
+            logger.exception("Journal compaction failed for %s", path)
+        finally:
+            self._compacting = False
+
+    @staticmethod
+    def _recover(path: Path) -> None:
+        """Finishes a write_snapshot that crashed after setting its journal aside; call under the file lock."""
+        folded = RecordJournal.folded_path(path)
+        if not folded.exists():
+            return
+        staged = RecordJournal.staged_path(path)
+        # still staged: the crash came before the swap, the staged snapshot already holds the journal
+        if staged.exists():
+            os.replace(staged, path)
+        folded.unlink()
+
+    def _load(self, path: Path, signature) -> None:
+        records = []
+        if signature is not None:
+            with open(path, "r") as f:
+                records = json.load(f)
+        self.path = path
+        self.signature = signature
+        self.offset = 0
+        self.pending = 0
+        self._rebuild(records)
+
+    def _rebuild(self, records: List[Dict[str, Any]]) -> None:
+        self.records = records
+        self._by_id = {r[self.key]: r for r in records if r.get(self.key)}
+        self._indexes = {field: {} for field in self.indexed_fields}
+        for record in records:
+            self._index(record)
+
+    def _replay(self, journal: Path) -> None:
+        with open(journal, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read()
+
+        # a line without its newline is still being written, leave it for next time
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning("Skipping corrupt line in %s", journal)
+                continue
+            self._apply(entry)
+            self.pending += 1
+        self.offset += end
+
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        if entry["op"] == "add":
+            record = entry["record"]
+            self.records.append(record)
+            if record.get(self.key):
+                self._by_id[record[self.key]] = record
+            self._index(record)
+        elif entry["op"] == "update":
+            record = self._by_id.get(entry[self.key])
+            if record is not None:
+                moved = [f for f in self.indexed_fields if f in entry["updates"] and entry["updates"][f] != record.get(f)]
+                self._unindex(record, moved)
+                record.update(entry["updates"])
+                self._index(record, moved)
+        elif entry["op"] == "delete":
+            gone = {id(self._by_id[key]) for key in entry["keys"] if key in self._by_id}
+            if gone:
+                self._rebuild([r for r in self.records if id(r) not in gone])
+
+    def _index(self, record: Dict[str, Any], fields=None) -> None:
+        for field in self.indexed_fields if fields is None else fields:
+            value = record.get(field)
+            if value is not None:
+                self._indexes[field].setdefault(value, []).append(record)
+
+    def _unindex(self, record: Dict[str, Any], fields) -> None:
+        for field in fields:
+            bucket = self._indexes[field].get(record.get(field))
+            if bucket is None:
+                continue
+            bucket[:] = [r for r in bucket if r is not record]
+            if not bucket:
+                del self._indexes[field][record.get(field)]
+
+
+journal = RecordJournal()
@@ -1,60 +1,107 @@
-import json
+import os
+import time
 from pathlib import Path
 import uuid
+from backend.app.repositories import storage
 
 DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "transactions.json"
+# a "fulfilling" claim older than this was left by a worker that died mid-fulfilment
+FULFILLMENT_LEASE_SECONDS = float(os.getenv("FULFILLMENT_LEASE_SECONDS", "120"))
+
+def transaction_date(transaction: dict) -> str:
+    # checkout transactions carry a date, Stripe ones a timestamp; both sort as ISO strings
+    return str(transaction.get("date") or transaction.get("timestamp") or "")
 
 class TransactionsRepo:
 
+    @staticmethod
+    def _collection():
+        return storage.collection("transactions", DATA_PATH)
+
     @staticmethod
     def get_transactions_by_user(user_id: int):
-        transactions = TransactionsRepo.load_transactions()
-        return [t for t in transactions if t["user_id"] == user_id]
-    
+        return TransactionsRepo._collection().find("user_id", user_id)
+
     @staticmethod
     def load_transactions():
-        with open(DATA_PATH, "r") as f:
-            return json.load(f)
-        
+        return TransactionsRepo._collection().all()
+
+    @staticmethod
+    def iter_transactions(user_id: int | None = None):
+        """
+        Iterates stored transactions in insertion order, only the user's when user_id is given.
+        All of them are read from the store one at a time; a user's come from the user_id index.
+        """
+        transactions = TransactionsRepo._collection()
+        return transactions.iterate() if user_id is None else iter(transactions.find("user_id", user_id))
+
+    @staticmethod
+    def lock():
+        return TransactionsRepo._collection().lock()
+
+    @staticmethod
+    def signature():
+        """Changes whenever transactions are written; used for export ETags."""
+        return TransactionsRepo._collection().signature()
+
     @staticmethod
     def save_transaction(transactions):
-            with open(DATA_PATH, "w") as f:
-                json.dump(transactions, f, indent=4)
+        TransactionsRepo._collection().save_all(transactions)
+
+    @staticmethod
+    def compact():
+        TransactionsRepo._collection().compact()
 
     @staticmethod
     def add_transaction(data: dict) -> dict:
         if "transaction_id" not in data:
             data["transaction_id"] = str(uuid.uuid4())
-        transactions = TransactionsRepo.load_transactions()
-        transactions.append(data)
-        TransactionsRepo.save_transaction(transactions)
-        return data
-    
+        return TransactionsRepo._collection().insert(data)
+
+    @staticmethod
+    def add_transactions(transactions: list) -> list:
+        """Adds a batch of transactions with one write (a single journal append)."""
+        for data in transactions:
+            if "transaction_id" not in data:
+                data["transaction_id"] = str(uuid.uuid4())
+        return TransactionsRepo._collection().insert_many(transactions)
+
     @staticmethod
     def transaction_exists(transaction_id: str) -> bool:
-        return any(t.get("transaction_id") == transaction_id for t in TransactionsRepo.load_transactions())
-        
+        return TransactionsRepo._collection().get(transaction_id) is not None
+
     @staticmethod
     def user_has_transactions(user_id: int) -> bool:
-        transactions = TransactionsRepo.load_transactions()
-        return any(t.get("user_id") == user_id for t in transactions)
+        return TransactionsRepo._collection().find_one("user_id", user_id) is not None
 
     @staticmethod
     def get_transaction_by_id(transaction_id: str) -> dict | None:
-        transactions = TransactionsRepo.load_transactions()
-        return next((t for t in transactions if t.get("transaction_id") == transaction_id), None)
+        """Looks the id up as a transaction_id, then as the receipt id of a legacy checkout transaction."""
+        transactions = TransactionsRepo._collection()
+        return transactions.get(transaction_id) or transactions.find_one("id", transaction_id)
 
     @staticmethod
     def get_transaction_by_intent(intent_id: str) -> dict | None:
-        transactions = TransactionsRepo.load_transactions()
-        return next((t for t in transactions if t.get("payment_intent_id") == intent_id), None)
+        return TransactionsRepo._collection().find_one("payment_intent_id", intent_id)
 
     @staticmethod
     def update_transaction(transaction_id: str, updates: dict) -> dict | None:
-        transactions = TransactionsRepo.load_transactions()
-        for t in transactions:
-            if t.get("transaction_id") == transaction_id:
-                t.update(updates)
-                TransactionsRepo.save_transaction(transactions)
-                return t
-        return None
+        return TransactionsRepo._collection().update(transaction_id, updates)
+
+    @staticmethod
+    def claim_for_fulfillment(transaction_id: str, now: float | None = None) -> dict | None:
+        """
+        Atomically moves a transaction to "fulfilling" and returns it, or returns None if it
+        is already completed or being fulfilled, so a webhook and a manual confirm racing
+        for the same payment fulfil it once. A claim older than FULFILLMENT_LEASE_SECONDS
+        belongs to a worker that crashed and is taken over, the way Stripe events are.
+        """
+        now = time.time() if now is None else now
+        transactions = TransactionsRepo._collection()
+        with transactions.lock():
+            transaction = transactions.get(transaction_id)
+            if not transaction or transaction.get("status") in ("completed", "refunded"):
+                return None
+            if transaction.get("status") == "fulfilling" and (transaction.get("fulfilling_since") or 0) > now - FULFILLMENT_LEASE_SECONDS:
+                return None
+            return transactions.update(transaction_id, {"status": "fulfilling", "fulfilling_since": now})
@@ -0,0 +1,107 @@
+import threading
+from pathlib import Path
+from typing import List, Dict, Any
+from backend.app.repositories import storage
+
+# fields with a unique hash index; the first record wins if the data already holds a duplicate
+UNIQUE_FIELDS = ("user_id", "email", "username")
+
+
+class UserIndex:
+    """
+    In-process hash indexes over the users store: user_id, email and username -> user.
+
+    Built once from storage and rebuilt only when the users signature changes behind
+    it (a write by another worker process or a file edited by hand). Writes made in
+    this process reach it through a storage write listener and are applied in place,
+    so registration and login lookups stay dict hits as the user base grows. It also
+    keeps the highest user_id, from which new ids are issued.
+
+    The email and username each user is indexed under are remembered by user_id, so an
+    update unindexes exactly those keys even when the record it gets is the same dict
+    that was indexed, already changed.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.source = None
+        self.signature = None
+        self.max_id = 0
+        self._by: Dict[str, Dict[Any, Dict[str, Any]]] = {field: {} for field in UNIQUE_FIELDS}
+        self._keys: Dict[Any, tuple] = {}
+        storage.on_write("users", self._on_write)
+
+    def refresh(self, path: Path) -> "UserIndex":
+        users = storage.collection("users", path)
+        signature = users.signature()
+        if (users.source, signature) == (self.source, self.signature):
+            return self
+
+        # read outside the index lock (writers call _on_write holding the users lock);
+        # reading a missing file creates it, hence the second try
+        for _ in range(2):
+            records = users.all()
+            settled = users.signature()
+            if settled == signature:
+                break
+            signature = settled
+        with self._lock:
+            self._set(users.source, records, signature if settled == signature else None)
+        return self
+
+    def _set(self, source, records: List[Dict[str, Any]], signature) -> None:
+        self.source = source
+        self.signature = signature
+        self._by = {field: {} for field in UNIQUE_FIELDS}
+        self._keys = {}
+        self.max_id = 0
+        for record in records:
+            self._add(record)
+
+    def _add(self, record: Dict[str, Any]) -> None:
+        for field in UNIQUE_FIELDS:
+            value = record.get(field)
+            if value is not None:
+                self._by[field].setdefault(value, record)
+        user_id = record.get("user_id")
+        if user_id is not None and self._by["user_id"].get(user_id) is record:
+            self._keys[user_id] = (record.get("email"), record.get("username"))
+        if isinstance(user_id, int):
+            self.max_id = max(self.max_id, user_id)
+
+    def _remove(self, user_id) -> None:
+        record = self._by["user_id"].pop(user_id, None)
+        email, username = self._keys.pop(user_id, (None, None))
+        for field, value in (("email", email), ("username", username)):
+            if value is not None and self._by[field].get(value) is record:
+                del self._by[field][value]
+
+    def _on_write(self, collection, op: str, record, before, after) -> None:
+        with self._lock:
+            if (collection.source, before) != (self.source, self.signature):
+                self.signature = None
+                return
+            if op == "add":
+                self._add(record)
+            elif op == "add_many":
+                for added in record:
+                    self._add(added)
+            elif op == "update":
+                self._remove(record.get("user_id"))
+                self._add(record)
+            else:
+                # a rewrite of the whole list: rebuild on the next read
+                self.signature = None
+                return
+            self.signature = after
+
+    def get(self, field: str, value) -> Dict[str, Any] | None:
+        """Copy of the user whose `field` equals value, or None."""
+        if value is None:
+            return None
+        with self._lock:
+            record = self._by[field].get(value)
+        return dict(record) if record is not None else None
+
+
+user_index = UserIndex()
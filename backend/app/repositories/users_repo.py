@@ -1,70 +1,130 @@
-import json
+import os
 from pathlib import Path
 from backend.app.repositories.cart_repo import CartRepo
+from backend.app.repositories import storage
+from backend.app.repositories.user_index import user_index, UNIQUE_FIELDS
+from backend.app.utils.ttl_cache import TTLCache
 
 DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "users.json"
 
+# user records resolved for authenticated requests; writes in this process evict them,
+# writes by other worker processes are seen after at most USER_CACHE_TTL seconds
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+
+def _evict(collection, op, record, before, after) -> None:
+    if op in ("add", "update"):
+        user_cache.pop((collection.source, record.get("user_id")))
+    elif op == "add_many":
+        for user in record:
+            user_cache.pop((collection.source, user.get("user_id")))
+    else:
+        user_cache.clear()
+
+
+storage.on_write("users", _evict)
+
+
+class DuplicateUserError(ValueError):
+    """A user_id, email or username that another user already has."""
+
+
 class UsersRepo:
+
+    def _collection():
+        return storage.collection("users", DATA_PATH)
+
+    def _sequences():
+        return storage.collection("sequences", DATA_PATH.with_name("sequences.json"))
+
+    def _index():
+        return user_index.refresh(DATA_PATH)
     
     def load_users():
-        if not DATA_PATH.exists():
-            return []
-        with open(DATA_PATH, "r") as f:
-            return json.load(f)
+        return UsersRepo._collection().all()
         
     def save_users(users):
-        with open(DATA_PATH, "w") as f:
-            json.dump(users, f, indent=4)
+        UsersRepo._collection().save_all(users)
 
     def get_all_users():
         return UsersRepo.load_users()
 
     def get_user_by_id(user_id: int):
-        users = UsersRepo.load_users()
-        for user in users:
-            if user["user_id"] == user_id:
-                return user
-        return None
+        return UsersRepo._index().get("user_id", user_id)
+
+    def get_cached_user(user_id: int):
+        """get_user_by_id served from user_cache; the returned record is shared, do not modify it."""
+        collection = UsersRepo._collection()
+        key = (collection.source, user_id)
+        user = user_cache.get(key)
+        if user is None:
+            signature = collection.signature()
+            user = collection.get(user_id)
+            # a write racing with the read would evict before we fill: keep only what is current
+            if user is not None and collection.signature() == signature:
+                user_cache.set(key, user)
+        return user
 
     def get_user_by_email(email: str):
-        users = UsersRepo.load_users()
-        for user in users:
-            if user["email"] == email:
-                return user
-        return None
+        return UsersRepo._index().get("email", email)
 
     def get_user_by_username(username: str):
-        users = UsersRepo.load_users()
-        for user in users:
-            if user["username"] == username:
-                return user
-        return None
-
-    def add_user(user_data: dict):
-        # users = UsersRepo.load_users()
-        # users.append(user_data)
-        # UsersRepo.save_users(users)
-        users = UsersRepo.load_users()
-
-        users.append(user_data)
-        UsersRepo.save_users(users)
+        return UsersRepo._index().get("username", username)
+
+    def next_user_id() -> int:
+        """
+        One past the highest user_id issued so far. The users themselves hold the
+        high-water mark; the sequences store only remembers ids of deleted users, so
+        registering needs no write besides the user.
+        """
+        sequence = UsersRepo._sequences().get("users")
+        return max(UsersRepo._index().max_id, sequence["value"] if sequence else 0) + 1
+
+    def _check_unique(index, user: dict, user_id=None) -> None:
+        for field in UNIQUE_FIELDS:
+            taken = index.get(field, user.get(field))
+            if taken is not None and taken["user_id"] != user_id:
+                raise DuplicateUserError(f"A user with this {field} already exists")
+
+    def add_user(user_data: dict) -> dict:
+        """
+        Stores a new user, issuing the next user_id when user_data has none, and creates
+        their cart. Raises DuplicateUserError if the user_id, email or username is taken.
+        """
+        collection = UsersRepo._collection()
+        with collection.lock():
+            index = UsersRepo._index()
+            if user_data.get("user_id") is None:
+                user_data = {"user_id": UsersRepo.next_user_id(), **user_data}
+            UsersRepo._check_unique(index, user_data)
+            collection.insert(user_data)
         CartRepo.create_cart_for_user(user_data["user_id"])
+        return user_data
 
     def update_user(user_id: int, updated_data: dict):
-        users = UsersRepo.load_users()
-        for i, user in enumerate(users):
-            if user["user_id"] == user_id:
-                users[i].update(updated_data)
-                UsersRepo.save_users(users)
-                return users[i]
-        return None
+        collection = UsersRepo._collection()
+        changes = dict(updated_data)
+        with collection.lock():
+            index = UsersRepo._index()
+            if index.get("user_id", user_id) is not None:
+                UsersRepo._check_unique(index, {f: changes.get(f) for f in ("email", "username")}, user_id)
+            return collection.update(user_id, changes)
 
     def delete_user(user_id: int):
-        users = UsersRepo.load_users()
-        new_users = [u for u in users if u["user_id"] != user_id]
-        UsersRepo.save_users(new_users)
-        return len(new_users) < len(users)
+        collection = UsersRepo._collection()
+        with collection.lock():
+            # ids are never reissued: remember the highest one before it leaves the file
+            index = UsersRepo._index()
+            if index.get("user_id", user_id) is not None and user_id == index.max_id:
+                sequences = UsersRepo._sequences()
+                sequence = sequences.get("users")
+                if sequence is None:
+                    sequences.insert({"name": "users", "value": user_id})
+                elif sequence["value"] < user_id:
+                    sequences.update("users", {"value": user_id})
+            return collection.delete(user_id)
 
     def user_exists(user_id: int) -> bool:
-        users = UsersRepo.load_users()
-        return any(user["user_id"] == user_id for user in users)
\ No newline at end of file
+        return UsersRepo.get_user_by_id(user_id) is not None
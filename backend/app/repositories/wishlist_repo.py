@@ -1,75 +1,63 @@
 from typing import Dict, Any
 from pathlib import Path
-import json
-import os
+from backend.app.repositories import storage
 
 DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "wishlists.json"
 
 class WishlistRepo:
 
     @staticmethod
-    def _ensure_file():
-        if not DATA_PATH.exists():
-            with open(DATA_PATH, "w", encoding="utf-8") as f:
-                json.dump([], f, indent=2)
+    def _collection():
+        return storage.collection("wishlists", DATA_PATH)
 
     @staticmethod
     def load_all() -> list:
-        WishlistRepo._ensure_file()
-        with open(DATA_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return WishlistRepo._collection().all()
 
     @staticmethod
     def save_all(wishlists: list):
-        tmp = DATA_PATH.with_suffix(".tmp")
-        with open(tmp, "w", encoding="utf-8") as f:
-            json.dump(wishlists, f, indent=2)
-        os.replace(tmp, DATA_PATH)
+        WishlistRepo._collection().save_all(wishlists)
 
     @staticmethod
     def wishlist_exists(user_id: int) -> bool:
-        return any(w["user_id"] == user_id for w in WishlistRepo.load_all())
+        return WishlistRepo._collection().get(user_id) is not None
 
     @staticmethod
     def create_wishlist(user_id: int, public: bool = False) -> Dict[str, Any]:
-        wishlists = WishlistRepo.load_all()
+        with WishlistRepo._collection().lock():
+            wishlists = WishlistRepo._collection()
         
-        if any(w.get("user_id") == user_id for w in wishlists):
-            return
+            if wishlists.get(user_id) is not None:
+                return
         
-        wishlist = {
-            "user_id": user_id,
-            "items": [],
-            "public": public,
-            "shared_with": []
-        }
-        wishlists.append(wishlist)
-        WishlistRepo.save_all(wishlists)
-        return wishlist
+            wishlist = {
+                "user_id": user_id,
+                "items": [],
+                "public": public,
+                "shared_with": []
+            }
+            wishlists.insert(wishlist)
+            return wishlist
 
     @staticmethod
     def get_wishlist(user_id: int) -> Dict[str, Any] | None:
-        return next((w for w in WishlistRepo.load_all() if w["user_id"] == user_id), None)
+        return WishlistRepo._collection().get(user_id)
 
     @staticmethod
     def add_item(user_id: int, product_id: str, quantity: int):
-        wishlists = WishlistRepo.load_all()
-        for w in wishlists:
-            if w["user_id"] == user_id:
-                # Check if item already exists
-                existing = next((i for i in w["items"] if i["product_id"] == product_id), None)
-                if existing:
-                    existing["quantity"] += quantity
-                else:
-                    w["items"].append({"product_id": product_id, "quantity": quantity})
-                break
-        WishlistRepo.save_all(wishlists)
+        with WishlistRepo._collection().lock():
+            wishlists = WishlistRepo._collection()
+            w = wishlists.get(user_id)
+            if w is None:
+                return
+            # Check if item already exists
+            existing = next((i for i in w["items"] if i["product_id"] == product_id), None)
+            if existing:
+                existing["quantity"] += quantity
+            else:
+                w["items"].append({"product_id": product_id, "quantity": quantity})
+            wishlists.update(user_id, {"items": w["items"]})
 
     @staticmethod
     def update_wishlist(user_id: int, wishlist_data: dict):
-        wishlists = WishlistRepo.load_all()
-        for i, w in enumerate(wishlists):
-            if w["user_id"] == user_id:
-                wishlists[i] = wishlist_data
-                break
-        WishlistRepo.save_all(wishlists)
+        WishlistRepo._collection().update(user_id, wishlist_data)
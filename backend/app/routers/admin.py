@@ -2,18 +2,15 @@ from fastapi import APIRouter, Depends, HTTPException, Body
 from backend.app.schemas.penalty import PenaltyCreate
 from backend.app.schemas.admin import PromoteUser
 from backend.app.services.admin_service import AdminService
-from backend.app.services.users_service import UsersService
+from backend.app.utils.auth import get_admin_claims
 from backend.app.repositories.products_repo import ProductsRepo
+from backend.app.utils.etag import catalog_etag
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 service = AdminService()
 
-def require_admin(user = Depends(UsersService.get_user_info)):
-    if not user or not isinstance(user, dict):
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    if not user.get("isAdmin", False):
-        raise HTTPException(status_code=403, detail="Admin access required")
-    return user
+def require_admin(admin = Depends(get_admin_claims)):
+    return admin
 
 @router.post("/promote", summary="Promote a user to admin")
 def promote(data: PromoteUser, admin = Depends(require_admin)):
@@ -134,14 +131,16 @@ def set_products_of_week(product_ids: list[str] = Body(..., embed=True), admin =
 
 
 @router.get("/products-of-week", summary="Get the current products of the week")
-def get_products_of_week(admin = Depends(require_admin)):
+def get_products_of_week(admin = Depends(require_admin), etag: str = Depends(catalog_etag)):
     """
-    This endpoint retrieves all products of the week.
+    This endpoint retrieves all products of the week. The response carries the catalog ETag, and
+    If-None-Match with that ETag gets a 304 until the catalog or the products of the week change.
     
     routers/admin.py -> repositories/products_repo.py/ProductsRepo.get_products_of_the_week()
     
     Args:
         admin: The current admin user (injected by dependency).
+        etag: The current catalog ETag (injected by dependency).
     Returns:
         dict: A dictionary containing the list of products of the week.
     """
@@ -1,21 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from backend.app.services.admin_service import AdminService
-from backend.app.services.users_service import UsersService
+from backend.app.utils.auth import get_admin_claims
 from backend.app.repositories.users_repo import UsersRepo
+from backend.app.repositories import transactions_repo
 from backend.app.repositories.transactions_repo import TransactionsRepo
 from backend.app.repositories.penalties_repo import PenaltiesRepo
-from fastapi.responses import FileResponse
+from backend.app.repositories.dashboard_summary import dashboard_summary
+from fastapi.responses import FileResponse, StreamingResponse
 from backend.app.repositories.products_repo import ProductsRepo
+from backend.app.repositories.email_outbox_repo import EmailOutboxRepo
+from backend.app.repositories.stripe_events_repo import StripeEventsRepo
+from backend.app.utils.streaming import iter_json_array, iter_ndjson, parse_range, slice_chunks
+from backend.app.services.transaction_export_service import TransactionExport
+from backend.app.utils.http_client import client_stats
+from backend.app.services.subscriptions_service import renewal_scheduler
+from itertools import chain
+from typing import Optional
+from datetime import date
+import json
 import os
 
 router = APIRouter(prefix="/admin_dashboard", tags=["Admin Dashboard"])
 service = AdminService()
 
 #requires admin
-def require_admin(user=Depends(UsersService.get_user_info)):
-    if not user or not user.get("isAdmin", False):
-        raise HTTPException(status_code=403, detail="Admin access required")
-    return user
+def require_admin(admin=Depends(get_admin_claims)):
+    return admin
 
 #gets a overview of all users
 @router.get("/users", summary="Get all users")
@@ -77,83 +87,197 @@ def get_user_details(user_id: int, admin=Depends(require_admin)):
 def admin_summary(admin=Depends(require_admin)):
     """
     This endpoint retrieves a summary for the admin dashboard, including total counts and recent activities.
+    The totals and the 10 most recent transactions and penalties are maintained as records are written,
+    so the request itself does not read the data files.
     
-    routers/admin_dashboard.py -> repositories/users_repo.py/UsersRepo.load_users()
-    routers/admin_dashboard.py -> repositories/transactions_repo.py/TransactionsRepo.get_transactions_by_user(user_id)
-    routers/admin_dashboard.py -> repositories/penalties_repo.py/PenaltiesRepo.get_penalties
+    routers/admin_dashboard.py -> repositories/dashboard_summary.py/DashboardSummary.snapshot()
     
     Args:
         admin: The admin user making the request.
     Returns:
         dict: A dictionary containing summary statistics and recent activities.
     """
-    users = UsersRepo.load_users()
-
-    all_transactions = []
-    all_penalties = []
-
-    for user in users:
-        uid = user["user_id"]
-        all_transactions.extend(TransactionsRepo.get_transactions_by_user(uid))
-        all_penalties.extend(PenaltiesRepo.get_penalties_by_user(uid))
+    return {"message": "Admin dashboard summary", **dashboard_summary.snapshot()}
 
-    all_transactions_sorted = sorted(
-        all_transactions,
-        key=lambda x: x.get("date", ""),
-        reverse=True
-    )
-
-    all_penalties_sorted = sorted(
-        all_penalties,
-        key=lambda x: x.get("date_issued", ""),
-        reverse=True
-    )
-
-    return {
-        "message": "Admin dashboard summary",
-        "totals": {
-            "total_users": len(users),
-            "total_transactions": len(all_transactions),
-            "total_penalties": len(all_penalties)
-        },
-        "latest": {
-            "recent_transactions": all_transactions_sorted[:10],
-            "recent_penalties": all_penalties_sorted[:10]
-        }
-    }
 @router.get("/inventory", summary="Get inventory stock updates")
-def get_inventory_updates(admin=Depends(require_admin)):
+def get_inventory_updates(
+    admin=Depends(require_admin),
+    stream: Optional[str] = Query(None, pattern="^(json|ndjson)$", description="Stream the response instead of building it in memory")
+):
     """
     This endpoint retrieves inventory stock updates, including low stock and out-of-stock products.
-    
+
+    With `stream=json` the same document is written out while all_products is being read. With `stream=ndjson`
+    the first line holds the message, summary and low/out of stock lists and every following line is one product.
+
     routers/admin_dashboard.py -> repositories/products_repo.py/ProductsRepo.load_products()
-    
+    routers/admin_dashboard.py -> repositories/products_repo.py/ProductsRepo.load_products() -> utils/streaming.py/iter_json_array(products) or iter_ndjson(products)
+
     Args:
         admin: The admin user making the request.
+        stream (str, optional): json or ndjson
     Returns:
         dict: A dictionary containing inventory stock updates.
     """
+    # a list of references into the catalog; only the response body is what streaming avoids building
     products = ProductsRepo.load_products()
 
+    low_stock, out_of_stock = [], []
+    for p in products:
+        if p.get("quantity", 0) <= 5 and p.get("quantity", 0) > 0:
+            low_stock.append(p)
+        elif p.get("quantity", 0) == 0:
+            out_of_stock.append(p)
+
     if not products:
         return {"message": "No products found"}
 
-    low_stock = [p for p in products if p.get("quantity", 0) <= 5 and p.get("quantity", 0) > 0]
-    out_of_stock = [p for p in products if p.get("quantity", 0) == 0]
-
-    return {
+    head = {
         "message": "Inventory updates retrieved",
         "inventory_summary": {
             "total_products": len(products),
             "low_stock_count": len(low_stock),
             "out_of_stock_count": len(out_of_stock),
         },
-        "details": {
-            "low_stock_products": low_stock,
-            "out_of_stock_products": out_of_stock,
-            "all_products": products
-        }
     }
+    details = {
+        "low_stock_products": low_stock,
+        "out_of_stock_products": out_of_stock,
+    }
+
+    if stream == "ndjson":
+        return StreamingResponse(
+            chain([(json.dumps({**head, "details": details}, default=str) + "\n").encode("utf-8")],
+                  iter_ndjson(products)),
+            media_type="application/x-ndjson"
+        )
+    if stream == "json":
+        # everything up to the opening bracket of all_products, then the products one by one
+        prefix = json.dumps({**head, "details": details}, default=str)[:-2] + ', "all_products": '
+        return StreamingResponse(
+            iter_json_array(products, prefix=prefix, suffix="}}"),
+            media_type="application/json"
+        )
+
+    return {**head, "details": {**details, "all_products": products}}
+
+@router.get("/email-queue", summary="Get email outbox queue depth")
+def get_email_queue(admin=Depends(require_admin)):
+    """
+    This endpoint shows how many emails are waiting in the outbox, being sent or retried, and how many were given up on.
+
+    routers/admin_dashboard.py -> repositories/email_outbox_repo.py/EmailOutboxRepo.stats()
+
+    Args:
+        admin: The admin user making the request.
+    Returns:
+        dict: pending, sending, retrying and dead_letters counts plus the age of the oldest pending email.
+    """
+    return EmailOutboxRepo.stats()
+
+@router.get("/stripe-events", summary="Get Stripe webhook event queue depth")
+def get_stripe_events(admin=Depends(require_admin)):
+    """
+    This endpoint shows how many received Stripe webhook events are waiting, being processed, done or failed.
+
+    routers/admin_dashboard.py -> repositories/stripe_events_repo.py/StripeEventsRepo.stats()
+
+    Args:
+        admin: The admin user making the request.
+    Returns:
+        dict: pending, processing, processed and failed counts plus the age of the oldest pending event.
+    """
+    return StripeEventsRepo.stats()
+
+@router.get("/dependencies", summary="Get circuit breaker state of outbound dependencies")
+def get_dependencies(admin=Depends(require_admin)):
+    """
+    This endpoint shows whether SendGrid, the image CDN and Stripe are currently reachable as seen by their circuit breakers.
+
+    routers/admin_dashboard.py -> utils/http_client.py/client_stats()
+
+    Args:
+        admin: The admin user making the request.
+    Returns:
+        list: name, breaker state, consecutive failures and timeouts of every outbound client.
+    """
+    return client_stats()
+
+@router.get("/subscription-renewals", summary="Get subscription renewal scheduler state")
+def get_subscription_renewals(admin=Depends(require_admin)):
+    """
+    This endpoint shows how many subscriptions are scheduled, when the next one renews and how far behind schedule renewals run.
+
+    routers/admin_dashboard.py -> services/subscriptions_service.py/renewal_scheduler.stats()
+
+    Args:
+        admin: The admin user making the request.
+    Returns:
+        dict: scheduled count, next renewal, current and last/max lag in seconds, renewed and batch counts.
+    """
+    return renewal_scheduler.stats()
+
+def _export_headers(export: TransactionExport) -> dict:
+    return {
+        "Content-Disposition": f'attachment; filename="{export.filename}"',
+        "Accept-Ranges": "bytes",
+        "ETag": export.etag
+    }
+
+@router.get("/export/transactions", summary="Export filtered transactions as CSV or NDJSON")
+def export_transactions(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    start: Optional[date] = Query(None, description="Only transactions on or after this day"),
+    end: Optional[date] = Query(None, description="Only transactions on or before this day"),
+    status: Optional[str] = None,
+    user_id: Optional[int] = None,
+    gzip: bool = Query(False, description="Gzip the file while it is sent"),
+    admin=Depends(require_admin)
+):
+    """
+    This endpoint streams the transactions matching the filters as a CSV or NDJSON download, gzipped on
+    the fly with `gzip=true`. The file is produced while it is sent, so large exports run in constant memory.
+
+    A `Range: bytes=...` header returns only that part of the file (206), so an interrupted download can be
+    resumed; with `If-Range` set to the ETag of the first response the range is only served if the
+    transactions have not changed since, otherwise the whole file is sent again.
+
+    routers/admin_dashboard.py -> services/transaction_export_service.py/TransactionExport.chunks()
+    services/transaction_export_service.py -> repositories/transactions_repo.py/TransactionsRepo.iter_transactions()
+
+    Args:
+        format: "csv" (one summary row per transaction) or "ndjson" (full records).
+        start, end: Inclusive day range on the transaction date.
+        status: Only transactions with this status.
+        user_id: Only this user's transactions.
+        gzip: Compress the file.
+        admin: The admin user making the request.
+    Returns:
+        StreamingResponse: the export, or the requested byte range of it.
+    """
+    export = TransactionExport(format, start, end, status, user_id, gzip)
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == export.etag):
+        size = export.size()
+        byte_range = parse_range(range_header, size) if size is not None else None
+        if byte_range is not None:
+            first, last = byte_range
+            return StreamingResponse(
+                export.verified(slice_chunks(export.chunks(), first, last)), status_code=206,
+                media_type=export.media_type, headers={
+                    **_export_headers(export),
+                    "Content-Range": f"bytes {first}-{last}/{size}",
+                    "Content-Length": str(last - first + 1)
+                }
+            )
+        if size is None:
+            # written to while it was measured: send the whole of what is stored now
+            export = TransactionExport(format, start, end, status, user_id, gzip)
+
+    return StreamingResponse(export.chunks(), media_type=export.media_type, headers=_export_headers(export))
+
 @router.get("/download/transactions", summary="Download all transactions JSON")
 def download_all_transactions(admin=Depends(require_admin)):
     """
@@ -166,7 +290,9 @@ def download_all_transactions(admin=Depends(require_admin)):
     Returns:
         FileResponse: A response that prompts the download of the transactions JSON file.
     """
-    file_path = "backend/app/data/transactions.json"
+    file_path = str(transactions_repo.DATA_PATH)
+    # fold the append-only journal into the snapshot so the download is complete
+    TransactionsRepo.compact()
 
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="transactions.json not found")
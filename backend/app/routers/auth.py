@@ -58,6 +58,7 @@ def login(payload: LoginRequest):
     
     routers/auth.py -> services/auth_service.py/AuthService.login(email, password) -> 
     repositories/users_repo.py/UsersRepo.get_user_by_email(email)
+    The bcrypt check runs on the password hashing pool (utils/passwords.py).
     
     Args:
         payload (LoginRequest): The login credentials.
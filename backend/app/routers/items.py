@@ -1,42 +1,106 @@
-from fastapi import APIRouter, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import JSONResponse
 from typing import List, Optional
 from backend.app.schemas.item import Item, ItemCreate, ItemUpdate
 from backend.app.services.items_service import ItemsService
 from backend.app.repositories.products_repo import ProductsRepo
+from backend.app.utils.streaming import stream_items
+from backend.app.utils.etag import catalog_etag
 
 router = APIRouter(prefix="/items", tags=["Items"])
 
+LIGHT_FIELDS = ("product_id", "product_name", "price", "image", "description", "category")
+
+def _page_response(items, next_cursor, etag):
+    response = JSONResponse(content=items, headers={"ETag": etag})
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+def _light(items):
+    for it in items:
+        yield {
+            "product_id": it["product_id"],
+            "product_name": it["product_name"],
+            "price": it["discounted_price"],
+            "image": it["img_link"],
+            "description": it["about_product"].split("|")[0],
+            "category": it["category"],
+        }
+
 @router.get("", response_model=List[Item], summary="Lists all items in from our dataset")
-def get_items():
+def get_items(
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; omit to get every item"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. product_id,product_name"),
+    stream: Optional[str] = Query(None, pattern="^(json|ndjson)$", description="Stream the whole catalog as a json array or ndjson"),
+    etag: str = Depends(catalog_etag)
+):
     """
     This endpoint returns a list of all the items from our amazon_cad.json file
-    
+
+    With `limit` it returns one page ordered by product_id, and the `X-Next-Cursor` response header holds the
+    cursor for the next page (absent on the last page). `fields` trims every item down to the listed fields.
+    With `stream` the whole catalog is written out item by item instead of being built in memory first.
+    Responses carry an ETag of the catalog version; sending it back in If-None-Match gets a 304 until the catalog changes.
+
     router/Items.py -> services/items_service.py/ItemsService.list_items() -> ProductsRepo.load_all()
-    
+    router/Items.py -> services/items_service.py/ItemsService.list_page(cursor, limit) -> ProductsRepo.page(cursor, limit) -> repositories/product_catalog.py/ProductCatalog.page(cursor, limit)
+    router/Items.py -> services/items_service.py/ItemsService.iter_items() -> ProductsRepo.iter_products() -> utils/streaming.py/stream_items(items, stream)
+
     Args:
-        None
+        limit (int, optional): The page size
+        cursor (str, optional): Where the previous page ended
+        fields (str, optional): The fields to return
+        stream (str, optional): json or ndjson
     Returns:
-        List[Item]: A list of all items in the dataset
+        List[Item]: A list of all items in the dataset, or one page of them
     """
-    return ItemsService.list_items()
+    if stream is not None:
+        return stream_items(ItemsService.project(ItemsService.iter_items(), fields, Item.model_fields), stream, headers={"ETag": etag})
+
+    if limit is None and fields is None:
+        return ItemsService.list_items()
+
+    if limit is None:
+        items, next_cursor = ItemsService.list_items(), None
+    else:
+        items, next_cursor = ItemsService.list_page(cursor, limit)
+
+    # pages skip response_model validation so their cost follows the page size
+    return _page_response(list(ItemsService.project(items, fields, Item.model_fields)), next_cursor, etag)
 
 @router.get("/items-light")
-def get_items_light():
-    items = ItemsService.list_items()
+def get_items_light(
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; omit to get every item"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. product_id,price"),
+    stream: Optional[str] = Query(None, pattern="^(json|ndjson)$", description="Stream the whole catalog as a json array or ndjson"),
+    etag: str = Depends(catalog_etag)
+):
+    """
+    This endpoint returns a trimmed down version of every item for listing pages, paged and streamed the same way as GET /items
 
-    out = [
-        {
-            "product_id": it["product_id"],
-            "product_name": it["product_name"],
-            "price": it["discounted_price"],
-            "image": it["img_link"],
-            "description": it["about_product"].split("|")[0],
-            "category": it["category"],
-        }
-        for it in items
-    ]
+    router/Items.py -> services/items_service.py/ItemsService.list_page(cursor, limit) -> ProductsRepo.page(cursor, limit)
+    router/Items.py -> services/items_service.py/ItemsService.iter_items() -> ProductsRepo.iter_products() -> utils/streaming.py/stream_items(items, stream)
+
+    Args:
+        limit (int, optional): The page size
+        cursor (str, optional): Where the previous page ended
+        fields (str, optional): The fields to return
+        stream (str, optional): json or ndjson
+    Returns:
+        list: product_id, product_name, price, image, description and category of each item
+    """
+    if stream is not None:
+        return stream_items(ItemsService.project(_light(ItemsService.iter_items()), fields, LIGHT_FIELDS), stream, headers={"ETag": etag})
+
+    if limit is None:
+        items, next_cursor = ItemsService.list_items(), None
+    else:
+        items, next_cursor = ItemsService.list_page(cursor, limit)
 
-    return out
+    return _page_response(list(ItemsService.project(_light(items), fields, LIGHT_FIELDS)), next_cursor, etag)
 
 #simple post the payload (is the body of the request)
 @router.post("", response_model=Item, status_code=201, summary="Creates a new item in our dataset")
@@ -58,7 +122,9 @@ def search_item(keyword: str = Query(..., description="Keyword to search by")):
     """
     This endpoint searches for items in our dataset by a keyword that can be found in the name, description, or category fields
 
-    router/Items.py -> repositories/products_repo.py/ProductsRepo.search_product(keyword) -> repositories/products_repo.py/ProductsRepo.load_products()
+    Every word of the keyword must appear in the item; the last word also matches as a prefix.
+
+    router/Items.py -> repositories/products_repo.py/ProductsRepo.search_products(keyword) -> repositories/product_catalog.py/ProductCatalog.search(keyword) -> repositories/search_index.py/SearchIndex.search(keyword)
 
     Args:
         keyword (str): The keyword to search for
@@ -73,12 +139,17 @@ def filter_items(
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     category: Optional[str] = None,
-    rating: Optional[float] = None
+    rating: Optional[float] = None,
+    min_rating_count: Optional[int] = None,
+    in_stock: Optional[bool] = None,
+    category_path: Optional[str] = Query(None, description="Exact category path prefix, e.g. Home&Kitchen|HomeStorage&Organization")
 ):
     """
     This endpoint filters items in our dataset based on various criteria such as keyword, price range, category, and rating
 
-    router/Items.py -> repositories/products_repo.py/ProductsRepo.filter_products(keyword, min_price, max_price, category, rating) -> repositories/products_repo.py/ProductsRepo.load_products()
+    `category` matches any part of the category text, `category_path` only items filed under that exact path (see /items/categories)
+
+    router/Items.py -> repositories/products_repo.py/ProductsRepo.filter_products(keyword, min_price, max_price, category, rating, min_rating_count, in_stock, category_path) -> repositories/product_catalog.py/ProductCatalog.filter(...) -> repositories/product_columns.py/ProductColumns.filter(...)
 
     Args:
         keyword (str, optional): The keyword to filter by
@@ -86,19 +157,44 @@ def filter_items(
         max_price (float, optional): The maximum price
         category (str, optional): The category to filter by
         rating (float, optional): The minimum rating
+        min_rating_count (int, optional): The minimum number of ratings
+        in_stock (bool, optional): Only items with quantity above 0
+        category_path (str, optional): The category path the items must be filed under
     Returns:
         List[Item]: A list of items that match the filter criteria
     """
-    return ProductsRepo.filter_products(keyword=keyword, min_price=min_price, max_price=max_price, category=category, rating=rating)
+    return ProductsRepo.filter_products(keyword=keyword, min_price=min_price, max_price=max_price, category=category, rating=rating,
+                                        min_rating_count=min_rating_count, in_stock=in_stock, category_path=category_path)
+
+@router.get("/categories", summary="Browse the category tree with product counts")
+def get_categories(
+    path: Optional[str] = Query(None, description="Category path to open, e.g. Home&Kitchen|HomeStorage&Organization; omit for the top level"),
+    depth: int = Query(1, ge=0, le=10, description="How many levels of children to include"),
+    etag: str = Depends(catalog_etag)
+):
+    """
+    This endpoint returns one node of the category tree, its product count and the counts of its children, without loading any products
+
+    router/Items.py -> repositories/products_repo.py/ProductsRepo.get_category(path) -> repositories/product_catalog.py/ProductCatalog.categories() -> repositories/category_tree.py/CategoryTree.find(path)
+
+    Args:
+        path (str, optional): The category path to open
+        depth (int, optional): The number of child levels to include
+    Returns:
+        dict: name, path, count and children of the category
+    """
+    node = ProductsRepo.get_category(path)
+    if node is None:
+        raise HTTPException(status_code=404, detail=f"Category '{path}' not found")
+    return node.to_dict(depth)
 
 @router.get("/{item_id}", response_model=Item, summary="Retrieves a specific item by its product_id from our dataset")
-def get_item(item_id: str):
+def get_item(item_id: str, etag: str = Depends(catalog_etag)):
     """
-    This endpoint retrieves a specific item, identified by its product_id
+    This endpoint retrieves a specific item, identified by its product_id. The response carries the catalog ETag,
+    and If-None-Match with that ETag gets a 304 until the catalog changes
 
-    router/Items.py -> services/items_service.py/ItemsService.get_item_by_id(item_id) -> repositories/products_repo.py/ProductsRepo.product_exists(item_id)
-    
-    router/Items.py -> services/items_service.py/ItemsService.get_item_by_id(item_id) -> repositories/products_repo.py/ProductsRepo.load_all()
+    router/Items.py -> services/items_service.py/ItemsService.get_item_by_id(item_id) -> repositories/products_repo.py/ProductsRepo.get_products(item_id)
     
     Args:
         item_id (str): The product_id of the item to be retrieved
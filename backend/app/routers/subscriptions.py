@@ -1,12 +1,14 @@
 from fastapi import APIRouter
 from backend.app.schemas.subscription import SubscriptionCreate
 from backend.app.repositories.subscriptions_repo import SubscriptionsRepo
+from backend.app.services.subscriptions_service import renewal_scheduler
 
 router = APIRouter(prefix="/subscriptions", tags=["Subscriptions"])
 
 @router.post("/create")
 def create_subscripton(data: SubscriptionCreate):
     sub = SubscriptionsRepo.add_subscription(data)
+    renewal_scheduler.schedule(sub)
     return {"message": "Subscription created", "subscription": sub}
 
 @router.get("/{user_id}")
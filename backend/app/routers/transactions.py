@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+import json
 import stripe
 import os
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 from backend.app.repositories.transactions_repo import TransactionsRepo
 from backend.app.services.transactions_service import TransactionsService
+from backend.app.services.stripe_webhook_service import StripeWebhookService
 from backend.app.utils.auth import get_current_user
 from backend.app.utils.stripe_utils import stripe, verify_webhook
 from backend.app.schemas.transaction import PaymentIntentRequest
@@ -85,21 +88,21 @@ def confirm_payment(payment_intent_id: str, current_user=Depends(get_current_use
 @router.post("/webhook/stripe", summary="Handles Stripe webhooks")
 async def stripe_webhook(request: Request):
     """
-    This endpoint handles Stripe webhooks for payment events.
-    routers/transactions.py -> services/transactions_service.py/TransactionsService.fulfill_transaction()
+    This endpoint receives Stripe webhooks for payment events. The verified event is stored and
+    acknowledged right away; fulfilment (stock, cart, receipt email) runs on the Stripe event workers.
+    Redeliveries of an event id that was already received are acknowledged and ignored.
+    routers/transactions.py -> services/stripe_webhook_service.py/StripeWebhookService.ingest()
     Args:
         request (Request): The incoming HTTP request containing the webhook payload.
     Returns:
-        dict: A dictionary indicating the success status of the webhook processing.
+        dict: The status and whether the event was a duplicate delivery.
     """
     payload = await request.body()
     sig_header = request.headers.get("stripe-signature")
-    try:
-        event = verify_webhook(payload, sig_header)
-        TransactionsService.fulfill_transaction(event)
-        return {"status": "success"}
-    except HTTPException as e:
-        raise e
+    verify_webhook(payload, sig_header)
+    # the verified raw body is stored rather than the SDK object, it is plain JSON
+    stored = await run_in_threadpool(StripeWebhookService.ingest, json.loads(payload))
+    return {"status": "success", "duplicate": not stored}
     
 @router.post("/refund/{transaction_id}", summary="Processes refund")
 def process_refund(transaction_id: str, current_user=Depends(get_current_user)):
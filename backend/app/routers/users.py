@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from backend.app.schemas.user import User, UserUpdate, ChangePassword
 from backend.app.services.users_service import UsersService
-from backend.app.repositories.users_repo import UsersRepo
+from backend.app.repositories.users_repo import UsersRepo, DuplicateUserError
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -39,7 +39,10 @@ def put_profile(user_id: str, payload: UserUpdate):
     Returns:
         User: The updated user profile data.
     """
-    updated_user = UsersService.update_user(user_id, payload)
+    try:
+        updated_user = UsersService.update_user(user_id, payload)
+    except DuplicateUserError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not updated_user:
         raise HTTPException(status_code=404, detail="User not found")
     return updated_user
@@ -7,18 +7,18 @@ repo = AdminRepository()
 class AdminService:
 
     def promote_user(self, user_id: int):
-        users = repo.load_users()
+        with repo.users_lock():
+            users = repo.load_users()
 
-        for user in users:
-            if user["user_id"] == user_id:
-                user["isAdmin"] = True
-                repo.save_users(users)
-                return True
+            for user in users:
+                if user["user_id"] == user_id:
+                    user["isAdmin"] = True
+                    repo.save_users(users)
+                    return True
 
-        return False
+            return False
 
     def apply_penalty(self, user_id: int, reason: str, amount: float, status: str):
-        penalties = repo.load_penalties()
         penalty_id = str(uuid.uuid4())
 
         new_penalty = {
@@ -30,8 +30,7 @@ class AdminService:
             "date_issued": datetime.utcnow().isoformat()
         }
 
-        penalties.append(new_penalty)
-        repo.save_penalties(penalties)
+        repo.add_penalty(new_penalty)
 
         return penalty_id
 
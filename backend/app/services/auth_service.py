@@ -1,42 +1,50 @@
-from bcrypt import hashpw, checkpw, gensalt
 from datetime import datetime
 from typing import Optional
-from backend.app.repositories.users_repo import UsersRepo
+from backend.app.repositories.users_repo import UsersRepo, DuplicateUserError
 from backend.app.schemas.user import User, UserCreate
 from backend.app.utils.auth import create_access_token
+from backend.app.utils.passwords import password_hasher
 
 class AuthService:
     def create_user(self, user_data: UserCreate) -> User:
+        # cheap index lookups first, so a taken email or username costs no bcrypt round
         if UsersRepo.get_user_by_email(user_data.email) or UsersRepo.get_user_by_username(user_data.username):
             raise ValueError("User already exists")
         
-        hashed = hashpw(user_data.password.encode('utf-8'), gensalt()).decode('utf-8')
+        hashed = password_hasher.hash(user_data.password)
 
-        new_user = User(
-            user_id=len(UsersRepo.get_all_users()) + 1,
-            username=user_data.username,
-            password=hashed,
-            email=user_data.email,
-            isAdmin=user_data.isAdmin,
-            createdAt=datetime.now().isoformat()
-        )
-
-        UsersRepo.add_user(new_user.model_dump())
-        return new_user
+        try:
+            # the repo issues the user_id and enforces uniqueness under the users lock
+            stored = UsersRepo.add_user({
+                "username": user_data.username,
+                "password": hashed,
+                "email": user_data.email,
+                "isAdmin": user_data.isAdmin,
+                "createdAt": datetime.now().isoformat()
+            })
+        except DuplicateUserError:
+            raise ValueError("User already exists")
+        return User(**stored)
     
     def login(self, email: str, password: str) -> Optional[dict]:
         user_dict = UsersRepo.get_user_by_email(email)
-        if user_dict and checkpw(password.encode('utf-8'), user_dict["password"].encode('utf-8')):
-            token = create_access_token(user_dict["user_id"])
-            return {"access_token": token, "user": User(**user_dict)}
-        return None
+        if not user_dict:
+            return None
+        ok, upgraded = password_hasher.verify_and_upgrade(password, user_dict["password"])
+        if not ok:
+            return None
+        if upgraded:
+            # hashed at a lower cost than the current one: store it at the current cost
+            UsersRepo.update_user(user_dict["user_id"], {"password": upgraded})
+        token = create_access_token(user_dict["user_id"], user_dict.get("isAdmin", False))
+        return {"access_token": token, "user": User(**user_dict)}
     
     def change_password(self, user_id: int, old_password: str, new_password: str):
         user_dict = UsersRepo.get_user_by_id(user_id)
         if not user_dict:
             raise ValueError("User not found")
-        if not checkpw(old_password.encode('utf-8'), user_dict["password"].encode('utf-8')):
+        if not password_hasher.verify(old_password, user_dict["password"]):
             raise ValueError("Incorrect password")
-        new_hashed = hashpw(new_password.encode('utf-8'), gensalt()).decode('utf-8')
+        new_hashed = password_hasher.hash(new_password)
         UsersRepo.update_user(user_id, {"password": new_hashed})
 
@@ -1,22 +1,27 @@
 import os
-import requests
 import time
+from backend.app.repositories.email_outbox_repo import EmailOutboxRepo
+from backend.app.utils.http_client import sendgrid, CircuitOpenError
+from backend.app.utils.background import BackgroundWorkers
 
 SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
 EMAIL_FROM = os.getenv("EMAIL_FROM")
 EMAIL_REPLY_TO = os.getenv("EMAIL_REPLY_TO")
 
-SENDGRID_URL = "https://api.sendgrid.com/v3/mail/send"
+SENDGRID_URL = os.getenv("SENDGRID_URL", "https://api.sendgrid.com/v3/mail/send")
 
-class EmailService:
+# outbox delivery
+EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", "2"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+EMAIL_BACKOFF_BASE = float(os.getenv("EMAIL_BACKOFF_BASE", "2"))
+EMAIL_BACKOFF_MAX = float(os.getenv("EMAIL_BACKOFF_MAX", "300"))
+EMAIL_POLL_INTERVAL = float(os.getenv("EMAIL_POLL_INTERVAL", "1"))
+EMAIL_LEASE_SECONDS = float(os.getenv("EMAIL_LEASE_SECONDS", "60"))
 
-    def send_email(to_email: str, subject: str, html_body: str, retries=3):
-        headers = {
-            "Authorization": f"Bearer {SENDGRID_API_KEY}",
-            "Content-Type": "application/json"
-        }
+class EmailService:
 
-        payload = {
+    def _payload(to_email: str, subject: str, html_body: str) -> dict:
+        return {
             "personalizations": [{
                 "to": [{"email": to_email}]
             }],
@@ -29,8 +34,18 @@ class EmailService:
             }]
         }
 
+    def _headers() -> dict:
+        return {
+            "Authorization": f"Bearer {SENDGRID_API_KEY}",
+            "Content-Type": "application/json"
+        }
+
+    def send_email(to_email: str, subject: str, html_body: str, retries=3):
+        """Sends right away and blocks until SendGrid accepts it; request handlers should use enqueue_email."""
+        payload = EmailService._payload(to_email, subject, html_body)
+
         for _ in range(retries):
-            response = requests.post(SENDGRID_URL, headers=headers, json=payload)
+            response = sendgrid.post(SENDGRID_URL, headers=EmailService._headers(), json=payload)
 
             if response.status_code in (200, 202):
                 return True
@@ -38,3 +53,65 @@ class EmailService:
             time.sleep(1)
 
         raise RuntimeError(f"Email failed after {retries} attempts: {response.text}")
+
+    def enqueue_email(to_email: str, subject: str, html_body: str) -> str:
+        """Stores the email in the outbox for the delivery workers and returns its id."""
+        message = EmailOutboxRepo.enqueue(to_email, subject, html_body)
+        outbox_workers.wake()
+        return message["id"]
+
+    def deliver(message: dict) -> None:
+        """One delivery attempt for an outbox message; raises if SendGrid does not accept it."""
+        response = sendgrid.post(
+            SENDGRID_URL,
+            headers=EmailService._headers(),
+            json=EmailService._payload(message["to_email"], message["subject"], message["html_body"])
+        )
+        if response.status_code not in (200, 202):
+            raise RuntimeError(f"SendGrid answered {response.status_code}: {response.text[:200]}")
+
+    def backoff(attempts: int) -> float:
+        """Seconds to wait before the next attempt: 2, 4, 8, ... capped at EMAIL_BACKOFF_MAX."""
+        return min(EMAIL_BACKOFF_BASE ** attempts, EMAIL_BACKOFF_MAX)
+
+
+class EmailOutboxWorkers(BackgroundWorkers):
+    """
+    Background threads draining the email outbox.
+
+    Each worker claims due messages, tries to deliver them once, and either deletes
+    them, schedules a retry with exponential backoff, or after EMAIL_MAX_ATTEMPTS
+    moves them to the dead letter store. Enqueueing wakes an idle worker, so mail goes
+    out right after the request that queued it without the request waiting for it.
+    """
+
+    name = "email-outbox"
+
+    @property
+    def poll_interval(self) -> float:
+        return EMAIL_POLL_INTERVAL
+
+    def process_once(self, limit: int = 10) -> int:
+        """Claims and handles one batch of due messages; returns how many were handled."""
+        messages = EmailOutboxRepo.claim_due(limit, EMAIL_LEASE_SECONDS)
+        for message in messages:
+            try:
+                EmailService.deliver(message)
+            except CircuitOpenError as e:
+                # SendGrid is known to be down, wait for the breaker without using up an attempt
+                EmailOutboxRepo.retry_later(message["id"], message["attempts"], time.time() + e.retry_after, e.detail)
+            except Exception as e:
+                attempts = message["attempts"] + 1
+                if attempts >= EMAIL_MAX_ATTEMPTS:
+                    EmailOutboxRepo.dead_letter({**message, "attempts": attempts}, str(e))
+                else:
+                    EmailOutboxRepo.retry_later(message["id"], attempts, time.time() + EmailService.backoff(attempts), str(e))
+            else:
+                EmailOutboxRepo.mark_sent(message["id"])
+        return len(messages)
+
+    def start(self, count: int = EMAIL_WORKERS) -> None:
+        super().start(count)
+
+
+outbox_workers = EmailOutboxWorkers()
@@ -1,125 +1,149 @@
 import uuid
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator
 from fastapi import HTTPException
 from backend.app.schemas.item import Item, ItemCreate, ItemUpdate
 from backend.app.repositories.products_repo import ProductsRepo
+from backend.app.services.receipt_service import ReceiptService
 
 class ItemsService:
 
     def list_items():
         return ProductsRepo.load_all()
 
+    def list_page(cursor: str | None, limit: int):
+        return ProductsRepo.page(cursor, limit)
+
+    def iter_items() -> Iterator[Dict[str, Any]]:
+        return ProductsRepo.iter_products()
+
+    def project(items: Iterable[Dict[str, Any]], fields: str | None, allowed) -> Iterable[Dict[str, Any]]:
+        """
+        Keeps only the comma separated `fields` of each item, e.g. fields="product_id,product_name".
+        Unknown fields are rejected up front; the items themselves are projected lazily.
+        """
+        if not fields:
+            return items
+        wanted = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in wanted if f not in allowed]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown field(s): {', '.join(unknown)}")
+        return ({f: it.get(f) for f in wanted} for it in items)
+
     def create_item(payload: ItemCreate) -> Item:
-        items = ProductsRepo.load_all()
-        new_id = str(uuid.uuid4())
-        if any(it.get("product_id") == new_id for it in items):  # extremely unlikely, but consistent check
-            raise HTTPException(status_code=409, detail="ID collision; retry.")
+        with ProductsRepo.lock():
+            items = ProductsRepo.load_all()
+            new_id = str(uuid.uuid4())
+            if any(it.get("product_id") == new_id for it in items):  # extremely unlikely, but consistent check
+                raise HTTPException(status_code=409, detail="ID collision; retry.")
         
-        new_item = Item(
-            product_id=new_id,
-            product_name=payload.product_name,
-            category=payload.category,
-            discounted_price=payload.discounted_price,
-            actual_price=payload.actual_price,
-            discount_percentage=payload.discount_percentage,
-            rating=payload.rating,
-            rating_count=payload.rating_count,
-            about_product=payload.about_product,
-            user_id=payload.user_id,
-            user_name=payload.user_name,
-            review_id=payload.review_id,
-            review_title=payload.review_title,
-            review_content=payload.review_content,
-            img_link=payload.img_link,
-            product_link=payload.product_link,
-            quantity=payload.quantity
-        )
-
-        items.append(new_item.model_dump())
-        ProductsRepo.save_all(items)
-        return new_item
+            new_item = Item(
+                product_id=new_id,
+                product_name=payload.product_name,
+                category=payload.category,
+                discounted_price=payload.discounted_price,
+                actual_price=payload.actual_price,
+                discount_percentage=payload.discount_percentage,
+                rating=payload.rating,
+                rating_count=payload.rating_count,
+                about_product=payload.about_product,
+                user_id=payload.user_id,
+                user_name=payload.user_name,
+                review_id=payload.review_id,
+                review_title=payload.review_title,
+                review_content=payload.review_content,
+                img_link=payload.img_link,
+                product_link=payload.product_link,
+                quantity=payload.quantity
+            )
+
+            items.append(new_item.model_dump())
+            ProductsRepo.save_all(items)
+            ReceiptService.prewarm_images([new_item.img_link])
+            return new_item
 
     def get_item_by_id(item_id: str) -> Item:
-        if not ProductsRepo.product_exists(item_id):
+        it = ProductsRepo.get_products(item_id)
+        if not it:
             raise HTTPException(status_code=404, detail=f"Item '{item_id}' not found")
 
-        items = ProductsRepo.load_all()
-        for it in items:
-            if it.get("product_id") == item_id:
-                return Item(
-                    product_id=it.get("product_id"),
-                    product_name=it.get("product_name"),
-                    category=it.get("category"),
-                    discounted_price=it.get("discounted_price"),
-                    actual_price=it.get("actual_price"),
-                    discount_percentage=it.get("discount_percentage"),
-                    rating=it.get("rating"),
-                    rating_count=it.get("rating_count"),
-                    about_product=it.get("about_product"),
-                    user_id=it.get("user_id"),
-                    user_name=it.get("user_name"),
-                    review_id=it.get("review_id"),
-                    review_title=it.get("review_title"),
-                    review_content=it.get("review_content"),
-                    img_link=it.get("img_link"),
-                    product_link=it.get("product_link"),
-                    quantity=it.get("quantity")
-                )
+        return Item(
+            product_id=it.get("product_id"),
+            product_name=it.get("product_name"),
+            category=it.get("category"),
+            discounted_price=it.get("discounted_price"),
+            actual_price=it.get("actual_price"),
+            discount_percentage=it.get("discount_percentage"),
+            rating=it.get("rating"),
+            rating_count=it.get("rating_count"),
+            about_product=it.get("about_product"),
+            user_id=it.get("user_id"),
+            user_name=it.get("user_name"),
+            review_id=it.get("review_id"),
+            review_title=it.get("review_title"),
+            review_content=it.get("review_content"),
+            img_link=it.get("img_link"),
+            product_link=it.get("product_link"),
+            quantity=it.get("quantity")
+        )
 
     def update_item(item_id: str, payload: ItemUpdate) -> Item:
-        if not ProductsRepo.product_exists(item_id):
-            raise HTTPException(status_code=404, detail=f"Item '{item_id}' not found")
-
-        items = ProductsRepo.load_all()
-        for idx, it in enumerate(items):
-            if it.get("product_id") == item_id:
-                updated = Item(
-                    product_id=item_id,
-                    product_name=payload.product_name,
-                    category=payload.category,
-                    discounted_price=payload.discounted_price,
-                    actual_price=payload.actual_price,
-                    discount_percentage=payload.discount_percentage,
-                    rating=payload.rating,
-                    rating_count=payload.rating_count,
-                    about_product=payload.about_product,
-                    user_id=payload.user_id,
-                    user_name=payload.user_name,
-                    review_id=payload.review_id,
-                    review_title=payload.review_title,
-                    review_content=payload.review_content,
-                    img_link=payload.img_link,
-                    product_link=payload.product_link,
-                    quantity=payload.quantity
-                )
-
-                items[idx] = updated.model_dump()
-                ProductsRepo.save_all(items)
-
-                return updated
+        with ProductsRepo.lock():
+            if not ProductsRepo.product_exists(item_id):
+                raise HTTPException(status_code=404, detail=f"Item '{item_id}' not found")
+
+            items = ProductsRepo.load_all()
+            for idx, it in enumerate(items):
+                if it.get("product_id") == item_id:
+                    updated = Item(
+                        product_id=item_id,
+                        product_name=payload.product_name,
+                        category=payload.category,
+                        discounted_price=payload.discounted_price,
+                        actual_price=payload.actual_price,
+                        discount_percentage=payload.discount_percentage,
+                        rating=payload.rating,
+                        rating_count=payload.rating_count,
+                        about_product=payload.about_product,
+                        user_id=payload.user_id,
+                        user_name=payload.user_name,
+                        review_id=payload.review_id,
+                        review_title=payload.review_title,
+                        review_content=payload.review_content,
+                        img_link=payload.img_link,
+                        product_link=payload.product_link,
+                        quantity=payload.quantity
+                    )
+
+                    items[idx] = updated.model_dump()
+                    ProductsRepo.save_all(items)
+
+                    ReceiptService.prewarm_images([updated.img_link])
+                    return updated
             
     def delete_item(item_id: str) -> None:
-        if not ProductsRepo.product_exists(item_id):
-            raise HTTPException(status_code=404, detail=f"Item '{item_id}' not found")
+        with ProductsRepo.lock():
+            if not ProductsRepo.product_exists(item_id):
+                raise HTTPException(status_code=404, detail=f"Item '{item_id}' not found")
 
-        items = ProductsRepo.load_all()
-        new_items = [it for it in items if it.get("product_id") != item_id]
+            items = ProductsRepo.load_all()
+            new_items = [it for it in items if it.get("product_id") != item_id]
         
-        if len(new_items) == len(items):
-            raise HTTPException(status_code=404, detail=f"Item '{item_id}' not found")
+            if len(new_items) == len(items):
+                raise HTTPException(status_code=404, detail=f"Item '{item_id}' not found")
         
-        ProductsRepo.save_all(new_items)
+            ProductsRepo.save_all(new_items)
 
     def update_quantity(item_id: str, quantity: int):
-        items = ProductsRepo.load_products()
+        with ProductsRepo.lock():
+            items = ProductsRepo.load_products()
 
-        for item in items:
-            if item.get("product_id") == item_id:
-                item["quantity"] = quantity
-                ProductsRepo.save_all(items)
-                return item
+            for idx, item in enumerate(items):
+                if item.get("product_id") == item_id:
+                    items[idx] = {**item, "quantity": quantity}
+                    ProductsRepo.save_all(items)
+                    return items[idx]
 
-        raise HTTPException(status_code=404, detail=f"Item '{item_id}' not found")
+            raise HTTPException(status_code=404, detail=f"Item '{item_id}' not found")
 
     def build_transaction_item(product: Item, quantity: int = 1) -> dict:
         actual_price = product.actual_price
@@ -0,0 +1,115 @@
+from datetime import datetime
+from typing import List, Dict, Any
+from fastapi import HTTPException
+
+TAX_RATE = 0.12
+
+
+def parse_price(price_str: str) -> float:
+    if not price_str:
+        return 0.0
+    return float(str(price_str).replace("$", "").replace(",", "").strip())
+
+
+class PricedCart:
+    """
+    A cart whose lines have been resolved against the catalog and priced once.
+
+    Built from the cart lines plus a {product_id: product} map fetched in one batch,
+    it carries the priced lines, subtotal, tax and total and is reused by the cart
+    summary, the stock check before a payment intent and the receipt, so none of
+    them look products up or redo the arithmetic again.
+    """
+
+    def __init__(self, user_id: int, cart_items: List[Dict[str, Any]], products: Dict[str, Dict[str, Any]],
+                 currency: str = "cad"):
+        self.user_id = user_id
+        self.currency = currency.lower()
+        self.products = products
+        self.lines: List[Dict[str, Any]] = []
+        self.missing: List[str] = []
+
+        subtotal = 0.0
+        for item in cart_items:
+            product_id = str(item["product_id"]).strip()
+            quantity = item["quantity"]
+            product = products.get(product_id)
+            if not product:
+                self.missing.append(product_id)
+                continue
+
+            price_per_unit = parse_price(product.get("discounted_price"))
+            line_total = round(price_per_unit * quantity, 2)
+            subtotal += line_total
+
+            self.lines.append({
+                "product_id": product_id,
+                "name": product.get("product_name", "Unknown product"),
+                "quantity": quantity,
+                "price_per_unit": price_per_unit,
+                "subtotal": line_total,
+                "actual_price": parse_price(product.get("actual_price")),
+                "discount": product.get("discount_percentage"),
+                "category": product.get("category"),
+                "rating": product.get("rating"),
+                "rating_count": product.get("rating_count"),
+                "image": product.get("img_link"),
+            })
+
+        self.subtotal = round(subtotal, 2)
+        self.tax = round(self.subtotal * TAX_RATE, 2)
+        self.total = round(self.subtotal + self.tax, 2)
+
+    def summary(self) -> Dict[str, Any]:
+        """Cart summary; products that no longer exist are left out."""
+        return {
+            "user_id": self.user_id,
+            "items": self.lines,
+            "subtotal": self.subtotal,
+            "tax": self.tax,
+            "total": self.total,
+            "currency": self.currency
+        }
+
+    def quantities(self) -> Dict[str, int]:
+        """{product_id: quantity} over the priced lines, lines for the same product summed."""
+        wanted = {}
+        for line in self.lines:
+            wanted[line["product_id"]] = wanted.get(line["product_id"], 0) + line["quantity"]
+        return wanted
+
+    def check_stock(self, held: Dict[str, int] | None = None,
+                    products: Dict[str, Dict[str, Any]] | None = None) -> None:
+        """
+        Raises 400 if a line's product is gone or has less stock than the cart asks for.
+        held: units of each product already reserved by other payments in progress.
+        products: current {product_id: product} to check stock against; defaults to the
+        products the cart was priced from.
+        """
+        if self.missing:
+            raise HTTPException(400, f"Product {self.missing[0]} is no longer available")
+
+        held = held or {}
+        products = self.products if products is None else products
+        names = {line["product_id"]: line["name"] for line in self.lines}
+        for product_id, quantity in self.quantities().items():
+            if product_id not in products:
+                raise HTTPException(400, f"Product {product_id} is no longer available")
+            stock = int(products[product_id].get("quantity", 0) or 0)
+            available_stock = max(0, stock - held.get(product_id, 0))
+            if quantity > available_stock:
+                raise HTTPException(400, f"Insufficient stock for {names[product_id]}. Only {available_stock} left.")
+
+    def order(self) -> Dict[str, Any]:
+        """Order used for receipts; every product in the cart must still exist."""
+        if self.missing:
+            raise ValueError(f"Product '{self.missing[0]}' does not exist")
+
+        return {
+            "user_id": self.user_id,
+            "items": [dict(line) for line in self.lines],
+            "subtotal": self.subtotal,
+            "tax": self.tax,
+            "total": self.total,
+            "timestamp": datetime.now().isoformat()
+        }
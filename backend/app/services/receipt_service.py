@@ -1,14 +1,38 @@
 import hashlib
+import os
 import secrets
-import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
+from typing import Dict, Iterable
 from backend.app.repositories.users_repo import UsersRepo
 from backend.app.repositories.cart_repo import CartRepo
 from backend.app.repositories.products_repo import ProductsRepo
+from backend.app.services.pricing_service import PricedCart, TAX_RATE
+from backend.app.utils.ttl_cache import TTLCache
+from backend.app.utils.http_client import image_cdn
+
+IMAGE_CHECK_TIMEOUT = float(os.getenv("RECEIPT_IMAGE_TIMEOUT", "2"))
+IMAGE_CHECK_WORKERS = int(os.getenv("RECEIPT_IMAGE_WORKERS", "16"))
+IMAGE_CACHE_TTL = float(os.getenv("RECEIPT_IMAGE_CACHE_TTL", "3600"))
+# a failed check is retried sooner, the image host may just have been slow
+IMAGE_MISS_TTL = float(os.getenv("RECEIPT_IMAGE_MISS_TTL", "60"))
+
+image_cache = TTLCache(maxsize=10000, ttl=IMAGE_CACHE_TTL)
+_image_pool = ThreadPoolExecutor(max_workers=IMAGE_CHECK_WORKERS, thread_name_prefix="receipt-images")
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def _forget_in_flight(url: str, future) -> None:
+    # only our own entry: a newer check for the url may have replaced it meanwhile
+    with _in_flight_lock:
+        if _in_flight.get(url) is future:
+            del _in_flight[url]
 
 class ReceiptService:
 
-    TAX_RATE = 0.12
+    TAX_RATE = TAX_RATE
 
     def validate_user_email(user_id: int) -> str:
         user = UsersRepo.get_user_by_id(user_id)
@@ -22,72 +46,81 @@ class ReceiptService:
         return email
 
     def image_exists(url: str) -> bool:
+        cached = image_cache.get(url)
+        if cached is not None:
+            return cached
+
         try:
-            r = requests.head(url, timeout=2)
-            return r.status_code == 200
+            r = image_cdn.head(url)
+            exists = r.status_code == 200
         except:
-            return False
-
-    def build_order(user_id: int) -> dict:
-        cart = CartRepo.get_cart(user_id)
-        if not cart or len(cart.get("items", [])) == 0:
+            exists = False
+
+        image_cache.set(url, exists, None if exists else IMAGE_MISS_TTL)
+        return exists
+
+    def _check_in_background(url: str):
+        # one request per url at a time, however many checkouts want it
+        with _in_flight_lock:
+            future = _in_flight.get(url)
+            if future is not None:
+                return future
+            future = _in_flight[url] = _image_pool.submit(ReceiptService.image_exists, url)
+        # outside the lock: a check that already finished runs the callback right here
+        future.add_done_callback(lambda done: _forget_in_flight(url, done))
+        return future
+
+    def check_images(urls: Iterable[str]) -> Dict[str, bool]:
+        """
+        Checks every url at once on the image thread pool and waits at most about one
+        IMAGE_CHECK_TIMEOUT for all of them; cached answers cost nothing. A check that
+        has not finished by then counts as missing (the receipt shows "No Image") and
+        still lands in the cache for the next order.
+        """
+        results, pending = {}, {}
+        for url in set(urls):
+            if not url:
+                results[url] = False
+                continue
+            cached = image_cache.get(url)
+            if cached is not None:
+                results[url] = cached
+            else:
+                pending[url] = ReceiptService._check_in_background(url)
+
+        if pending:
+            wait(pending.values(), timeout=IMAGE_CHECK_TIMEOUT + 0.5)
+        for url, future in pending.items():
+            results[url] = future.result() if future.done() else False
+        return results
+
+    def prewarm_images(urls: Iterable[str]) -> None:
+        """Starts checks for product images ahead of checkout, without waiting for them."""
+        for url in urls:
+            if url and str(url).startswith(("http://", "https://")) and image_cache.get(url) is None:
+                ReceiptService._check_in_background(url)
+
+    def build_order(user_id: int, priced: PricedCart | None = None) -> dict:
+        """
+        Receipt order for the user's cart. Pass the PricedCart the caller already has
+        to reuse its lookups and totals; otherwise the cart is priced here.
+        """
+        if priced is None:
+            cart = CartRepo.get_cart(user_id)
+            if not cart or len(cart.get("items", [])) == 0:
+                raise ValueError("Cart is empty")
+            products = ProductsRepo.get_many([str(item["product_id"]).strip() for item in cart["items"]])
+            priced = PricedCart(user_id, cart["items"], products)
+
+        if not priced.lines and not priced.missing:
             raise ValueError("Cart is empty")
 
-        products = ProductsRepo.load_products()
-
-        product_lookup = {}
-        for p in products:
-            product_id = str(p.get("product_id", "")).strip()
-            if product_id:
-                product_lookup[product_id] = p
-
-        items = []
-        subtotal = 0
-
-        for item in cart["items"]:
-            product_id = str(item["product_id"]).strip()
-
-            if product_id not in product_lookup:
-                raise ValueError(f"Product '{product_id}' does not exist")
-
-            product = product_lookup[product_id]
-
-            quantity = item["quantity"]
-
-            discounted_price_str = product.get("discounted_price", "$0").replace("$", "").replace(",", "")
-            price_per_unit = float(discounted_price_str)
-
-            line_total = round(price_per_unit * quantity, 2)
-            subtotal += line_total
-
-            image_url = product.get("img_link", "")
-            image_valid = ReceiptService.image_exists(image_url)
-
-            items.append({
-                "product_id": product_id,
-                "name": product.get("product_name", "Unknown product"),
-                "quantity": quantity,
-                "price_per_unit": price_per_unit,
-                "subtotal": line_total,
-                "actual_price": product.get("actual_price", ""),
-                "discount": product.get("discount_percentage", ""),
-                "category": product.get("category", ""),
-                "rating": product.get("rating", ""),
-                "rating_count": product.get("rating_count", ""),
-                "image": image_url if image_valid else None,
-            })
-
-        tax = round(subtotal * ReceiptService.TAX_RATE, 2)
-        total = round(subtotal + tax, 2)
-
-        return {
-            "user_id": user_id,
-            "items": items,
-            "subtotal": subtotal,
-            "tax": tax,
-            "total": total,
-            "timestamp": datetime.now().isoformat()
-        }
+        order = priced.order()
+        found = ReceiptService.check_images(item["image"] or "" for item in order["items"])
+        for item in order["items"]:
+            image_url = item["image"] or ""
+            item["image"] = image_url if found[image_url] else None
+        return order
 
     def generate_receipt_hash(order: dict) -> str:
         raw = f"{order['user_id']}{order['total']}{order['timestamp']}"
@@ -116,7 +149,7 @@ class ReceiptService:
                     <small>Category: {item['category']}</small><br>
                     <small>Rating: {item['rating']} ⭐ ({item['rating_count']} reviews)</small><br>
                     <small>Discount: {item['discount']}</small><br>
-                    <small>Original Price: {item['actual_price']}</small>
+                    <small>Original Price: ${item['actual_price']}</small>
                 </td>
 
                 <td style="text-align:center;">{item['quantity']}</td>
@@ -0,0 +1,75 @@
+import os
+import time
+from typing import Callable, List, Dict, Any
+from backend.app.repositories.reservations_repo import ReservationsRepo
+
+STOCK_RESERVATION_TTL = float(os.getenv("STOCK_RESERVATION_TTL", "900"))
+
+
+class ReservationTable:
+    """
+    Stock held for payments in progress: product_id -> quantity held, with an expiry.
+
+    A payment intent reserves its cart lines; the stock check sees stock minus what is
+    already held, and check plus hold happen under the reservations' cross-process
+    lock, so two buyers can never both get the last unit, whichever workers serve them.
+    Finalizing the order confirms (drops) the hold once the real stock has been
+    decremented; a cancelled payment releases it, and one that is never paid expires.
+
+    Holds live in the stock_reservations collection (a journal on the json backend),
+    so any worker can confirm or release them. Only payments in flight are stored and
+    expired holds are dropped on the next reserve, so the collection stays small and
+    totals are summed from it on each call. Expiry uses wall-clock time, which every
+    worker shares.
+    """
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+
+    def _active(self, now: float) -> List[Dict[str, Any]]:
+        return [r for r in ReservationsRepo.load() if r["expires_at"] > now]
+
+    @staticmethod
+    def _held(active: List[Dict[str, Any]]) -> Dict[str, int]:
+        held: Dict[str, int] = {}
+        for reservation in active:
+            for product_id, quantity in reservation["quantities"].items():
+                held[product_id] = held.get(product_id, 0) + quantity
+        return {product_id: quantity for product_id, quantity in held.items() if quantity > 0}
+
+    def reserve(self, key: str, quantities: Dict[str, int], check: Callable[[Dict[str, int]], None],
+                ttl: float | None = None) -> None:
+        """
+        Holds `quantities` under `key`. `check` gets {product_id: quantity already held}
+        for these products and raises if the cart cannot be served; nothing is held then.
+        """
+        with ReservationsRepo.lock():
+            now = self._clock()
+            stored = ReservationsRepo.load()
+            held = self._held([r for r in stored if r["expires_at"] > now])
+            check({product_id: held.get(product_id, 0) for product_id in quantities})
+            ReservationsRepo.delete_many([r["id"] for r in stored if r["expires_at"] <= now or r["id"] == key])
+            ReservationsRepo.add(key, quantities, now + (STOCK_RESERVATION_TTL if ttl is None else ttl))
+
+    def confirm(self, key: str) -> bool:
+        """The order was fulfilled and stock decremented; the hold is no longer needed."""
+        return ReservationsRepo.delete(key)
+
+    def release(self, key: str) -> bool:
+        """The payment was cancelled; its units are available again."""
+        return ReservationsRepo.delete(key)
+
+    def held(self, product_id: str) -> int:
+        return self._held(self._active(self._clock())).get(product_id, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        active = self._active(self._clock())
+        held = self._held(active)
+        return {
+            "reservations": len(active),
+            "products_held": len(held),
+            "units_held": sum(held.values())
+        }
+
+
+reservations = ReservationTable()
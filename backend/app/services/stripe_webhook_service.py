@@ -0,0 +1,78 @@
+import os
+import time
+from typing import Dict, Any
+from backend.app.repositories.stripe_events_repo import StripeEventsRepo
+from backend.app.services.transactions_service import TransactionsService
+from backend.app.utils.background import BackgroundWorkers
+
+STRIPE_EVENT_WORKERS = int(os.getenv("STRIPE_EVENT_WORKERS", "1"))
+STRIPE_EVENT_MAX_ATTEMPTS = int(os.getenv("STRIPE_EVENT_MAX_ATTEMPTS", "8"))
+STRIPE_EVENT_BACKOFF_MAX = float(os.getenv("STRIPE_EVENT_BACKOFF_MAX", "600"))
+STRIPE_EVENT_POLL_INTERVAL = float(os.getenv("STRIPE_EVENT_POLL_INTERVAL", "1"))
+STRIPE_EVENT_LEASE_SECONDS = float(os.getenv("STRIPE_EVENT_LEASE_SECONDS", "120"))
+# Stripe redelivers for up to 3 days, processed ids are remembered a bit longer than that
+STRIPE_EVENT_RETENTION = float(os.getenv("STRIPE_EVENT_RETENTION_DAYS", "7")) * 86400
+
+class StripeWebhookService:
+
+    def ingest(event: Dict[str, Any]) -> bool:
+        """
+        Records a verified webhook event for the workers and returns right away.
+        Returns False for an event id that was already received (a Stripe retry).
+        """
+        stored = StripeEventsRepo.record(event)
+        if stored:
+            stripe_event_workers.wake()
+        return stored
+
+    def process(stored: Dict[str, Any]) -> None:
+        TransactionsService.fulfill_transaction(stored["event"])
+
+    def backoff(attempts: int) -> float:
+        return min(2 ** attempts, STRIPE_EVENT_BACKOFF_MAX)
+
+
+class StripeEventWorkers(BackgroundWorkers):
+    """
+    Background threads fulfilling received Stripe events in the order they arrived.
+
+    A failed event is retried with exponential backoff and after STRIPE_EVENT_MAX_ATTEMPTS
+    marked failed. Processed events older than STRIPE_EVENT_RETENTION are pruned when
+    the workers are idle.
+    """
+
+    name = "stripe-events"
+
+    def __init__(self):
+        super().__init__()
+        self._last_prune = 0.0
+
+    @property
+    def poll_interval(self) -> float:
+        return STRIPE_EVENT_POLL_INTERVAL
+
+    def process_once(self, limit: int = 10) -> int:
+        """Claims and handles one batch of due events; returns how many were handled."""
+        events = StripeEventsRepo.claim_due(limit, STRIPE_EVENT_LEASE_SECONDS)
+        for stored in events:
+            try:
+                StripeWebhookService.process(stored)
+            except Exception as e:
+                attempts = stored["attempts"] + 1
+                if attempts >= STRIPE_EVENT_MAX_ATTEMPTS:
+                    StripeEventsRepo.mark_failed(stored["id"], attempts, str(e))
+                else:
+                    StripeEventsRepo.retry_later(stored["id"], attempts, time.time() + StripeWebhookService.backoff(attempts), str(e))
+            else:
+                StripeEventsRepo.mark_processed(stored["id"])
+
+        if not events and time.time() - self._last_prune > 3600:
+            self._last_prune = time.time()
+            StripeEventsRepo.prune(time.time() - STRIPE_EVENT_RETENTION)
+        return len(events)
+
+    def start(self, count: int = STRIPE_EVENT_WORKERS) -> None:
+        super().start(count)
+
+
+stripe_event_workers = StripeEventWorkers()
@@ -1,31 +1,225 @@
+import heapq
+import os
+import threading
+from datetime import datetime
+from typing import List, Dict, Any
 from backend.app.repositories.subscriptions_repo import SubscriptionsRepo
 from backend.app.repositories.transactions_repo import TransactionsRepo
 from backend.app.repositories.products_repo import ProductsRepo
-from backend.app.services.items_service import ItemsService
-from datetime import datetime, timedelta
+from backend.app.services.pricing_service import PricedCart
 
-def process_subscriptions():
-    subs = SubscriptionsRepo.get_active_subscriptions()
+SUBSCRIPTION_SCHEDULER = os.getenv("SUBSCRIPTION_SCHEDULER", "1") == "1"
+RENEWAL_BATCH_SIZE = int(os.getenv("RENEWAL_BATCH_SIZE", "100"))
+# longest sleep between checks for subscriptions written by other worker processes
+RENEWAL_RESYNC_INTERVAL = float(os.getenv("RENEWAL_RESYNC_INTERVAL", "30"))
 
-    for s in subs:
-        product = ProductsRepo.get_product_by_id(s["product_id"])
-        
-        if not product:
-            continue
-
-        item_entry = ItemsService.build_transaction_item(product, quantity=1)
 
-        transaction = {
+def renewal_transactions(due: List[Dict[str, Any]], now: datetime) -> List[Dict[str, Any]]:
+    """One pending transaction per due subscription whose product still exists."""
+    products = ProductsRepo.get_many({str(s["product_id"]) for s in due})
+    transactions = []
+    for s in due:
+        priced = PricedCart(s["user_id"], [{"product_id": s["product_id"], "quantity": 1}], products)
+        if not priced.lines:
+            print(f"Subscription {s['id']}: product {s['product_id']} no longer exists, renewal skipped")
+            continue
+        transactions.append({
             "user_id": s["user_id"],
-            "amount": item_entry["subtotal"],
-            "currency": "CAD", 
-            "items": [item_entry],
+            "subscription_id": s["id"],
+            "amount": priced.subtotal,
+            "currency": "CAD",
+            "items": priced.lines,
             "status": "pending",
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        TransactionsRepo.add_transaction(transaction)
-
-        next_date = datetime.now() + timedelta(days=s["interval_days"])
-        s["next_renewal"] = next_date.isoformat()
-        SubscriptionsRepo.update_subscription(s)
\ No newline at end of file
+            "timestamp": now.isoformat()
+        })
+    return transactions
+
+
+def renew_subscriptions(ids, now: datetime | None = None) -> List[Dict[str, Any]]:
+    """Renews the due subscriptions among ids: one transactions append and one subscriptions write."""
+    now = now or datetime.now()
+    return SubscriptionsRepo.renew_due(
+        ids, now, lambda due: TransactionsRepo.add_transactions(renewal_transactions(due, now))
+    )
+
+
+def process_subscriptions(now: datetime | None = None) -> int:
+    """Renews every subscription due now, in batches of RENEWAL_BATCH_SIZE. Returns how many were renewed."""
+    now = now or datetime.now()
+    ids = [s["id"] for s in SubscriptionsRepo.get_active_subscriptions(now)]
+    renewed = 0
+    for i in range(0, len(ids), RENEWAL_BATCH_SIZE):
+        renewed += len(renew_subscriptions(ids[i:i + RENEWAL_BATCH_SIZE], now))
+    return renewed
+
+
+class RenewalScheduler:
+    """
+    Renews subscriptions when they fall due, on a thread started with the app.
+
+    Active subscriptions sit in a min-heap keyed by next_renewal, so the thread sleeps
+    until the earliest one is due (or until schedule() brings a new earliest one) and
+    a wake-up only looks at what is due. Due subscriptions are renewed in batches of
+    `batch_size`: one transactions append and one subscriptions write per batch.
+
+    The heap is built from storage on start and rebuilt whenever the subscriptions
+    signature changes behind it (a write by another worker process), which is checked
+    at least every `resync_interval` seconds. Renewal re-checks the stored
+    next_renewal under the subscriptions lock, so when several workers run a
+    scheduler each renewal is still charged once.
+    """
+
+    name = "subscription-renewals"
+
+    def __init__(self, clock=datetime.now, batch_size: int = RENEWAL_BATCH_SIZE,
+                 resync_interval: float = RENEWAL_RESYNC_INTERVAL):
+        self._clock = clock
+        self.batch_size = batch_size
+        self.resync_interval = resync_interval
+        self._heap = []
+        self._due_at: Dict[Any, datetime] = {}
+        self._seen = None
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._renewed = 0
+        self._batches = 0
+        self._last_batch = 0
+        self._last_lag = 0.0
+        self._max_lag = 0.0
+        self._last_run = None
+
+    def _push(self, subscription: Dict[str, Any]) -> None:
+        sid = subscription["id"]
+        if not subscription.get("active"):
+            self._due_at.pop(sid, None)
+            return
+        due = datetime.fromisoformat(subscription["next_renewal"])
+        self._due_at[sid] = due
+        heapq.heappush(self._heap, (due, sid))
+
+    def _top(self):
+        # heap entries whose subscription was renewed, rescheduled or dropped since are skipped
+        while self._heap and self._due_at.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0] if self._heap else None
+
+    def load(self) -> None:
+        """Rebuilds the heap from storage."""
+        signature = SubscriptionsRepo.signature()
+        subs = SubscriptionsRepo.load_subscriptions()
+        with self._cond:
+            self._due_at = {
+                s["id"]: datetime.fromisoformat(s["next_renewal"]) for s in subs if s.get("active")
+            }
+            self._heap = [(due, sid) for sid, due in self._due_at.items()]
+            heapq.heapify(self._heap)
+            self._seen = signature if SubscriptionsRepo.signature() == signature else None
+            self._cond.notify_all()
+
+    def schedule(self, subscription: Dict[str, Any]) -> None:
+        """Adds or moves a subscription; wakes the thread if it is now the earliest."""
+        with self._cond:
+            self._push(subscription)
+            self._cond.notify_all()
+
+    def _pop_due(self, now: datetime) -> List[tuple]:
+        batch = []
+        with self._cond:
+            while len(batch) < self.batch_size:
+                top = self._top()
+                if top is None or top[0] > now:
+                    break
+                heapq.heappop(self._heap)
+                del self._due_at[top[1]]
+                batch.append(top)
+        return batch
+
+    def process_due(self) -> int:
+        """Renews one batch of due subscriptions; returns how many were renewed."""
+        if SubscriptionsRepo.signature() != self._seen:
+            self.load()
+        now = self._clock()
+        batch = self._pop_due(now)
+        if not batch:
+            return 0
+
+        ids = [sid for _, sid in batch]
+        try:
+            with SubscriptionsRepo.lock():
+                unchanged = SubscriptionsRepo.signature() == self._seen
+                renewed = renew_subscriptions(ids, now)
+                # a subscription that was not due any more was changed elsewhere: reload next time
+                self._seen = SubscriptionsRepo.signature() if unchanged and len(renewed) == len(ids) else None
+        except Exception:
+            self._seen = None
+            raise
+
+        lag = (now - batch[0][0]).total_seconds()
+        with self._cond:
+            for s in renewed:
+                self._push(s)
+            self._renewed += len(renewed)
+            self._batches += 1
+            self._last_batch = len(renewed)
+            self._last_lag = lag
+            self._max_lag = max(self._max_lag, lag)
+            self._last_run = now.isoformat()
+        return len(renewed)
+
+    def _delay(self) -> float:
+        top = self._top()
+        if top is None:
+            return self.resync_interval
+        return max(0.0, min((top[0] - self._clock()).total_seconds(), self.resync_interval))
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                renewed = self.process_due()
+                delay = 0 if renewed else None
+            except Exception as e:
+                print(f"{self.name} error: {e}")
+                delay = self.resync_interval
+            if delay == 0:
+                continue
+            with self._cond:
+                if self._stop.is_set():
+                    break
+                self._cond.wait(self._delay() if delay is None else delay)
+
+    def start(self) -> None:
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Heap size, the next renewal and how far behind schedule renewals run."""
+        now = self._clock()
+        with self._cond:
+            top = self._top()
+            return {
+                "running": self._thread is not None,
+                "scheduled": len(self._due_at),
+                "next_renewal": top[0].isoformat() if top else None,
+                "lag_seconds": max(0.0, (now - top[0]).total_seconds()) if top else 0.0,
+                "renewed": self._renewed,
+                "batches": self._batches,
+                "last_batch": self._last_batch,
+                "last_lag_seconds": self._last_lag,
+                "max_lag_seconds": self._max_lag,
+                "last_run": self._last_run
+            }
+
+
+renewal_scheduler = RenewalScheduler()
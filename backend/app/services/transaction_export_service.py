@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+from datetime import date
+from typing import Iterable, Iterator, Dict, Any
+from backend.app.repositories.transactions_repo import TransactionsRepo, transaction_date
+from backend.app.utils.streaming import iter_csv, iter_ndjson, gzip_chunks
+from backend.app.utils.ttl_cache import TTLCache
+
+EXPORT_FORMATS = ("csv", "ndjson")
+CSV_FIELDS = ["transaction_id", "user_id", "status", "date", "amount", "currency", "payment_intent_id", "item_count"]
+EXPORT_SIZE_CACHE_TTL = float(os.getenv("EXPORT_SIZE_CACHE_TTL", "3600"))
+
+# body length per ETag, so resuming a download does not generate the export just to measure it
+export_sizes = TTLCache(maxsize=256, ttl=EXPORT_SIZE_CACHE_TTL)
+
+
+class TransactionExport:
+    """
+    One filtered export of the stored transactions as CSV or NDJSON, optionally gzipped.
+
+    The body is generated from the transaction store as it is sent, so memory use does
+    not grow with the number of transactions. For the same data and filters it is the
+    same bytes every time, so the ETag (store signature + filters) identifies it, its
+    size is cached by ETag and a byte range of it can be produced again to resume a
+    download. The signature is read once per export; a size or a range generated after
+    the store has moved past it is not the body the ETag names and is not used.
+    """
+
+    def __init__(self, fmt: str = "csv", start: date | None = None, end: date | None = None,
+                 status: str | None = None, user_id: int | None = None, compress: bool = False):
+        self.fmt = fmt
+        self.start = start.isoformat() if start else None
+        self.end = end.isoformat() if end else None
+        self.status = status
+        self.user_id = user_id
+        self.compress = compress
+        self._signature = None
+
+    @property
+    def filename(self) -> str:
+        return f"transactions.{self.fmt}" + (".gz" if self.compress else "")
+
+    @property
+    def media_type(self) -> str:
+        if self.compress:
+            return "application/gzip"
+        return "text/csv" if self.fmt == "csv" else "application/x-ndjson"
+
+    def signature(self):
+        """Store signature the ETag is built from, read on first use and kept for this export."""
+        if self._signature is None:
+            self._signature = TransactionsRepo.signature()
+        return self._signature
+
+    def unchanged(self) -> bool:
+        """True while nothing was written since signature(), so the body generated now is the one the ETag names."""
+        return self.signature() == TransactionsRepo.signature()
+
+    @property
+    def etag(self) -> str:
+        key = json.dumps([
+            self.signature(), self.fmt, self.start, self.end, self.status, self.user_id, self.compress
+        ], default=str)
+        return f'"export-{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
+
+    def _matches(self, transaction: Dict[str, Any]) -> bool:
+        if self.status is not None and transaction.get("status") != self.status:
+            return False
+        day = transaction_date(transaction)[:10]
+        if self.start and day < self.start:
+            return False
+        if self.end and day > self.end:
+            return False
+        return True
+
+    def transactions(self) -> Iterator[Dict[str, Any]]:
+        return (t for t in TransactionsRepo.iter_transactions(self.user_id) if self._matches(t))
+
+    @staticmethod
+    def csv_row(transaction: Dict[str, Any]) -> Dict[str, Any]:
+        # checkout transactions use id/total_amount/products, Stripe ones transaction_id/amount/items
+        lines = transaction.get("items") or transaction.get("products") or []
+        return {
+            "transaction_id": transaction.get("transaction_id") or transaction.get("id"),
+            "user_id": transaction.get("user_id"),
+            "status": transaction.get("status"),
+            "date": transaction_date(transaction),
+            "amount": transaction.get("amount", transaction.get("total_amount")),
+            "currency": transaction.get("currency", "cad"),
+            "payment_intent_id": transaction.get("payment_intent_id"),
+            "item_count": sum(int(line.get("quantity", 1) or 0) for line in lines),
+        }
+
+    def chunks(self) -> Iterator[bytes]:
+        if self.fmt == "csv":
+            body = iter_csv((TransactionExport.csv_row(t) for t in self.transactions()), CSV_FIELDS)
+        else:
+            body = iter_ndjson(self.transactions())
+        return gzip_chunks(body) if self.compress else body
+
+    def size(self) -> int | None:
+        """
+        Length of the body in bytes: cached by ETag, else found by generating it once
+        without keeping it. None if transactions were written while it was measured.
+        """
+        etag = self.etag
+        size = export_sizes.get(etag)
+        if size is None:
+            size = sum(len(chunk) for chunk in self.chunks())
+            if not self.unchanged():
+                return None
+            export_sizes.set(etag, size)
+        return size
+
+    def verified(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Passes chunks through one behind and checks the store before sending the last:
+        if it was written meanwhile the response is cut short, so the client drops the
+        bytes instead of stitching a different body into its download.
+        """
+        pending = None
+        for chunk in chunks:
+            if pending is not None:
+                yield pending
+            pending = chunk
+        if not self.unchanged():
+            raise RuntimeError("Transactions were written while the export range was sent")
+        if pending is not None:
+            yield pending
@@ -1,15 +1,18 @@
 from datetime import datetime, timedelta, date
 import json
+import uuid
 from backend.app.repositories.products_repo import ProductsRepo
 from backend.app.repositories.cart_repo import CartRepo
 from backend.app.repositories.transactions_repo import TransactionsRepo
 from backend.app.services.email_service import EmailService
 from backend.app.services.receipt_service import ReceiptService
+from backend.app.services.pricing_service import PricedCart, TAX_RATE, parse_price
+from backend.app.services.reservation_service import reservations
 from fastapi import HTTPException
 import stripe
+from backend.app.utils.stripe_utils import stripe_call
 
 
-TAX_RATE = 0.12
 EXCHANGE_RATES = {
     "cad": 1.0,
     "usd": 0.75,
@@ -21,78 +24,44 @@ def convert_amount(amount: float, target_currency: str) -> int:
     converted = amount * rate
     return int(converted * 100)
 
-
-def parse_price(price_str: str) -> float:
-    if not price_str:
-        return 0.0
-    return float(price_str.replace("$", "").strip())
+def stock_deltas(items, sign: int) -> dict:
+    """{product_id: sign * total quantity} over order lines, lines for the same product summed."""
+    deltas = {}
+    for item in items:
+        product_id = str(item["product_id"])
+        deltas[product_id] = deltas.get(product_id, 0) + sign * item["quantity"]
+    return deltas
 
 class TransactionsService:
 
-    def get_cart_summary(user_id: int, currency = "cad"):
+    def price_cart(user_id: int, currency: str = "cad") -> PricedCart:
         if not CartRepo.cart_exists(user_id):
             raise HTTPException(status_code=404, detail=f"Cart for user '{user_id}' not found")
 
-        cart = CartRepo.get_cart(user_id)
-        items = []
-        items_list = cart["items"]
-        subtotal = 0.0
+        cart_items = CartRepo.get_cart(user_id)["items"]
+        products = ProductsRepo.get_many([str(item["product_id"]).strip() for item in cart_items])
+        return PricedCart(user_id, cart_items, products, currency)
 
-        for item in items_list:
-            product_id = item["product_id"]
-            quantity = item["quantity"]
-
-            product = ProductsRepo.get_products(product_id)
-            if not product:
-                continue
-            
-            discounted_price = parse_price(product["discounted_price"])
-            actual_price = parse_price(product["actual_price"])
-
-            line_total = quantity * discounted_price
-            subtotal += line_total
-
-            items.append({
-                "product_id": product_id,
-                "name": product["product_name"],
-                "quantity": quantity,
-                "price_per_unit": discounted_price,
-                "subtotal": line_total,
-                "actual_price": actual_price,
-                "discount": product.get("discount_percentage"),
-                "category": product.get("category"),
-                "rating": product.get("rating"),
-                "rating_count": product.get("rating_count"),
-                "image": product.get("img_link"),
-            })
-
-        tax = subtotal * TAX_RATE
-        total = subtotal + tax
+    def get_cart_summary(user_id: int, currency = "cad"):
+        return TransactionsService.price_cart(user_id, currency).summary()
 
-        return {
-            "user_id": user_id,
-            "items": items,
-            "subtotal": round(subtotal, 2),
-            "tax": round(tax, 2),
-            "total": round(total, 2),
-            "currency": currency.lower()
-        }
-    
     def create_payment_intent(user_id: int, currency: str = "cad"):
-        summary = TransactionsService.get_cart_summary(user_id, currency)
+        priced = TransactionsService.price_cart(user_id, currency)
+        summary = priced.summary()
         if not summary["items"]:
             raise HTTPException(400, "Empty cart")
-        
-        for item in summary["items"]:
-            product = ProductsRepo.get_products(item["product_id"])
-            if not product:
-                raise HTTPException(400, f"Product {item['name']} is no longer available")
-            
-            available_stock = int(product.get("quantity", 0))
-            if item["quantity"] > available_stock:
-                raise HTTPException(400, f"Insufficient stock for {item['name']}. Only {available_stock} left.")
+
+        # the stock check and the hold are one step, so concurrent buyers cannot both take the
+        # last units; stock is re-read inside that step, as an order may have taken some since pricing
+        transaction_id = str(uuid.uuid4())
+        quantities = priced.quantities()
+        reservations.reserve(
+            transaction_id, quantities,
+            lambda held: priced.check_stock(held, ProductsRepo.get_many(quantities))
+        )
 
         transaction_data = {
+            "transaction_id": transaction_id,
             "user_id": user_id,
             "amount": summary["total"],
             "currency": currency,
@@ -100,15 +69,20 @@ class TransactionsService:
             "status": "pending",
             "timestamp": datetime.now().isoformat()
         }
-        saved_transaction = TransactionsRepo.add_transaction(transaction_data)
-        transaction_id = saved_transaction["transaction_id"]
+        TransactionsRepo.add_transaction(transaction_data)
 
         amount_cents = convert_amount(summary["total"], currency)
-        intent = stripe.PaymentIntent.create(
-            amount=amount_cents,
-            currency=currency.lower(),
-            metadata={"transaction_id": transaction_id}
-        )
+        try:
+            intent = stripe_call(
+                stripe.PaymentIntent.create,
+                amount=amount_cents,
+                currency=currency.lower(),
+                metadata={"transaction_id": transaction_id}
+            )
+        except Exception:
+            reservations.release(transaction_id)
+            TransactionsRepo.update_transaction(transaction_id, {"status": "failed"})
+            raise
         
         TransactionsRepo.update_transaction(transaction_id, {"payment_intent_id": intent["id"]})
         
@@ -116,12 +90,39 @@ class TransactionsService:
     
     @staticmethod
     def _finalize_order(transaction, intent):
-        if transaction.get("status") == "completed":
+        # claiming flips the status under the transactions lock, so a redelivered webhook
+        # or a manual confirm racing the webhook worker cannot fulfil the order twice
+        # (a claim taken over from a crashed worker goes back to pending on failure)
+        previous_status = transaction.get("status", "pending")
+        if previous_status == "fulfilling":
+            previous_status = "pending"
+        claimed = TransactionsRepo.claim_for_fulfillment(transaction["transaction_id"])
+        if not claimed:
             return
 
-        user_id = transaction["user_id"]
-        items = transaction["items"]
-        
+        transaction_id = claimed["transaction_id"]
+        user_id = claimed["user_id"]
+        items = claimed["items"]
+
+        try:
+            # a failed attempt is retried and a stale claim is taken over, so the stock
+            # change is recorded on the transaction while the products lock is held and
+            # re-checked there, and is applied once however many times this runs
+            with ProductsRepo.lock():
+                if not (TransactionsRepo.get_transaction_by_id(transaction_id) or {}).get("stock_applied"):
+                    ProductsRepo.adjust_stock(stock_deltas(items, -1))
+                    TransactionsRepo.update_transaction(transaction_id, {"stock_applied": True})
+            reservations.confirm(transaction_id)
+            CartRepo.clear_cart(user_id)
+        except Exception:
+            TransactionsRepo.update_transaction(transaction_id, {"status": previous_status})
+            raise
+
+        TransactionsRepo.update_transaction(transaction_id, {
+            "status": "completed",
+            "payment_intent_id": intent["id"]
+        })
+
         order = {
             "user_id": user_id,
             "items": items,
@@ -135,25 +136,16 @@ class TransactionsService:
             email = ReceiptService.validate_user_email(user_id)
             receipt_hash = ReceiptService.generate_receipt_hash(order)
             html = ReceiptService.generate_html_receipt(order, receipt_hash)
-            EmailService.send_email(
+            EmailService.enqueue_email(
                 to_email=email,
                 subject="Your StackSquad Receipt - Payment Confirmed",
                 html_body=html
             )
         except Exception as e:
             print(f"Failed to send receipt email: {e}")
-        
-        TransactionsRepo.update_transaction(transaction["transaction_id"], {
-            "status": "completed",
-            "payment_intent_id": intent["id"]
-        })
-
-        for item in items:
-            ProductsRepo.update_stock(item["product_id"], -item["quantity"])
-        CartRepo.clear_cart(user_id)
 
     def fulfill_transaction(event: dict):
-        if event["type"] != "payment_intent.succeeded":
+        if event["type"] not in ("payment_intent.succeeded", "payment_intent.canceled"):
             return
         intent = event["data"]["object"]
         
@@ -169,11 +161,21 @@ class TransactionsService:
         if not transaction:
             print(f"Transaction not found for intent {intent['id']}")
             return
+
+        if event["type"] == "payment_intent.canceled":
+            reservations.release(transaction["transaction_id"])
+            if transaction.get("status") == "pending":
+                TransactionsRepo.update_transaction(transaction["transaction_id"], {"status": "cancelled"})
+            return
             
         TransactionsService._finalize_order(transaction, intent)
+        # another worker holds a live claim: fail the event so it is retried until that
+        # worker completes the order or its claim runs out and is taken over
+        if (TransactionsRepo.get_transaction_by_id(transaction["transaction_id"]) or {}).get("status") == "fulfilling":
+            raise RuntimeError(f"Transaction {transaction['transaction_id']} is being fulfilled by another worker")
 
     def confirm_payment(payment_intent_id: str):
-        intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+        intent = stripe_call(stripe.PaymentIntent.retrieve, payment_intent_id)
         if intent["status"] != "succeeded":
             raise HTTPException(400, f"Payment not succeeded. Status: {intent['status']}")
             
@@ -196,7 +198,8 @@ class TransactionsService:
         transaction_time = datetime.fromisoformat(transaction["timestamp"])
         if datetime.now() - transaction_time > timedelta(days=14):
             raise HTTPException(403, "Refund period has expired")
-        refund = stripe.Refund.create(
+        refund = stripe_call(
+            stripe.Refund.create,
             payment_intent = transaction["payment_intent_id"],
             amount = int(transaction["amount"] * 100)
         )
@@ -205,8 +208,7 @@ class TransactionsService:
                 "status": "refunded",
                 "refunded_at": datetime.now()
             })
-            for item in transaction["items"]:
-                ProductsRepo.update_stock(item["product_id"], item["quantity"])
+            ProductsRepo.adjust_stock(stock_deltas(transaction["items"], 1))
         return refund
 
     #fallback for checkout without stripe
@@ -221,13 +223,13 @@ class TransactionsService:
 
         email = ReceiptService.validate_user_email(user_id)
 
-        order = ReceiptService.build_order(user_id)
+        order = ReceiptService.build_order(user_id, TransactionsService.price_cart(user_id))
 
         receipt_hash = ReceiptService.generate_receipt_hash(order)
 
         html = ReceiptService.generate_html_receipt(order, receipt_hash)
 
-        EmailService.send_email(
+        EmailService.enqueue_email(
             to_email=email,
             subject="Your StackSquad Receipt",
             html_body=html
@@ -1,5 +1,5 @@
 from backend.app.repositories.users_repo import UsersRepo
-from bcrypt import checkpw, hashpw, gensalt
+from backend.app.utils.passwords import password_hasher
 
 class UsersService:
     @staticmethod
@@ -8,13 +8,7 @@ class UsersService:
 
     @staticmethod
     def update_user(user_id: int, updated_data: dict):
-        users = UsersRepo.load_users()
-        user = next((u for u in users if u["user_id"] == user_id), None)
-        if not user:
-            return None
-        user.update(updated_data)
-        UsersRepo.save_users(users)
-        return user
+        return UsersRepo.update_user(user_id, updated_data)
 
     @staticmethod
     def change_user_password(user_id: int, old_password: str, new_password: str) -> bool:
@@ -22,16 +16,9 @@ class UsersService:
         if not user:
             return False
 
-        if not checkpw(old_password.encode('utf-8'), user["password"].encode('utf-8')):
+        if not password_hasher.verify(old_password, user["password"]):
             return False
 
-        new_hashed = hashpw(new_password.encode('utf-8'), gensalt()).decode('utf-8')
-        user["password"] = new_hashed
-
-        users = UsersRepo.load_users()
-        for i, u in enumerate(users):
-            if u["user_id"] == user_id:
-                users[i] = user
-                break
-        UsersRepo.save_users(users)
+        new_hashed = password_hasher.hash(new_password)
+        UsersRepo.update_user(user_id, {"password": new_hashed})
         return True
\ No newline at end of file
@@ -5,7 +5,8 @@ from pathlib import Path
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 import time
-from backend.app.repositories.users_repo import UsersRepo  
+from backend.app.repositories.users_repo import UsersRepo
+from backend.app.utils.ttl_cache import TTLCache
 
 env_path = Path(__file__).resolve().parent.parent / "totally_not_private_keys.env"
 load_dotenv(dotenv_path=env_path)
@@ -18,25 +19,53 @@ if not SECRET_KEY:
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-def create_access_token(user_id: int):
-    """Generate a JWT token for a user"""
+# decoded tokens, each kept until it expires; AUTH_CACHE_SIZE bounds memory
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+token_cache = TTLCache(maxsize=AUTH_CACHE_SIZE)
+
+def create_access_token(user_id: int, is_admin: bool = False):
+    """Generate a JWT token for a user; admins get an "admin" claim so admin checks need no lookup"""
     expire = int(time.time()) + ACCESS_TOKEN_EXPIRE_MINUTES * 60
     payload = {"user_id": user_id, "exp": expire}
+    if is_admin:
+        payload["admin"] = True
     token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
     return token
 
-def get_current_user(authorization: str = Header(None, alias="Authorization")):
+def decode_token(authorization: str | None) -> dict:
+    """Claims of the bearer token, verified once and then served from token_cache until it expires."""
     if not authorization:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    try:
-        token = authorization.replace("Bearer ", "")
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("user_id")
-        if not user_id:
+    token = authorization.replace("Bearer ", "")
+    payload = token_cache.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        if not payload.get("user_id"):
             raise HTTPException(status_code=401, detail="Invalid token")
-        user = UsersRepo.get_user_by_id(user_id)
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
-        return user
-    except JWTError as e:
-        raise HTTPException(status_code=401, detail="Invalid token")
\ No newline at end of file
+        token_cache.set(token, payload, ttl=payload["exp"] - time.time())
+    return payload
+
+def get_current_user(authorization: str = Header(None, alias="Authorization")):
+    payload = decode_token(authorization)
+    user = UsersRepo.get_cached_user(payload["user_id"])
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    return user
+
+def get_admin_claims(authorization: str = Header(None, alias="Authorization")) -> dict:
+    """
+    Claims of an admin's token. Tokens with the admin claim pass without a lookup;
+    older tokens fall back to the (cached) user record's isAdmin flag.
+    """
+    payload = decode_token(authorization)
+    if payload.get("admin"):
+        return payload
+    user = UsersRepo.get_cached_user(payload["user_id"])
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    if not user.get("isAdmin", False):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return {**payload, "admin": True}
@@ -0,0 +1,54 @@
+import threading
+
+
+class BackgroundWorkers:
+    """
+    Daemon threads that keep calling process_once() on a durable queue.
+
+    A worker goes straight on to the next batch while there is work and otherwise waits
+    for wake() or `poll_interval` seconds. Subclasses implement process_once(), which
+    returns how many items it handled.
+    """
+
+    name = "worker"
+    poll_interval = 1.0
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def process_once(self, limit: int = 10) -> int:
+        raise NotImplementedError
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                handled = self.process_once()
+            except Exception as e:
+                print(f"{self.name} worker error: {e}")
+                handled = 0
+            if not handled:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def start(self, count: int = 1) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+            for i in range(count)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
@@ -0,0 +1,27 @@
+from fastapi import HTTPException, Request, Response
+from backend.app.repositories.products_repo import ProductsRepo
+
+
+def etag_matches(etag: str, if_none_match: str | None) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # weak comparison (RFC 9110 13.1.2): W/"x" and "x" are the same entity
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in if_none_match.split(","))
+
+
+def catalog_etag(request: Request, response: Response) -> str:
+    """
+    Dependency for catalog reads. Answers 304 Not Modified straight away when the
+    client's If-None-Match already names the current catalog version, before the
+    endpoint loads or serializes anything; otherwise sets the ETag header and returns it.
+
+    Endpoints that build their own Response object must copy the returned ETag onto it.
+    """
+    etag = f'W/"catalog-{ProductsRepo.version()}"'
+    if etag_matches(etag, request.headers.get("if-none-match")):
+        raise HTTPException(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return etag
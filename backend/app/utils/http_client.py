@@ -0,0 +1,177 @@
+import math
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any
+from fastapi import HTTPException
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+HTTP_BREAKER_FAILURES = int(os.getenv("HTTP_BREAKER_FAILURES", "5"))
+HTTP_BREAKER_RESET = float(os.getenv("HTTP_BREAKER_RESET", "30"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(HTTPException):
+    """Raised without calling the dependency while its breaker is open; surfaces as 503 with Retry-After."""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = max(retry_after, 0.0)
+        super().__init__(
+            status_code=503,
+            detail=f"{name} is unavailable, retry later",
+            headers={"Retry-After": str(max(math.ceil(self.retry_after), 1))}
+        )
+
+
+class CircuitBreaker:
+    """
+    Counts consecutive failures of one dependency.
+
+    After `failure_threshold` failures in a row the breaker opens and every call fails
+    fast with CircuitOpenError for `reset_timeout` seconds. Then it lets a single trial
+    call through (half open): success closes it again, failure re-opens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = HTTP_BREAKER_FAILURES,
+                 reset_timeout: float = HTTP_BREAKER_RESET, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def before(self) -> None:
+        """Raises CircuitOpenError if the call must not go out."""
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            remaining = self._opened_at + self.reset_timeout - self._clock()
+            if self._state == OPEN and remaining <= 0:
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return
+            raise CircuitOpenError(self.name, remaining if remaining > 0 else self.reset_timeout)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = self._clock()
+
+    def call(self, fn, *args, failures=(Exception,), **kwargs):
+        """
+        Runs fn through the breaker. Only exceptions in `failures` count against the
+        dependency; any other exception means it answered and counts as a success.
+        """
+        self.before()
+        try:
+            result = fn(*args, **kwargs)
+        except failures:
+            self.record_failure()
+            raise
+        except BaseException:
+            self.record_success()
+            raise
+        self.record_success()
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            return {"name": self.name, "state": state, "consecutive_failures": self._failures}
+
+
+class OutboundClient:
+    """
+    Shared requests.Session for one upstream dependency.
+
+    Connections are kept alive in a urllib3 pool per host (`pool_size` sockets each),
+    every request gets (connect, read) timeouts unless it passes its own, and all of
+    them go through the dependency's circuit breaker. Connection errors, timeouts and
+    5xx answers count as failures.
+    """
+
+    def __init__(self, name: str, connect_timeout: float, read_timeout: float,
+                 pool_size: int = HTTP_POOL_SIZE, pool_hosts: int = 10,
+                 failure_threshold: int = HTTP_BREAKER_FAILURES, reset_timeout: float = HTTP_BREAKER_RESET):
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.session = requests.Session()
+        # no adapter level retries: callers decide whether to retry, the breaker sees every failure
+        adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        self.breaker.before()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            self.breaker.record_failure()
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("allow_redirects", False)
+        return self.request("HEAD", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.breaker.stats(), "connect_timeout": self.timeout[0], "read_timeout": self.timeout[1]}
+
+
+sendgrid = OutboundClient(
+    "sendgrid",
+    connect_timeout=float(os.getenv("SENDGRID_CONNECT_TIMEOUT", "3")),
+    read_timeout=float(os.getenv("SENDGRID_READ_TIMEOUT", "10"))
+)
+# product images come from many hosts, keep pools for more of them
+image_cdn = OutboundClient(
+    "image_cdn",
+    connect_timeout=float(os.getenv("IMAGE_CDN_CONNECT_TIMEOUT", "1")),
+    read_timeout=float(os.getenv("IMAGE_CDN_READ_TIMEOUT", os.getenv("RECEIPT_IMAGE_TIMEOUT", "2"))),
+    pool_hosts=50
+)
+stripe_api = OutboundClient(
+    "stripe",
+    connect_timeout=float(os.getenv("STRIPE_CONNECT_TIMEOUT", "3")),
+    read_timeout=float(os.getenv("STRIPE_READ_TIMEOUT", "20"))
+)
+
+clients = {client.name: client for client in (sendgrid, image_cdn, stripe_api)}
+
+
+def client_stats() -> list:
+    return [client.stats() for client in clients.values()]
@@ -0,0 +1,23 @@
+"""
+Imports the JSON files under backend/app/data into the sqlite database used when
+STORAGE_BACKEND=sqlite.
+
+    python -m backend.app.utils.migrate_to_sqlite [--data-dir DIR] [--db PATH]
+"""
+import argparse
+from pathlib import Path
+from backend.app.repositories.storage import DATA_DIR, SQLITE_PATH, migrate_json_to_sqlite
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import the JSON data files into sqlite")
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR, help="directory holding the JSON files")
+    parser.add_argument("--db", type=Path, default=SQLITE_PATH, help="sqlite database to create or update")
+    args = parser.parse_args(argv)
+
+    counts = migrate_json_to_sqlite(args.data_dir, args.db)
+    for name, count in counts.items():
+        print(f"{name}: {count} records")
+    print(f"Imported into {args.db}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+from bcrypt import hashpw, checkpw, gensalt
+
+# bcrypt cost is picked at startup so one hash takes about this long on this machine
+PASSWORD_HASH_TARGET_MS = float(os.getenv("PASSWORD_HASH_TARGET_MS", "250"))
+# set to pin the cost instead of calibrating
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "0"))
+PASSWORD_HASH_THREADS = int(os.getenv("PASSWORD_HASH_THREADS", str(os.cpu_count() or 2)))
+
+# calibration times one hash at MIN_ROUNDS, but never picks less than DEFAULT_ROUNDS
+MIN_ROUNDS = 10
+MAX_ROUNDS = 16
+DEFAULT_ROUNDS = 12
+
+
+def hash_rounds(hashed: str) -> int:
+    """Cost factor of a bcrypt hash ("$2b$12$..." -> 12), 0 if it is not one."""
+    try:
+        return int(hashed.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return 0
+
+
+def highest_rounds(hashes: Iterable[str]) -> int:
+    """Highest cost factor among stored hashes, 0 if there are none."""
+    return max((hash_rounds(h) for h in hashes), default=0)
+
+
+class PasswordHasher:
+    """
+    bcrypt hashing and checking on a small dedicated thread pool.
+
+    Only hashpw and checkpw run on the pool; the caller (a sync endpoint on the
+    server threadpool, with the request's context and unit of work) waits for the
+    result. bcrypt releases the GIL, so PASSWORD_HASH_THREADS threads (one per core by
+    default) hash in parallel, and a burst of logins queues for them instead of
+    running more bcrypt rounds at once than there are cores. The cost factor starts
+    at bcrypt's default and calibrate() can only raise it; verify_and_upgrade() tells
+    the caller when a stored hash is cheaper than that and returns its replacement.
+    """
+
+    def __init__(self, threads: int = PASSWORD_HASH_THREADS, rounds: int = BCRYPT_ROUNDS or DEFAULT_ROUNDS):
+        self.threads = threads
+        self.rounds = rounds
+        self._pool = None
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="bcrypt")
+        return self._pool
+
+    def calibrate(self, target_ms: float = PASSWORD_HASH_TARGET_MS, floor: int = 0) -> int:
+        """
+        Sets the highest cost whose hash fits in target_ms, but never less than
+        DEFAULT_ROUNDS or `floor` (the cost of hashes already stored), so a slow
+        measurement can not weaken new hashes. One hash at MIN_ROUNDS is timed; each
+        extra round doubles the work.
+        """
+        if BCRYPT_ROUNDS:
+            self.rounds = BCRYPT_ROUNDS
+            return self.rounds
+        start = time.perf_counter()
+        hashpw(b"calibration", gensalt(MIN_ROUNDS))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        rounds = MIN_ROUNDS
+        while rounds < MAX_ROUNDS and elapsed_ms * 2 <= target_ms:
+            elapsed_ms *= 2
+            rounds += 1
+        self.rounds = max(rounds, DEFAULT_ROUNDS, floor)
+        return self.rounds
+
+    def _on_pool(self, fn, *args):
+        return self.pool.submit(fn, *args).result()
+
+    def hash(self, password: str) -> str:
+        return self._on_pool(hashpw, password.encode("utf-8"), gensalt(self.rounds)).decode("utf-8")
+
+    def verify(self, password: str, hashed: str) -> bool:
+        try:
+            return self._on_pool(checkpw, password.encode("utf-8"), hashed.encode("utf-8"))
+        except ValueError:
+            # not a bcrypt hash
+            return False
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return hash_rounds(hashed) < self.rounds
+
+    def verify_and_upgrade(self, password: str, hashed: str) -> tuple[bool, str | None]:
+        """(password matches, new hash at the current cost if the stored one is weaker, else None)."""
+        if not self.verify(password, hashed):
+            return False, None
+        return True, self.hash(password) if self.needs_rehash(hashed) else None
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,21 @@
+from backend.app.repositories.identity_map import unit_of_work
+
+
+class UnitOfWorkMiddleware:
+    """
+    Runs every HTTP request, streamed response bodies included, in its own identity map
+    (repositories/identity_map.py), so the request parses each data file at most once.
+
+    Plain ASGI rather than BaseHTTPMiddleware, which would end the scope before a
+    streamed body is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with unit_of_work():
+            await self.app(scope, receive, send)
@@ -0,0 +1,121 @@
+import csv
+import io
+import json
+import re
+import zlib
+from typing import Iterable, Iterator, Dict, Any, List, Tuple
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+STREAM_FORMATS = ("json", "ndjson")
+CHUNK_SIZE = 64 * 1024
+
+
+def _chunked(parts: Iterable[str]) -> Iterator[bytes]:
+    """Groups small strings into ~CHUNK_SIZE byte chunks so each write to the socket is worthwhile."""
+    buffer, size = [], 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= CHUNK_SIZE:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def iter_json_array(items: Iterable[Dict[str, Any]], prefix: str = "", suffix: str = "") -> Iterator[bytes]:
+    """Encodes items as one JSON array, one item at a time. prefix/suffix wrap the array in a larger document."""
+    def parts():
+        yield prefix + "["
+        for i, item in enumerate(items):
+            yield ("," if i else "") + json.dumps(item, default=str)
+        yield "]" + suffix
+    return _chunked(parts())
+
+
+def iter_ndjson(items: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Encodes items as newline delimited JSON, one item per line."""
+    return _chunked(json.dumps(item, default=str) + "\n" for item in items)
+
+
+def iter_csv(rows: Iterable[Dict[str, Any]], fieldnames: List[str]) -> Iterator[bytes]:
+    """Encodes rows as CSV with a header line; fields missing from a row are left empty."""
+    def parts():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore", lineterminator="\n")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    return _chunked(parts())
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """
+    Gzips a byte stream on the fly. The header carries no timestamp, so the same input
+    always gives the same bytes, which is what lets a client resume with a Range request.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def slice_chunks(chunks: Iterable[bytes], start: int, end: int) -> Iterator[bytes]:
+    """Bytes start..end (inclusive) of a stream, read without holding more than one chunk."""
+    position = 0
+    for chunk in chunks:
+        chunk_end = position + len(chunk)
+        if chunk_end > start:
+            yield chunk[max(start - position, 0):end + 1 - position]
+        position = chunk_end
+        if position > end:
+            return
+
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: str | None, size: int) -> Tuple[int, int] | None:
+    """
+    (start, end) for a single "bytes=" Range header against a body of `size` bytes, or
+    None to send the whole body (no header, several ranges or a unit we do not serve).
+    Raises 416 for a range that lies outside the body.
+    """
+    match = _RANGE.match((header or "").strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size or start > end:
+        raise HTTPException(416, "Requested range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+def stream_items(items: Iterable[Dict[str, Any]], fmt: str, filename: str | None = None,
+                 headers: Dict[str, str] | None = None) -> StreamingResponse:
+    """
+    Streams items as a JSON array (fmt="json") or NDJSON (fmt="ndjson").
+
+    The body is produced while it is sent, so the response starts right away and only
+    one chunk is held in memory no matter how many items there are.
+    """
+    if fmt == "ndjson":
+        body, media_type = iter_ndjson(items), "application/x-ndjson"
+    else:
+        body, media_type = iter_json_array(items), "application/json"
+
+    headers = dict(headers or {})
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return StreamingResponse(body, media_type=media_type, headers=headers)
@@ -3,6 +3,7 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 from fastapi import HTTPException
+from backend.app.utils.http_client import stripe_api
 
 env_path = Path(__file__).resolve().parent.parent / "totally_not_private_keys.env"
 load_dotenv(dotenv_path=env_path)
@@ -13,6 +14,16 @@ webhook_secret = os.getenv("STRIPE_WEBHOOK_SECRET")
 if not stripe.api_key:
     raise RuntimeError("STRIPE_SECRET_KEY not found in environment. Check totally_not_private_keys.env")
 
+# the SDK sends through the shared keep-alive session with our timeouts instead of its own 80s default
+stripe.default_http_client = stripe.RequestsClient(timeout=stripe_api.timeout, session=stripe_api.session)
+
+# only outages count against the breaker, a declined card or bad request means Stripe is up
+STRIPE_OUTAGES = (stripe.error.APIConnectionError, stripe.error.APIError)
+
+def stripe_call(fn, *args, **kwargs):
+    """Calls the Stripe SDK through the Stripe circuit breaker; fails fast with 503 while Stripe is down."""
+    return stripe_api.breaker.call(fn, *args, failures=STRIPE_OUTAGES, **kwargs)
+
 def verify_webhook(payload: bytes, sig_header: str):
     try:
         return stripe.Webhook.construct_event(payload, sig_header, webhook_secret)
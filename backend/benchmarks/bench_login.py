@@ -0,0 +1,93 @@
+"""
+Login throughput under concurrency, through the real /auth/login endpoint.
+
+Passwords are hashed at the cost calibrate() picks for PASSWORD_HASH_TARGET_MS on this
+machine, the same as the app at startup. For each concurrency level the script fires
+LOGINS logins and reports logins/sec and latency percentiles. It also polls /health
+during the burst, to show that the event loop keeps answering while bcrypt runs on
+its own pool. Users live in a temp dir.
+
+    python -m backend.benchmarks.bench_login
+"""
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("STRIPE_SECRET_KEY", "sk_test_bench")
+
+import httpx
+from backend.app.main import app
+from backend.app.repositories import users_repo, cart_repo
+from backend.app.repositories.users_repo import UsersRepo
+from backend.app.utils.passwords import password_hasher
+
+USERS = 64
+LOGINS = int(os.getenv("BENCH_LOGINS", "48"))
+CONCURRENCY = (1, 4, 16, 48)
+
+
+def percentile(samples, p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000
+
+
+async def burst(client: httpx.AsyncClient, concurrency: int):
+    latencies, health = [], []
+    pending = iter(range(LOGINS))
+    done = asyncio.Event()
+
+    async def worker():
+        for n in pending:
+            start = time.perf_counter()
+            response = await client.post("/auth/login", json={"email": f"user{n % USERS}@bench.test", "password": "hunter22"})
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.text
+
+    async def poll_health():
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get("/health")
+            health.append(time.perf_counter() - start)
+            await asyncio.sleep(0.01)
+
+    poller = asyncio.create_task(poll_health())
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await poller
+    return LOGINS / elapsed, latencies, health
+
+
+async def run():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{'concurrency':>12}{'logins/s':>10}{'p50':>10}{'p99':>10}{'/health p99':>14}")
+        for concurrency in CONCURRENCY:
+            rate, latencies, health = await burst(client, concurrency)
+            print(f"{concurrency:>12}{rate:>10.1f}{percentile(latencies, 0.5):>7.0f} ms"
+                  f"{percentile(latencies, 0.99):>7.0f} ms{percentile(health, 0.99):>11.1f} ms")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        users_repo.DATA_PATH = tmp / "users.json"
+        cart_repo.DATA_PATH = tmp / "cart.json"
+        rounds = password_hasher.calibrate()
+        hashed = password_hasher.hash("hunter22")
+        UsersRepo.save_users([
+            {"user_id": i + 1, "username": f"user{i}", "email": f"user{i}@bench.test", "password": hashed,
+             "isAdmin": False, "createdAt": "2024-01-01T00:00:00"}
+            for i in range(USERS)
+        ])
+        print(f"bcrypt cost {rounds}, {password_hasher.threads} hashing thread(s), {LOGINS} logins per level")
+        asyncio.run(run())
+        password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Receipt image checks against a local stand-in for the image host.
+
+Every HEAD request to the stand-in takes IMAGE_DELAY seconds, like a slow CDN. Compares
+the old one-by-one checks with ReceiptService.check_images on a cold and a warm cache.
+
+    python -m backend.benchmarks.bench_receipt_images
+"""
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("STRIPE_SECRET_KEY", "sk_test_bench")
+
+import requests
+from backend.app.services import receipt_service
+from backend.app.services.receipt_service import ReceiptService
+
+IMAGE_DELAY = 0.2
+CART_SIZE = 10
+
+
+class SlowImageHost(BaseHTTPRequestHandler):
+    def do_HEAD(self):
+        time.sleep(IMAGE_DELAY)
+        self.send_response(404 if "missing" in self.path else 200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    fn()
+    print(f"{label:<28}{(time.perf_counter() - start) * 1000:8.1f} ms")
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowImageHost)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    urls = [f"{base}/images/{i}.jpg" for i in range(CART_SIZE - 1)] + [f"{base}/images/missing.jpg"]
+
+    print(f"{CART_SIZE} images, {IMAGE_DELAY * 1000:.0f} ms per HEAD")
+    timed("serial (before)", lambda: [requests.head(url, timeout=2).status_code == 200 for url in urls])
+    receipt_service.image_cache.clear()
+    timed("check_images, cold cache", lambda: ReceiptService.check_images(urls))
+    timed("check_images, warm cache", lambda: ReceiptService.check_images(urls))
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Stock updates when an order is finalized, on a synthetic catalog the size of the real one.
+
+Compares the old one update_stock call per order line (a full catalog rewrite each)
+with one ProductsRepo.adjust_stock call, and times the whole of
+TransactionsService._finalize_order, which now uses it. Everything runs on copies in a temp dir.
+
+    python -m backend.benchmarks.bench_stock_adjust
+"""
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("STRIPE_SECRET_KEY", "sk_test_bench")
+
+from backend.app.repositories import products_repo, transactions_repo, cart_repo, email_outbox_repo
+from backend.app.repositories.products_repo import ProductsRepo
+from backend.app.repositories.transactions_repo import TransactionsRepo
+from backend.app.repositories.cart_repo import CartRepo
+from backend.app.services.transactions_service import TransactionsService, ReceiptService
+
+CATALOG_SIZE = 1500
+LINE_COUNTS = (1, 5, 20, 50)
+
+
+def make_catalog(path: Path) -> None:
+    path.write_text(json.dumps([
+        {
+            "product_id": f"P{i:05d}",
+            "product_name": f"Product {i} with a reasonably long marketing name",
+            "category": "Electronics|Accessories|Cables",
+            "discounted_price": "$19.99",
+            "actual_price": "$29.99",
+            "quantity": 1000,
+            "about_product": "A description of the product. " * 20
+        }
+        for i in range(CATALOG_SIZE)
+    ]))
+
+
+def order_lines(count: int):
+    return [
+        {"product_id": f"P{i:05d}", "name": f"Product {i}", "quantity": 1, "price_per_unit": 19.99,
+         "subtotal": 19.99, "actual_price": 29.99, "discount": "33%", "image": None,
+         "category": "Electronics|Accessories|Cables", "rating": "4.2", "rating_count": "1,024"}
+        for i in range(count)
+    ]
+
+
+def per_line(items) -> None:
+    for item in items:
+        ProductsRepo.update_stock(item["product_id"], -item["quantity"])
+
+
+def finalize(items, n: int) -> None:
+    transaction = TransactionsRepo.add_transaction({
+        "transaction_id": f"bench-{n}-{time.time_ns()}",
+        "user_id": 1,
+        "items": items,
+        "status": "pending",
+        "timestamp": "2024-01-01T00:00:00"
+    })
+    TransactionsService._finalize_order(transaction, {"id": f"pi_{n}", "amount": int(len(items) * 1999 * 1.12)})
+
+
+def timed(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        products_repo.DATA_PATH = tmp / "amazon_cad.json"
+        products_repo.POW_PATH = tmp / "products_of_week.json"
+        transactions_repo.DATA_PATH = tmp / "transactions.json"
+        cart_repo.DATA_PATH = tmp / "cart.json"
+        email_outbox_repo.DATA_PATH = tmp / "email_outbox.json"
+        ReceiptService.validate_user_email = lambda user_id: "bench@example.com"
+        make_catalog(products_repo.DATA_PATH)
+        ProductsRepo.load_all()
+        CartRepo.create_cart_for_user(1)
+
+        print(f"{CATALOG_SIZE} products in the catalog")
+        print(f"{'lines':>6}{'update_stock per line':>24}{'adjust_stock':>16}{'_finalize_order':>18}")
+        for n, count in enumerate(LINE_COUNTS):
+            items = order_lines(count)
+            before = timed(lambda: per_line(items))
+            bulk = timed(lambda: ProductsRepo.adjust_stock({item["product_id"]: -1 for item in items}))
+            after = timed(lambda: finalize(items, n))
+            print(f"{count:>6}{before:>21.1f} ms{bulk:>13.1f} ms{after:>15.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,15 @@
+import csv
+import gzip
+import io
+import json
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch
 from backend.app.main import app
 from backend.app.routers.admin_dashboard import UsersRepo, TransactionsRepo, PenaltiesRepo, ProductsRepo, require_admin
+from backend.app.repositories.dashboard_summary import DashboardSummary
+from backend.app.services import transaction_export_service
+from backend.app.services.transaction_export_service import TransactionExport
 
 client = TestClient(app)
 
@@ -42,27 +49,51 @@ def test_get_user_details_not_found():
         response = client.get("/admin_dashboard/user/99")
         assert response.status_code == 404
 
-def test_admin_summary():
-    with patch.object(UsersRepo, "load_users", return_value=[{"user_id": 1}, {"user_id": 2}]), \
-         patch.object(TransactionsRepo, "get_transactions_by_user", side_effect=[
-             [{"id": 1, "date": "2024-10-01"}],
-             [{"id": 2, "date": "2024-10-02"}]
-         ]), \
-         patch.object(PenaltiesRepo, "get_penalties_by_user", side_effect=[
-             [{"id": 1, "date_issued": "2024-10-05"}],
-             [{"id": 2, "date_issued": "2024-10-06"}]
-         ]):
-
-        response = client.get("/admin_dashboard/summary")
-        assert response.status_code == 200
-        summary = response.json()
-        totals = summary["totals"]
-        assert totals["total_users"] == 2
-        assert totals["total_transactions"] == 2
-        assert totals["total_penalties"] == 2
-        latest = summary["latest"]
-        assert len(latest["recent_transactions"]) == 2
-        assert len(latest["recent_penalties"]) == 2
+def test_admin_summary(tmp_path, monkeypatch):
+    users = tmp_path / "users.json"
+    users.write_text(json.dumps([{"user_id": 1}, {"user_id": 2}]))
+    penalties = tmp_path / "penalties.json"
+    penalties.write_text(json.dumps([
+        {"id": "x1", "user_id": 1, "date_issued": "2024-10-05"},
+        {"id": "x2", "user_id": 2, "date_issued": "2024-10-06"}
+    ]))
+    monkeypatch.setattr("backend.app.repositories.users_repo.DATA_PATH", users)
+    monkeypatch.setattr("backend.app.repositories.penalties_repo.DATA_PATH", penalties)
+    monkeypatch.setattr("backend.app.repositories.transactions_repo.DATA_PATH", tmp_path / "transactions.json")
+    TransactionsRepo.add_transaction({"id": "r1", "user_id": 1, "date": "2024-10-01"})
+    TransactionsRepo.add_transaction({"id": "r2", "user_id": 2, "date": "2024-10-02"})
+
+    response = client.get("/admin_dashboard/summary")
+    assert response.status_code == 200
+    summary = response.json()
+    totals = summary["totals"]
+    assert totals["total_users"] == 2
+    assert totals["total_transactions"] == 2
+    assert totals["total_penalties"] == 2
+    latest = summary["latest"]
+    assert [t["id"] for t in latest["recent_transactions"]] == ["r2", "r1"]
+    assert [p["id"] for p in latest["recent_penalties"]] == ["x2", "x1"]
+
+def test_admin_summary_follows_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr("backend.app.repositories.users_repo.DATA_PATH", tmp_path / "users.json")
+    monkeypatch.setattr("backend.app.repositories.penalties_repo.DATA_PATH", tmp_path / "penalties.json")
+    monkeypatch.setattr("backend.app.repositories.transactions_repo.DATA_PATH", tmp_path / "transactions.json")
+    assert client.get("/admin_dashboard/summary").json()["totals"]["total_transactions"] == 0
+
+    with patch.object(DashboardSummary, "_rebuild", side_effect=AssertionError("rebuilt")):
+        for day in range(1, 16):
+            TransactionsRepo.add_transaction({"transaction_id": f"t{day}", "user_id": 1, "timestamp": f"2024-10-{day:02d}T10:00:00"})
+        TransactionsRepo.update_transaction("t15", {"status": "completed"})
+        summary = client.get("/admin_dashboard/summary").json()
+
+    assert summary["totals"]["total_transactions"] == 15
+    recent = summary["latest"]["recent_transactions"]
+    assert [t["transaction_id"] for t in recent] == [f"t{day}" for day in range(15, 5, -1)]
+    assert recent[0]["status"] == "completed"
+
+    # a rewrite of the whole file is picked up with one rebuild
+    TransactionsRepo.save_transaction([])
+    assert client.get("/admin_dashboard/summary").json()["totals"]["total_transactions"] == 0
 
 def test_get_inventory_updates():
     with patch.object(ProductsRepo, "load_products", return_value=[
@@ -75,6 +106,25 @@ def test_get_inventory_updates():
         data = response.json()
         assert len(data) == 3
 
+def test_get_inventory_updates_streamed():
+    products = [
+        {"product_id": "P1", "quantity": 10},
+        {"product_id": "P2", "quantity": 2},
+        {"product_id": "P3", "quantity": 0}
+    ]
+    with patch.object(ProductsRepo, "load_products", return_value=products):
+        plain = client.get("/admin_dashboard/inventory").json()
+
+        response = client.get("/admin_dashboard/inventory", params={"stream": "json"})
+        assert response.status_code == 200
+        assert response.json() == plain
+
+        response = client.get("/admin_dashboard/inventory", params={"stream": "ndjson"})
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines[0]["inventory_summary"]["low_stock_count"] == 1
+        assert lines[1:] == products
+
 def test_download_transactions(tmp_path):
     fake_file = tmp_path / "transactions.json"
     fake_file.write_text('[{"id": 1}]')
@@ -84,3 +134,83 @@ def test_download_transactions(tmp_path):
 
         client.get("/admin_dashboard/download/transactions")
         mock_file.assert_called_once()
+
+@pytest.fixture
+def stored_transactions(tmp_path, monkeypatch):
+    monkeypatch.setattr("backend.app.repositories.transactions_repo.DATA_PATH", tmp_path / "transactions.json")
+    for i in range(300):
+        TransactionsRepo.add_transaction({
+            "transaction_id": f"t{i:03d}", "user_id": i % 3, "amount": 10.5, "currency": "cad",
+            "status": "completed" if i % 2 else "pending", "timestamp": f"2024-10-{i % 28 + 1:02d}T12:00:00",
+            "items": [{"product_id": "p1", "quantity": 2}]
+        })
+
+def test_export_transactions_filters_and_formats(stored_transactions):
+    response = client.get("/admin_dashboard/export/transactions", params={
+        "status": "completed", "user_id": 1, "start": "2024-10-05", "end": "2024-10-10"
+    })
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert rows and all(r["status"] == "completed" and r["user_id"] == "1" for r in rows)
+    assert all("2024-10-05" <= r["date"][:10] <= "2024-10-10" for r in rows)
+    assert rows[0]["item_count"] == "2"
+
+    response = client.get("/admin_dashboard/export/transactions", params={"format": "ndjson", "user_id": 2})
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert len(records) == 100 and records[0]["items"] == [{"product_id": "p1", "quantity": 2}]
+
+def test_export_transactions_gzip_and_resume(stored_transactions):
+    plain = client.get("/admin_dashboard/export/transactions").content
+    response = client.get("/admin_dashboard/export/transactions", params={"gzip": True})
+    assert response.headers["content-type"] == "application/gzip"
+    body = response.content
+    assert gzip.decompress(body) == plain
+    assert len(body) < len(plain) / 3
+
+    etag = response.headers["etag"]
+    head = client.get("/admin_dashboard/export/transactions", params={"gzip": True}, headers={"Range": "bytes=0-99"})
+    assert head.status_code == 206
+    assert head.headers["content-range"] == f"bytes 0-99/{len(body)}"
+    rest = client.get("/admin_dashboard/export/transactions", params={"gzip": True},
+                      headers={"Range": "bytes=100-", "If-Range": etag})
+    assert rest.status_code == 206
+    assert head.content + rest.content == body
+
+    stale = client.get("/admin_dashboard/export/transactions", params={"gzip": True},
+                       headers={"Range": "bytes=100-", "If-Range": '"export-old"'})
+    assert stale.status_code == 200 and stale.content == body
+
+    outside = client.get("/admin_dashboard/export/transactions", params={"gzip": True}, headers={"Range": f"bytes={len(body)}-"})
+    assert outside.status_code == 416
+
+def test_export_range_is_only_served_for_the_data_its_etag_names(stored_transactions, monkeypatch):
+    monkeypatch.setattr(transaction_export_service, "export_sizes", transaction_export_service.TTLCache())
+    passes = []
+    chunks = TransactionExport.chunks
+    monkeypatch.setattr(TransactionExport, "chunks", lambda self: passes.append(1) or chunks(self))
+
+    # written to while the size is measured: the whole current file is sent instead of a range
+    export = TransactionExport()
+    etag = export.etag
+    TransactionsRepo.add_transaction({"transaction_id": "late", "user_id": 1, "status": "completed"})
+    assert export.size() is None
+    changed = client.get("/admin_dashboard/export/transactions", headers={"Range": "bytes=0-99", "If-Range": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag and "late" in changed.text
+
+    passes.clear()
+    first = client.get("/admin_dashboard/export/transactions", params={"gzip": True}, headers={"Range": "bytes=0-99"})
+    assert first.status_code == 206 and len(passes) == 2
+    passes.clear()
+    rest = client.get("/admin_dashboard/export/transactions", params={"gzip": True},
+                      headers={"Range": "bytes=100-", "If-Range": first.headers["etag"]})
+    assert rest.status_code == 206 and len(passes) == 1
+
+    # written to while a range is sent: the last chunk is held back and the response fails
+    export = TransactionExport()
+    export.etag
+    body = export.verified(iter([b"head", b"tail"]))
+    assert next(body) == b"head"
+    TransactionsRepo.add_transaction({"transaction_id": "later", "user_id": 1, "status": "completed"})
+    with pytest.raises(RuntimeError):
+        next(body)
@@ -1,4 +1,8 @@
+import json
+import multiprocessing
+from collections import Counter
 from backend.app.main import app
+from backend.app.repositories import storage, users_repo, cart_repo
 from fastapi.testclient import TestClient
 from unittest.mock import patch
 
@@ -46,4 +50,51 @@ def test_clear_cart():
         mock_service.clear_cart.return_value = None
         response = client.delete("/cart/1/clear")
         assert response.status_code == 200
-        mock_service.clear_cart.assert_called_once_with(1)
\ No newline at end of file
+        mock_service.clear_cart.assert_called_once_with(1)
+
+def test_add_to_cart_reads_each_file_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(users_repo, "DATA_PATH", tmp_path / "users.json")
+    monkeypatch.setattr(cart_repo, "DATA_PATH", tmp_path / "cart.json")
+    (tmp_path / "users.json").write_text(json.dumps([{"user_id": 1, "email": "a@test.com", "username": "alpha"}]))
+    (tmp_path / "cart.json").write_text(json.dumps([{"user_id": 1, "items": []}]))
+
+    reads = Counter()
+    real_read = storage.JsonCollection._read
+    def counting_read(collection):
+        reads[collection.path.name] += 1
+        return real_read(collection)
+
+    with patch.object(storage.JsonCollection, "_read", counting_read), \
+         patch("backend.app.services.cart_service.ProductsRepo.product_exists", return_value=True):
+        for _ in range(2):
+            response = client.post("/cart/1/add", params={"product_id": "TEST123", "quantity": 1})
+            assert response.status_code == 200
+
+    assert reads["cart.json"] == 2
+    assert reads["users.json"] <= 1
+    assert json.loads((tmp_path / "cart.json").read_text())[0]["items"] == [{"product_id": "TEST123", "quantity": 2}]
+
+def _post_adds(times):
+    worker_client = TestClient(app)
+    for _ in range(times):
+        response = worker_client.post("/cart/1/add", params={"product_id": "TEST123", "quantity": 1})
+        assert response.status_code == 200, response.text
+
+def test_add_to_cart_from_many_processes_loses_no_updates(tmp_path, monkeypatch):
+    monkeypatch.setattr(users_repo, "DATA_PATH", tmp_path / "users.json")
+    monkeypatch.setattr(cart_repo, "DATA_PATH", tmp_path / "cart.json")
+    (tmp_path / "users.json").write_text(json.dumps([{"user_id": 1, "email": "a@test.com", "username": "alpha"}]))
+    (tmp_path / "cart.json").write_text(json.dumps([{"user_id": 1, "items": []}]))
+    ctx = multiprocessing.get_context("fork")
+
+    with patch("backend.app.services.cart_service.ProductsRepo.product_exists", return_value=True):
+        workers = [ctx.Process(target=_post_adds, args=(20,)) for _ in range(4)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+
+    assert all(w.exitcode == 0 for w in workers)
+    assert json.loads((tmp_path / "cart.json").read_text()) == [
+        {"user_id": 1, "items": [{"product_id": "TEST123", "quantity": 80}]}
+    ]
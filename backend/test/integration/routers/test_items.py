@@ -1,6 +1,8 @@
+import json
 from fastapi.testclient import TestClient
 from backend.app.main import app
 from unittest.mock import patch
+from backend.app.repositories.products_repo import ProductsRepo
 
 client = TestClient(app)
 
@@ -54,4 +56,83 @@ def test_create_item():
             }
         )
 
-        assert response.status_code in (200, 201)
\ No newline at end of file
+        assert response.status_code in (200, 201)
+def test_get_items_pages_with_cursor_and_fields():
+    items = [{"product_id": "A1", "product_name": "Laptop"}, {"product_id": "B2", "product_name": "Mouse"}]
+    with patch("backend.app.routers.items.ItemsService.list_page") as mock_page:
+        mock_page.return_value = (items[:1], "A1")
+        response = client.get("/items", params={"limit": 1, "fields": "product_name"})
+        assert response.status_code == 200
+        assert response.json() == [{"product_name": "Laptop"}]
+        assert response.headers["X-Next-Cursor"] == "A1"
+        mock_page.assert_called_once_with(None, 1)
+
+        mock_page.return_value = (items[1:], None)
+        response = client.get("/items", params={"limit": 1, "cursor": "A1"})
+        assert response.json() == items[1:]
+        assert "X-Next-Cursor" not in response.headers
+
+def test_get_items_rejects_unknown_fields():
+    with patch("backend.app.routers.items.ItemsService.list_page", return_value=([], None)):
+        response = client.get("/items", params={"limit": 5, "fields": "product_id,password"})
+        assert response.status_code == 400
+
+def test_get_items_light_page():
+    item = {"product_id": "A1", "product_name": "Laptop", "discounted_price": "$10", "img_link": "x",
+            "about_product": "Fast|Light", "category": "Computers"}
+    with patch("backend.app.routers.items.ItemsService.list_page", return_value=([item], None)):
+        response = client.get("/items/items-light", params={"limit": 1, "fields": "product_id,description"})
+        assert response.json() == [{"product_id": "A1", "description": "Fast"}]
+
+def test_get_items_streams_json_and_ndjson():
+    items = [{"product_id": "A1", "product_name": "Laptop"}, {"product_id": "B2", "product_name": "Mouse"}]
+    with patch("backend.app.routers.items.ItemsService.iter_items", side_effect=lambda: iter(items)):
+        response = client.get("/items", params={"stream": "json"})
+        assert response.status_code == 200
+        assert response.json() == items
+
+        response = client.get("/items", params={"stream": "ndjson", "fields": "product_id"})
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert response.text == '{"product_id": "A1"}\n{"product_id": "B2"}\n'
+
+        assert client.get("/items", params={"stream": "xml"}).status_code == 422
+
+def test_item_etag_and_conditional_get(tmp_path, monkeypatch):
+    products_file = tmp_path / "amazon_cad.json"
+    products_file.write_text("[]")
+    monkeypatch.setattr("backend.app.repositories.products_repo.DATA_PATH", products_file)
+
+    ProductsRepo.save_all([{"product_id": "A1", "product_name": "Laptop"}])
+    response = client.get("/items", params={"limit": 10})
+    etag = response.headers["ETag"]
+    assert etag == f'W/"catalog-{ProductsRepo.version()}"'
+
+    with patch("backend.app.repositories.products_repo.catalog") as mock_catalog:
+        response = client.get("/items/A1", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        mock_catalog.refresh.assert_not_called()
+
+    ProductsRepo.update_stock("A1", 3)
+    response = client.get("/items", params={"limit": 10}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()[0]["quantity"] == 3
+
+def test_get_categories(tmp_path, monkeypatch):
+    products_file = tmp_path / "amazon_cad.json"
+    products_file.write_text(json.dumps([
+        {"product_id": "A1", "category": "Computers|Laptops"},
+        {"product_id": "B2", "category": "Computers|Accessories|Mice"}
+    ]))
+    monkeypatch.setattr("backend.app.repositories.products_repo.DATA_PATH", products_file)
+
+    response = client.get("/items/categories")
+    assert response.status_code == 200
+    assert response.json()["count"] == 2
+    assert response.json()["children"] == [{"name": "Computers", "path": "Computers", "count": 2}]
+
+    response = client.get("/items/categories", params={"path": "Computers", "depth": 1})
+    assert [(c["name"], c["count"]) for c in response.json()["children"]] == [("Accessories", 1), ("Laptops", 1)]
+
+    assert client.get("/items/categories", params={"path": "Toys"}).status_code == 404
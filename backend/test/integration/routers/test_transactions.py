@@ -1,3 +1,4 @@
+import json
 from backend.app.main import app
 from fastapi.testclient import TestClient
 from unittest.mock import patch
@@ -22,3 +23,19 @@ def test_checkout():
 
         assert response.status_code in (200, 201)
         mock_service.checkout.assert_called_once_with(1)
+
+def test_stripe_webhook_acknowledges_without_fulfilling():
+    event = {"id": "evt_1", "type": "payment_intent.succeeded", "data": {"object": {}}}
+    with patch("backend.app.routers.transactions.verify_webhook") as mock_verify, \
+         patch("backend.app.routers.transactions.StripeWebhookService") as mock_webhooks, \
+         patch("backend.app.routers.transactions.TransactionsService") as mock_service:
+        mock_webhooks.ingest.side_effect = [True, False]
+
+        first = client.post("/transactions/webhook/stripe", content=json.dumps(event), headers={"stripe-signature": "sig"})
+        again = client.post("/transactions/webhook/stripe", content=json.dumps(event), headers={"stripe-signature": "sig"})
+
+    assert first.json() == {"status": "success", "duplicate": False}
+    assert again.json() == {"status": "success", "duplicate": True}
+    mock_verify.assert_called_with(json.dumps(event).encode(), "sig")
+    mock_webhooks.ingest.assert_called_with(event)
+    mock_service.fulfill_transaction.assert_not_called()
@@ -1,6 +1,8 @@
 from fastapi.testclient import TestClient
 from backend.app.main import app
 from datetime import datetime
+from unittest.mock import patch
+from backend.app.repositories.users_repo import DuplicateUserError
 
 client = TestClient(app)
 
@@ -34,3 +36,12 @@ def test_get_and_update_profile():
     assert update_resp.status_code == 200
     updated = update_resp.json()
     assert updated["username"] == "jonah_updated"
+
+def test_update_profile_to_a_taken_email_is_rejected():
+    with patch("backend.app.routers.users.UsersService.update_user",
+               side_effect=DuplicateUserError("A user with this email already exists")):
+        resp = client.put("/users/update/1/profile", json={
+            "username": "taken", "email": "taken@test.com", "isAdmin": False
+        })
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "A user with this email already exists"
@@ -1,4 +1,5 @@
 import json
+import multiprocessing
 import pytest
 from pathlib import Path
 from fastapi import HTTPException
@@ -54,3 +55,22 @@ def test_update_quantity_raises_if_missing(temp_cart_file):
 def test_update_cart_raises_if_missing(temp_cart_file):
     with pytest.raises(HTTPException):
         CartRepo.update_cart(99, [{"product_id": "X", "quantity": 3}])
+
+
+def _add_many(times):
+    for _ in range(times):
+        CartRepo.add_item(1, "A", 1)
+
+
+def test_add_item_from_many_processes_loses_no_updates(temp_cart_file):
+    ctx = multiprocessing.get_context("fork")
+    CartRepo.create_cart_for_user(1)
+
+    workers = [ctx.Process(target=_add_many, args=(25,)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+    assert all(w.exitcode == 0 for w in workers)
+    assert read_json(temp_cart_file) == [{"user_id": 1, "items": [{"product_id": "A", "quantity": 100}]}]
@@ -0,0 +1,37 @@
+from backend.app.repositories.category_tree import CategoryTree
+
+def make_products():
+    return [
+        {"product_id": "P1", "category": "Home&Kitchen|HomeStorage&Organization|LaundryOrganization|LaundryBaskets"},
+        {"product_id": "P2", "category": "Home&Kitchen|Kitchen&HomeAppliances|SmallKitchenAppliances"},
+        {"product_id": "P3", "category": "Home&Kitchen|HomeStorage&Organization"},
+        {"product_id": "P4", "category": "Electronics|Mobiles"},
+        {"product_id": "P5"}
+    ]
+
+def test_nodes_count_every_product_below_them():
+    tree = CategoryTree(make_products())
+
+    assert tree.root.count == 5
+    assert tree.find("Home&Kitchen").count == 3
+    assert tree.find("Home&Kitchen|HomeStorage&Organization").rows == [0, 2]
+    assert tree.find("Home&Kitchen|HomeStorage&Organization|LaundryOrganization").path == \
+        "Home&Kitchen|HomeStorage&Organization|LaundryOrganization"
+
+def test_find_is_an_exact_prefix_walk():
+    tree = CategoryTree(make_products())
+
+    assert tree.find(None) is tree.root
+    assert tree.find("Home") is None
+    assert tree.find("home&kitchen") is None
+    assert tree.find("Electronics|Mobiles|Phones") is None
+
+def test_to_dict_limits_depth():
+    tree = CategoryTree(make_products())
+
+    top = tree.root.to_dict(depth=1)
+    assert [(c["name"], c["count"]) for c in top["children"]] == [("Electronics", 1), ("Home&Kitchen", 3)]
+    assert "children" not in top["children"][0]
+
+    deep = tree.find("Home&Kitchen").to_dict(depth=2)
+    assert deep["children"][0]["children"][0]["name"] == "LaundryOrganization"
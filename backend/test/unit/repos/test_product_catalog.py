@@ -0,0 +1,181 @@
+import json
+import threading
+import pytest
+from unittest.mock import patch
+from backend.app.repositories.product_catalog import ProductCatalog
+from backend.app.repositories.products_repo import ProductsRepo
+from backend.app.repositories.storage import JsonCollection
+
+@pytest.fixture
+def temp_products_file(tmp_path, monkeypatch):
+    temp_json = tmp_path / "amazon_cad.json"
+    temp_json.write_text(json.dumps([
+        {"product_id": "A1", "product_name": "Laptop"},
+        {"product_id": "B2", "product_name": "Mouse"}
+    ]))
+
+    monkeypatch.setattr(
+        "backend.app.repositories.products_repo.DATA_PATH",
+        temp_json
+    )
+    return temp_json
+
+def test_refresh_builds_index(temp_products_file):
+    catalog = ProductCatalog().refresh(temp_products_file)
+
+    assert len(catalog) == 2
+    assert catalog.get("B2")["product_name"] == "Mouse"
+    assert "A1" in catalog
+    assert catalog.get("missing") is None
+
+def test_refresh_does_not_reparse_unchanged_file(temp_products_file):
+    catalog = ProductCatalog().refresh(temp_products_file)
+
+    with patch("backend.app.repositories.storage.json.loads") as mock_load:
+        catalog.refresh(temp_products_file)
+        catalog.refresh(temp_products_file)
+        mock_load.assert_not_called()
+
+def test_refresh_reloads_when_file_changes(temp_products_file):
+    catalog = ProductCatalog().refresh(temp_products_file)
+
+    temp_products_file.write_text(json.dumps([
+        {"product_id": "C3", "product_name": "Monitor (27 inch)"}
+    ]))
+    catalog.refresh(temp_products_file)
+
+    assert "A1" not in catalog
+    assert catalog.get("C3")["product_name"] == "Monitor (27 inch)"
+
+def test_refresh_missing_file_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        ProductCatalog().refresh(tmp_path / "missing.json")
+
+def test_repo_lookups_use_index(temp_products_file):
+    assert ProductsRepo.product_exists("A1") is True
+    assert ProductsRepo.get_products("B2")["product_name"] == "Mouse"
+
+    with patch("backend.app.repositories.storage.json.loads") as mock_load:
+        ProductsRepo.get_products("A1")
+        ProductsRepo.product_exists("B2")
+        ProductsRepo.load_products()
+        mock_load.assert_not_called()
+
+def test_save_all_updates_index_without_reparse(temp_products_file):
+    ProductsRepo.load_all()
+    ProductsRepo.save_all([{"product_id": "Z9", "product_name": "Desk"}])
+
+    with patch("backend.app.repositories.storage.json.loads") as mock_load:
+        assert ProductsRepo.get_products("Z9")["product_name"] == "Desk"
+        assert ProductsRepo.product_exists("A1") is False
+        mock_load.assert_not_called()
+
+def test_search_index_follows_saves(temp_products_file):
+    assert [p["product_id"] for p in ProductsRepo.search_products("laptop")] == ["A1"]
+
+    items = ProductsRepo.load_all()
+    items[0] = {"product_id": "A1", "product_name": "Gaming Laptop"}
+    items.append({"product_id": "C3", "product_name": "Laptop Stand"})
+    ProductsRepo.save_all(items)
+
+    with patch("backend.app.repositories.product_catalog.SearchIndex") as mock_index:
+        assert [p["product_id"] for p in ProductsRepo.search_products("laptop")] == ["A1", "C3"]
+        assert [p["product_id"] for p in ProductsRepo.search_products("gaming")] == ["A1"]
+        mock_index.assert_not_called()
+
+def test_page_walks_catalog_by_product_id(temp_products_file):
+    temp_products_file.write_text(json.dumps([
+        {"product_id": pid, "product_name": pid} for pid in ["D4", "A1", "C3", "B2", "E5"]
+    ]))
+    catalog = ProductCatalog().refresh(temp_products_file)
+
+    first, cursor = catalog.page(None, 2)
+    assert [p["product_id"] for p in first] == ["A1", "B2"]
+    second, cursor = catalog.page(cursor, 2)
+    assert [p["product_id"] for p in second] == ["C3", "D4"]
+    last, cursor = catalog.page(cursor, 2)
+    assert [p["product_id"] for p in last] == ["E5"]
+    assert cursor is None
+
+def test_page_cursor_survives_deletes(temp_products_file):
+    ProductsRepo.save_all([{"product_id": pid} for pid in ["A1", "B2", "C3"]])
+    _, cursor = ProductsRepo.page(None, 1)
+
+    ProductsRepo.save_all([{"product_id": pid} for pid in ["B2", "C3"]])
+    page, _ = ProductsRepo.page(cursor, 1)
+    assert page == [{"product_id": "B2"}]
+
+def test_writes_bump_catalog_version(temp_products_file, monkeypatch):
+    monkeypatch.setattr(
+        "backend.app.repositories.products_repo.POW_PATH",
+        temp_products_file.with_name("products_of_week.json")
+    )
+    start = ProductsRepo.version()
+
+    ProductsRepo.save_all([{"product_id": "A1", "quantity": 1}])
+    ProductsRepo.update_stock("A1", 2)
+    ProductsRepo.set_products_of_the_week(["A1"])
+
+    assert ProductsRepo.version() == start + 3
+    assert (temp_products_file.parent / "catalog.version").read_text() == str(start + 3)
+
+def test_adjust_stock_applies_all_deltas_in_one_write(temp_products_file):
+    ProductsRepo.save_all([
+        {"product_id": "A1", "quantity": 5},
+        {"product_id": "B2", "quantity": "3"},
+        {"product_id": "C3", "quantity": 1}
+    ])
+    start = ProductsRepo.version()
+
+    assert ProductsRepo.adjust_stock({"A1": -2, "B2": -10, "ZZ": 4}) == {"A1": 3, "B2": 0}
+
+    assert ProductsRepo.version() == start + 1
+    assert [p["quantity"] for p in json.loads(temp_products_file.read_text())] == [3, 0, 1]
+    assert ProductsRepo.adjust_stock({"ZZ": 1}) == {}
+    assert ProductsRepo.version() == start + 1
+
+def test_failed_writes_leave_served_products_untouched(temp_products_file):
+    ProductsRepo.save_all([{"product_id": "A1", "quantity": 5, "discounted_price": "$8.00", "actual_price": "$10.00"}])
+    served = ProductsRepo.get_products("A1")
+
+    with patch.object(JsonCollection, "save_all", side_effect=OSError("disk full")):
+        for write in (lambda: ProductsRepo.adjust_stock({"A1": -2}), lambda: ProductsRepo.apply_discount("A1", 50),
+                      lambda: ProductsRepo.remove_discount("A1")):
+            with pytest.raises(OSError):
+                write()
+
+    assert served == {"product_id": "A1", "quantity": 5, "discounted_price": "$8.00", "actual_price": "$10.00"}
+    assert ProductsRepo.get_products("A1") is served
+
+def test_filter_by_category_path(temp_products_file):
+    temp_products_file.write_text(json.dumps([
+        {"product_id": "A1", "category": "Computers|Laptops", "discounted_price": "$900"},
+        {"product_id": "B2", "category": "Computers|Accessories|Mice", "discounted_price": "$20"},
+        {"product_id": "C3", "category": "Home|Computers", "discounted_price": "$50"}
+    ]))
+
+    assert [p["product_id"] for p in ProductsRepo.filter_products(category_path="Computers")] == ["A1", "B2"]
+    assert [p["product_id"] for p in ProductsRepo.filter_products(category_path="Computers", max_price=100)] == ["B2"]
+    assert ProductsRepo.get_category("Computers|Accessories").count == 1
+
+def test_filter_pairs_columns_and_tree_from_one_product_list(temp_products_file):
+    catalog = ProductCatalog().refresh(temp_products_file)
+    catalog.replace(temp_products_file, [
+        {"product_id": f"P{i}", "category": "Computers|Laptops" if i % 2 else "Home"} for i in range(10)
+    ])
+    catalog.filter()
+    real_categories = catalog.categories
+    writer = threading.Thread(target=catalog.replace, args=(temp_products_file, [{"product_id": "X", "category": "Computers"}]))
+
+    def categories_after_a_save():
+        # a save landing between reading the columns and looking up the tree node
+        writer.start()
+        writer.join(0.2)
+        return real_categories()
+
+    with patch.object(catalog, "categories", categories_after_a_save):
+        found = catalog.filter(category_path="Computers")
+    writer.join()
+
+    assert [p["product_id"] for p in found] == ["P1", "P3", "P5", "P7", "P9"]
+    assert [p["product_id"] for p in catalog.filter(category_path="Computers")] == ["X"]
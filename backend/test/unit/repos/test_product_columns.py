@@ -0,0 +1,48 @@
+import numpy as np
+from backend.app.repositories.product_columns import ProductColumns, parse_number
+
+def make_products():
+    return [
+        {"product_id": "P1", "product_name": "Apple iPhone 13", "discounted_price": "$1,299.00", "rating": "4.5", "rating_count": "24,269", "category": "Electronics|Mobile", "quantity": 3},
+        {"product_id": "P2", "product_name": "Samsung TV", "discounted_price": "$699.00", "rating": "|", "rating_count": "", "category": "Electronics|TV", "quantity": 0},
+        {"product_id": "P3", "product_name": "Juicer", "discounted_price": None, "rating": "3.9", "rating_count": "12", "category": "Home|Kitchen"}
+    ]
+
+def ids(results):
+    return [p["product_id"] for p in results]
+
+def test_parse_number():
+    assert parse_number("$1,299.00") == 1299.0
+    assert parse_number(5) == 5.0
+    assert np.isnan(parse_number("|"))
+    assert np.isnan(parse_number(None))
+
+def test_columns_are_parsed_once_per_product():
+    columns = ProductColumns(make_products())
+
+    assert columns.price.tolist()[:2] == [1299.0, 699.0]
+    assert np.isnan(columns.price[2])
+    assert columns.rating_count[0] == 24269
+    assert columns.categories == ["electronics|mobile", "electronics|tv", "home|kitchen"]
+
+def test_filters_combine_into_one_mask():
+    columns = ProductColumns(make_products())
+
+    assert ids(columns.filter(min_price=500)) == ["P1", "P2"]
+    assert ids(columns.filter(min_price=500, max_price=1000)) == ["P2"]
+    assert ids(columns.filter(rating=0)) == ["P1", "P3"]
+    assert ids(columns.filter(category="electronics", keyword="tv")) == ["P2"]
+    assert ids(columns.filter(min_rating_count=100)) == ["P1"]
+    assert ids(columns.filter(in_stock=True)) == ["P1"]
+    assert ids(columns.filter()) == ["P1", "P2", "P3"]
+
+def test_empty_catalog():
+    assert ProductColumns([]).filter(category="home", keyword="x", min_price=1) == []
+
+def test_one_long_name_does_not_widen_the_others():
+    products = make_products() + [{"product_id": "P4", "product_name": "x" * 2000 + " iphone", "discounted_price": "$5"}]
+    columns = ProductColumns(products)
+
+    assert sum(len(name) for name in columns.names) < 2100
+    assert ids(columns.filter(keyword="IPHONE")) == ["P1", "P4"]
+    assert ids(columns.filter(keyword="iphone", max_price=100)) == ["P4"]
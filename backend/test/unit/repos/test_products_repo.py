@@ -100,46 +100,55 @@ def mock_products(monkeypatch):
     monkeypatch.setattr(ProductsRepo, "load_products", fake_load_products)
     return data
 
-def test_search_products_found(mock_products):
+@pytest.fixture
+def catalog_products(temp_products_file, mock_products):
+    temp_products_file.write_text(json.dumps(mock_products))
+    return mock_products
+
+def test_search_products_found(catalog_products):
     results = ProductsRepo.search_products("iphone")
     assert len(results) == 1
     assert results[0]["product_name"] == "Apple iPhone 13"
 
-def test_search_products_not_found(mock_products):
+def test_search_products_matches_category_and_all_words(catalog_products):
+    assert [p["product_id"] for p in ProductsRepo.search_products("electronics")] == ["P1", "P2"]
+    assert [p["product_id"] for p in ProductsRepo.search_products("electronics tv")] == ["P2"]
+
+def test_search_products_not_found(catalog_products):
     with pytest.raises(Exception) as e:
         ProductsRepo.search_products("nonexistent")
     assert "don't have nonexistent" in str(e.value)
 
-def test_filter_by_keyword(mock_products):
+def test_filter_by_keyword(catalog_products):
     results = ProductsRepo.filter_products(keyword="tv")
     assert len(results) == 1
     assert "Samsung TV" in results[0]["product_name"]
 
-def test_filter_by_min_price(mock_products):
+def test_filter_by_min_price(catalog_products):
     results = ProductsRepo.filter_products(min_price=700)
     assert len(results) == 1
     assert "iPhone" in results[0]["product_name"]
 
-def test_filter_by_max_price(mock_products):
+def test_filter_by_max_price(catalog_products):
     results = ProductsRepo.filter_products(max_price=100)
     assert len(results) == 1
     assert "Juicer" in results[0]["product_name"]
 
-def test_filter_by_category(mock_products):
+def test_filter_by_category(catalog_products):
     results = ProductsRepo.filter_products(category="mobile")
     assert len(results) == 1
     assert "iPhone" in results[0]["product_name"]
 
-def test_filter_by_rating_valid(mock_products):
+def test_filter_by_rating_valid(catalog_products):
     results = ProductsRepo.filter_products(rating=4.2)
     assert len(results) == 1
     assert "iPhone" in results[0]["product_name"]
 
-def test_filter_by_rating_ignores_invalid(mock_products):
+def test_filter_by_rating_ignores_invalid(catalog_products):
     results = ProductsRepo.filter_products(rating=0)
     assert len(results) == 2
 
-def test_filter_products_no_match(mock_products):
+def test_filter_products_no_match(catalog_products):
     with pytest.raises(Exception) as e:
         ProductsRepo.filter_products(keyword="xyz")
     assert "No products found matching the filter criteria." in str(e.value)
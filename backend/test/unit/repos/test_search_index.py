@@ -0,0 +1,47 @@
+from backend.app.repositories.search_index import SearchIndex, tokenize
+
+def make_products():
+    return [
+        {"product_id": "P1", "product_name": "Apple iPhone 13", "category": "Electronics|Mobile", "about_product": "Fast phone"},
+        {"product_id": "P2", "product_name": "Samsung TV 55 Inch", "category": "Electronics|TV", "about_product": "Smart TV"},
+        {"product_id": "P3", "product_name": "Juicer Mixer Grinder", "category": "Home|Kitchen", "about_product": "Fast blender"}
+    ]
+
+def ids(results):
+    return [p["product_id"] for p in results]
+
+def test_tokenize_splits_on_punctuation():
+    assert tokenize("Electronics|Mobile, USB-C") == ["electronics", "mobile", "usb", "c"]
+    assert tokenize(None) == []
+
+def test_search_intersects_words_across_fields():
+    index = SearchIndex(make_products())
+
+    assert ids(index.search("fast")) == ["P1", "P3"]
+    assert ids(index.search("fast kitchen")) == ["P3"]
+    assert ids(index.search("samsung phone")) == []
+    assert index.search("") == []
+
+def test_last_word_matches_as_prefix():
+    index = SearchIndex(make_products())
+
+    assert ids(index.search("iph")) == ["P1"]
+    assert ids(index.search("electronics sm")) == ["P2"]
+    assert ids(index.search("iph electronics")) == []
+
+def test_update_reindexes_only_changed_products():
+    old = make_products()
+    index = SearchIndex(old)
+
+    new = list(old)
+    new[0] = {**old[0], "product_name": "Google Pixel 8"}
+    del new[2]
+    new.append({"product_id": "P4", "product_name": "Desk Lamp", "category": "Home"})
+    index.update(old, new)
+
+    assert ids(index.search("iphone")) == []
+    assert ids(index.search("juicer")) == []
+    assert ids(index.search("pixel")) == ["P1"]
+    assert ids(index.search("home")) == ["P4"]
+    assert ids(index.search("electronics")) == ["P1", "P2"]
+    assert "juicer" not in index.vocabulary
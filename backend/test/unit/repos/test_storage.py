@@ -0,0 +1,178 @@
+import json
+import os
+import pytest
+from unittest.mock import patch
+from backend.app.repositories import storage
+from backend.app.repositories.file_lock import write_atomic
+from backend.app.repositories.identity_map import unit_of_work
+from backend.app.repositories.storage import JsonBackend, SqliteBackend, migrate_json_to_sqlite
+from backend.app.repositories.users_repo import UsersRepo
+from backend.app.repositories.cart_repo import CartRepo
+
+@pytest.fixture
+def sqlite_backend(tmp_path):
+    return SqliteBackend(tmp_path / "test.db")
+
+@pytest.fixture
+def use_sqlite(sqlite_backend, monkeypatch):
+    monkeypatch.setattr(storage, "_backend", sqlite_backend)
+    return sqlite_backend
+
+def test_json_collection_row_operations(tmp_path):
+    users = JsonBackend().collection("users", tmp_path / "users.json")
+
+    users.insert({"user_id": 1, "email": "a@test.com", "username": "alpha"})
+    users.insert({"user_id": 2, "email": "b@test.com", "username": "beta"})
+
+    assert users.get(2)["username"] == "beta"
+    assert users.find_one("email", "a@test.com")["user_id"] == 1
+    assert users.update(1, {"username": "renamed"})["username"] == "renamed"
+    assert users.update(9, {"username": "nobody"}) is None
+    assert users.delete(2) is True
+    assert json.loads((tmp_path / "users.json").read_text()) == [
+        {"user_id": 1, "email": "a@test.com", "username": "renamed"}
+    ]
+
+def test_json_collection_creates_missing_file(tmp_path):
+    carts = JsonBackend().collection("carts", tmp_path / "cart.json")
+    assert carts.all() == []
+    assert (tmp_path / "cart.json").exists()
+
+def test_sqlite_collection_row_operations(sqlite_backend):
+    users = sqlite_backend.collection("users")
+
+    users.insert({"user_id": 1, "email": "a@test.com", "username": "alpha"})
+    users.insert({"user_id": 2, "email": "b@test.com", "username": "beta"})
+
+    assert users.get(2)["username"] == "beta"
+    assert list(users.iterate(batch=1)) == users.all()
+    assert users.get("2") is None
+    assert users.find_one("username", "alpha")["user_id"] == 1
+    assert users.update(1, {"email": "new@test.com"})["email"] == "new@test.com"
+    assert users.find_one("email", "a@test.com") is None
+    assert users.delete(2) is True
+    assert users.delete(2) is False
+    assert users.all() == [{"user_id": 1, "email": "new@test.com", "username": "alpha"}]
+
+def test_sqlite_lookups_use_indexes(sqlite_backend):
+    transactions = sqlite_backend.collection("transactions")
+    transactions.insert({"transaction_id": "t1", "user_id": 1, "payment_intent_id": "pi_1"})
+
+    conn = sqlite_backend.connect()
+    plan = conn.execute(
+        'EXPLAIN QUERY PLAN SELECT data FROM "transactions" WHERE payment_intent_id = ?', ("pi_1",)
+    ).fetchall()
+    assert any("USING INDEX" in row[-1] for row in plan)
+    assert transactions.find_one("payment_intent_id", "pi_1")["transaction_id"] == "t1"
+
+def test_sqlite_save_all_only_writes_changed_rows(sqlite_backend):
+    carts = sqlite_backend.collection("carts")
+    records = [{"user_id": i, "items": []} for i in range(50)]
+    carts.save_all(records)
+
+    conn = sqlite_backend.connect()
+    before = conn.total_changes
+    version = carts.signature()
+
+    records[10]["items"] = [{"product_id": "P1", "quantity": 1}]
+    carts.save_all(records)
+
+    assert conn.total_changes - before == 2  # the changed row plus the version bump
+    assert carts.signature() == version + 1
+    assert carts.get(10)["items"] == [{"product_id": "P1", "quantity": 1}]
+
+    carts.save_all(records)
+    assert carts.signature() == version + 1
+
+def test_repos_run_on_sqlite(use_sqlite):
+    UsersRepo.add_user({"user_id": 7, "email": "s@test.com", "username": "sql"})
+
+    assert UsersRepo.get_user_by_email("s@test.com")["user_id"] == 7
+    assert CartRepo.cart_exists(7) is True
+
+    CartRepo.add_item(7, "P1", 2)
+    CartRepo.add_item(7, "P1", 1)
+    assert CartRepo.get_cart(7)["items"] == [{"product_id": "P1", "quantity": 3}]
+
+def test_migrate_json_to_sqlite(tmp_path):
+    (tmp_path / "users.json").write_text(json.dumps([
+        {"user_id": 1, "email": "a@test.com", "username": "alpha"}
+    ]))
+    (tmp_path / "transactions.json").write_text(json.dumps([
+        {"transaction_id": "t1", "user_id": 1}
+    ]))
+    (tmp_path / "transactions.journal").write_text(
+        json.dumps({"op": "update", "transaction_id": "t1", "updates": {"status": "completed"}}) + "\n"
+    )
+
+    counts = migrate_json_to_sqlite(tmp_path, tmp_path / "migrated.db")
+    assert counts == {"users": 1, "transactions": 1}
+
+    backend = SqliteBackend(tmp_path / "migrated.db")
+    assert backend.collection("users").get(1)["username"] == "alpha"
+    assert backend.collection("transactions").get("t1")["status"] == "completed"
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_insert_many_is_one_write(backend, tmp_path, sqlite_backend):
+    if backend == "json":
+        transactions = JsonBackend().collection("transactions", tmp_path / "transactions.json")
+    else:
+        transactions = sqlite_backend.collection("transactions")
+    seen = []
+    storage.on_write("transactions", lambda collection, op, record, before, after: seen.append((op, len(record))))
+
+    transactions.insert({"transaction_id": "t0", "user_id": 1})
+    transactions.insert_many([{"transaction_id": f"t{i}", "user_id": 2} for i in range(1, 4)])
+
+    assert [t["transaction_id"] for t in transactions.find("user_id", 2)] == ["t1", "t2", "t3"]
+    assert seen[-1] == ("add_many", 3)
+    storage._listeners["transactions"].pop()
+    if backend == "json":
+        assert len((tmp_path / "transactions.journal").read_text().splitlines()) == 4
+
+def test_journal_collection_hands_out_copies(tmp_path):
+    transactions = JsonBackend().collection("transactions", tmp_path / "transactions.json")
+    transactions.insert({"transaction_id": "t1", "user_id": 1, "items": []})
+
+    for handed_out in (transactions.get("t1"), transactions.find("user_id", 1)[0], transactions.find_one("user_id", 1),
+                       transactions.all()[0], transactions.update("t1", {"status": "pending"})):
+        handed_out["items"].append("lost")
+        handed_out["status"] = "lost"
+
+    assert transactions.get("t1") == {"transaction_id": "t1", "user_id": 1, "items": [], "status": "pending"}
+
+def test_unit_of_work_parses_each_file_once(tmp_path):
+    carts = JsonBackend().collection("carts", tmp_path / "cart.json")
+    carts.save_all([{"user_id": 1, "items": []}])
+
+    with patch.object(storage.JsonCollection, "_read", autospec=True, side_effect=storage.JsonCollection._read) as read:
+        with unit_of_work():
+            # callers get copies, so changing one does not change what the map holds
+            carts.get(1)["items"].append({"product_id": "lost"})
+            assert carts.all() == [{"user_id": 1, "items": []}]
+            carts.update(1, {"items": [{"product_id": "p1", "quantity": 1}]})
+            assert carts.get(1)["items"][0]["product_id"] == "p1"
+            assert read.call_count == 1
+
+            # a write by another process changes the signature and is read again
+            (tmp_path / "cart.json").write_text(json.dumps([{"user_id": 1, "items": [], "elsewhere": True}]))
+            assert carts.get(1)["elsewhere"] is True
+            assert read.call_count == 2
+
+        carts.all()
+        carts.all()
+        assert read.call_count == 4
+
+def test_same_size_rewrite_in_the_same_tick_is_seen(tmp_path):
+    path = tmp_path / "cart.json"
+    carts = JsonBackend().collection("carts", path)
+    carts.save_all([{"user_id": 1, "items": []}])
+    stat = os.stat(path)
+
+    with unit_of_work():
+        assert carts.get(1)["items"] == []
+        # another worker replaces the file with same-size content within the same mtime tick
+        write_atomic(path, json.dumps([{"user_id": 2, "items": []}], indent=4))
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert os.stat(path).st_size == stat.st_size
+        assert carts.get(1) is None and carts.get(2) is not None
@@ -56,6 +56,12 @@ def test_add_transaction_appends_and_saves(temp_transactions_file):
     result = TransactionsRepo.add_transaction(new_tx)
     assert result == new_tx
 
+    assert TransactionsRepo.load_transactions() == [
+        {"transaction_id": "t1", "user_id": 1, "amount": 20},
+        {"transaction_id": "t2", "user_id": 1, "amount": 30},
+    ]
+
+    TransactionsRepo.compact()
     saved = read_json(temp_transactions_file)
     assert saved == [
         {"transaction_id": "t1", "user_id": 1, "amount": 20},
@@ -84,4 +90,102 @@ def test_user_has_transactions_true(temp_transactions_file):
 def test_user_has_transactions_false(temp_transactions_file):
     temp_transactions_file.write_text(json.dumps([]))
 
-    assert TransactionsRepo.user_has_transactions(1) is False
\ No newline at end of file
+    assert TransactionsRepo.user_has_transactions(1) is False
+
+def test_add_transaction_only_appends_to_journal(temp_transactions_file):
+    TransactionsRepo.add_transaction({"transaction_id": "t1", "user_id": 1})
+    TransactionsRepo.add_transaction({"transaction_id": "t2", "user_id": 2})
+
+    assert read_json(temp_transactions_file) == []
+    lines = temp_transactions_file.with_suffix(".journal").read_text().splitlines()
+    assert [json.loads(l)["record"]["transaction_id"] for l in lines] == ["t1", "t2"]
+
+def test_update_transaction_is_replayed(temp_transactions_file):
+    temp_transactions_file.write_text(json.dumps([
+        {"transaction_id": "t1", "user_id": 1, "status": "pending"}
+    ]))
+
+    updated = TransactionsRepo.update_transaction("t1", {"status": "completed"})
+    assert updated["status"] == "completed"
+    assert TransactionsRepo.get_transaction_by_id("t1")["status"] == "completed"
+
+    TransactionsRepo.compact()
+    assert read_json(temp_transactions_file)[0]["status"] == "completed"
+    assert not temp_transactions_file.with_suffix(".journal").exists()
+
+@pytest.mark.parametrize("swapped", [False, True])
+def test_compaction_interrupted_by_a_crash_is_finished_not_replayed(temp_transactions_file, swapped):
+    TransactionsRepo.add_transaction({"transaction_id": "t1", "user_id": 1})
+    TransactionsRepo.update_transaction("t1", {"status": "completed"})
+    compacted = json.dumps([{"transaction_id": "t1", "user_id": 1, "status": "completed"}])
+
+    # the compacting worker died after setting the journal aside, before or after the swap
+    temp_transactions_file.with_suffix(".journal").rename(temp_transactions_file.with_name("transactions.journal.folded"))
+    if swapped:
+        temp_transactions_file.write_text(compacted)
+    else:
+        temp_transactions_file.with_name("transactions.json.next").write_text(compacted)
+
+    assert TransactionsRepo.load_transactions() == [{"transaction_id": "t1", "user_id": 1, "status": "completed"}]
+    TransactionsRepo.add_transaction({"transaction_id": "t2", "user_id": 2})
+    assert [t["transaction_id"] for t in TransactionsRepo.load_transactions()] == ["t1", "t2"]
+    assert not temp_transactions_file.with_name("transactions.journal.folded").exists()
+    assert not temp_transactions_file.with_name("transactions.json.next").exists()
+
+def test_update_transaction_missing_returns_none(temp_transactions_file):
+    assert TransactionsRepo.update_transaction("missing", {"status": "completed"}) is None
+    assert not temp_transactions_file.with_suffix(".journal").exists()
+
+def test_journal_picks_up_lines_from_other_writers(temp_transactions_file):
+    TransactionsRepo.add_transaction({"transaction_id": "t1", "user_id": 1})
+
+    journal_file = temp_transactions_file.with_suffix(".journal")
+    with open(journal_file, "a") as f:
+        f.write(json.dumps({"op": "add", "record": {"transaction_id": "t2", "user_id": 3}}) + "\n")
+        f.write('{"op": "add", "rec')
+
+    assert TransactionsRepo.transaction_exists("t2") is True
+    assert len(TransactionsRepo.load_transactions()) == 2
+
+def test_lookups_follow_adds_and_updates(temp_transactions_file):
+    temp_transactions_file.write_text(json.dumps([
+        {"transaction_id": "t1", "user_id": 1, "payment_intent_id": None, "status": "pending"},
+        {"id": "receipt-1", "user_id": 2, "status": "completed"}
+    ]))
+    TransactionsRepo.add_transaction({"transaction_id": "t2", "user_id": 1})
+
+    TransactionsRepo.update_transaction("t1", {"payment_intent_id": "pi_1"})
+    assert TransactionsRepo.get_transaction_by_intent("pi_1")["transaction_id"] == "t1"
+    TransactionsRepo.update_transaction("t1", {"payment_intent_id": "pi_2"})
+    assert TransactionsRepo.get_transaction_by_intent("pi_1") is None
+    assert TransactionsRepo.get_transaction_by_intent("pi_2")["transaction_id"] == "t1"
+
+    assert [t["transaction_id"] for t in TransactionsRepo.get_transactions_by_user(1)] == ["t1", "t2"]
+    assert TransactionsRepo.get_transaction_by_id("receipt-1")["user_id"] == 2
+    assert TransactionsRepo.user_has_transactions(2) is True
+    assert TransactionsRepo.user_has_transactions(3) is False
+
+def test_lookups_do_not_scan(temp_transactions_file, monkeypatch):
+    temp_transactions_file.write_text(json.dumps([
+        {"transaction_id": f"t{i}", "user_id": i % 10, "payment_intent_id": f"pi_{i}"} for i in range(1000)
+    ]))
+    TransactionsRepo.load_transactions()
+
+    def scan(*args):
+        raise AssertionError("linear scan")
+    monkeypatch.setattr("backend.app.repositories.storage.JsonCollection.find", scan)
+    monkeypatch.setattr("backend.app.repositories.storage.JsonCollection.find_one", scan)
+
+    assert TransactionsRepo.get_transaction_by_intent("pi_500")["transaction_id"] == "t500"
+    assert len(TransactionsRepo.get_transactions_by_user(3)) == 100
+    assert TransactionsRepo.transaction_exists("t999") is True
+
+def test_claim_for_fulfillment_takes_over_only_stale_claims(temp_transactions_file, monkeypatch):
+    monkeypatch.setattr("backend.app.repositories.transactions_repo.FULFILLMENT_LEASE_SECONDS", 60)
+    temp_transactions_file.write_text(json.dumps([{"transaction_id": "t1", "status": "pending"}]))
+
+    assert TransactionsRepo.claim_for_fulfillment("t1", now=1000)["fulfilling_since"] == 1000
+    assert TransactionsRepo.claim_for_fulfillment("t1", now=1059) is None
+    assert TransactionsRepo.claim_for_fulfillment("t1", now=1061)["fulfilling_since"] == 1061
+    TransactionsRepo.update_transaction("t1", {"status": "completed"})
+    assert TransactionsRepo.claim_for_fulfillment("t1", now=5000) is None
@@ -1,5 +1,7 @@
 import pytest
-from backend.app.repositories.users_repo import UsersRepo
+from unittest.mock import patch
+from backend.app.repositories.users_repo import UsersRepo, DuplicateUserError
+from backend.app.repositories.identity_map import unit_of_work
 import json
 from pathlib import Path
 
@@ -117,4 +119,70 @@ def test_delete_user_returns_false_if_not_found(temp_users_file):
 
     result = UsersRepo.delete_user(123)
     assert result is False
-    assert read_json(temp_users_file) == [{"user_id": 99}]
\ No newline at end of file
+    assert read_json(temp_users_file) == [{"user_id": 99}]
+
+@pytest.fixture
+def temp_store(temp_users_file, tmp_path, monkeypatch):
+    monkeypatch.setattr("backend.app.repositories.cart_repo.DATA_PATH", tmp_path / "cart.json")
+    return temp_users_file
+
+def test_lookups_do_not_reread_the_file(temp_store):
+    temp_store.write_text(json.dumps([
+        {"user_id": 1, "email": "a@test.com", "username": "alpha"},
+        {"user_id": 2, "email": "b@test.com", "username": "beta"},
+    ]))
+    assert UsersRepo.get_user_by_id(1)["username"] == "alpha"
+
+    with patch("backend.app.repositories.storage.JsonCollection.all") as read:
+        assert UsersRepo.get_user_by_email("b@test.com")["user_id"] == 2
+        assert UsersRepo.get_user_by_username("alpha")["email"] == "a@test.com"
+        assert UsersRepo.get_user_by_email("nobody@test.com") is None
+        read.assert_not_called()
+
+def test_registration_issues_ids_and_enforces_uniqueness(temp_store):
+    # the shipped data already had two users with id 4
+    temp_store.write_text(json.dumps([
+        {"user_id": 4, "email": "a@test.com", "username": "alpha"},
+        {"user_id": 4, "email": "b@test.com", "username": "beta"},
+    ]))
+
+    added = UsersRepo.add_user({"email": "c@test.com", "username": "gamma"})
+    assert added["user_id"] == 5
+    assert UsersRepo.get_user_by_email("c@test.com")["user_id"] == 5
+
+    for taken in ({"email": "a@test.com", "username": "new"}, {"email": "new@test.com", "username": "beta"},
+                  {"user_id": 5, "email": "x@test.com", "username": "x"}):
+        with pytest.raises(DuplicateUserError):
+            UsersRepo.add_user(taken)
+    with pytest.raises(DuplicateUserError):
+        UsersRepo.update_user(5, {"email": "a@test.com"})
+    assert UsersRepo.update_user(5, {"email": "c@test.com", "username": "gamma2"})["username"] == "gamma2"
+    assert len(read_json(temp_store)) == 3
+
+def test_ids_of_deleted_users_are_not_reissued(temp_store):
+    UsersRepo.add_user({"email": "a@test.com", "username": "alpha"})
+    UsersRepo.add_user({"email": "b@test.com", "username": "beta"})
+    UsersRepo.delete_user(2)
+
+    assert UsersRepo.add_user({"email": "c@test.com", "username": "gamma"})["user_id"] == 3
+    assert UsersRepo.get_user_by_email("b@test.com") is None
+
+def test_index_follows_writes_from_other_processes(temp_store):
+    temp_store.write_text(json.dumps([{"user_id": 1, "email": "a@test.com", "username": "alpha"}]))
+    assert UsersRepo.get_user_by_username("alpha") is not None
+
+    temp_store.write_text(json.dumps([{"user_id": 1, "email": "a@test.com", "username": "renamed-elsewhere"}]))
+    assert UsersRepo.get_user_by_username("alpha") is None
+    assert UsersRepo.get_user_by_username("renamed-elsewhere")["user_id"] == 1
+
+def test_updated_email_frees_the_old_one(temp_store):
+    temp_store.write_text(json.dumps([{"user_id": 1, "email": "old@test.com", "username": "alpha"}]))
+
+    # inside a request the index and the update can share one parsed record
+    with unit_of_work():
+        assert UsersRepo.get_user_by_id(1)["email"] == "old@test.com"
+        UsersRepo.update_user(1, {"email": "new@test.com"})
+
+        assert UsersRepo.get_user_by_email("old@test.com") is None
+        assert UsersRepo.get_user_by_email("new@test.com")["user_id"] == 1
+        assert UsersRepo.add_user({"email": "old@test.com", "username": "beta"})["user_id"] == 2
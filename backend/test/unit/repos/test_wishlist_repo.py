@@ -10,15 +10,16 @@ sample_wishlist = {
     "shared_with": []
 }
 
-@patch("backend.app.repositories.wishlist_repo.WishlistRepo.load_all")
-def test_get_wishlist_by_user(mock_load):
-    mock_load.return_value = [sample_wishlist.copy()]
+@patch("backend.app.repositories.wishlist_repo.WishlistRepo._collection")
+def test_get_wishlist_by_user(mock_collection):
+    mock_collection.return_value.get.return_value = sample_wishlist.copy()
     wishlist = WishlistRepo.get_wishlist(1)
     assert wishlist["user_id"] == 1
+    mock_collection.return_value.get.assert_called_once_with(1)
 
-@patch("backend.app.repositories.wishlist_repo.WishlistRepo.save_all")
-def test_update_wishlist(mock_save):
+@patch("backend.app.repositories.wishlist_repo.WishlistRepo._collection")
+def test_update_wishlist(mock_collection):
     updated = sample_wishlist.copy()
     updated["public"] = True
     WishlistRepo.update_wishlist(1, updated)
-    mock_save.assert_called_once()
+    mock_collection.return_value.update.assert_called_once_with(1, updated)
@@ -58,8 +58,7 @@ def test_apply_penalty_success():
          patch("backend.app.services.admin_service.datetime") as mock_datetime:
 
         mock_datetime.utcnow.return_value.isoformat.return_value = "2025-11-21T00:00:00"
-        mock_repo.load_penalties.return_value = penalties
-        mock_repo.save_penalties.return_value = None
+        mock_repo.add_penalty.side_effect = penalties.append
 
         service = AdminService()
         penalty_id = service.apply_penalty(1, "Late payment", 50.0, "pending")
@@ -73,7 +72,7 @@ def test_apply_penalty_success():
         assert penalties[0]["status"] == "pending"
         assert penalties[0]["date_issued"] == "2025-11-21T00:00:00"
 
-        mock_repo.save_penalties.assert_called_once_with(penalties)
+        mock_repo.add_penalty.assert_called_once_with(penalties[0])
 
 
 def test_apply_penalty_zero_amount():
@@ -84,7 +83,7 @@ def test_apply_penalty_zero_amount():
          patch("backend.app.services.admin_service.datetime") as mock_datetime:
 
         mock_datetime.utcnow.return_value.isoformat.return_value = "2025-11-21T00:00:00"
-        mock_repo.load_penalties.return_value = penalties
+        mock_repo.add_penalty.side_effect = penalties.append
 
         service = AdminService()
         penalty_id = service.apply_penalty(1, "No fee", 0.0, "pending")
@@ -93,7 +92,7 @@ def test_apply_penalty_zero_amount():
         assert len(penalties) == 1
         assert penalties[0]["amount"] == 0.0
 
-        mock_repo.save_penalties.assert_called_once_with(penalties)
+        mock_repo.add_penalty.assert_called_once_with(penalties[0])
 
 
 def test_get_user_penalties_filters_correctly():
@@ -1,8 +1,13 @@
+import threading
 import pytest
 from unittest.mock import patch
 from bcrypt import hashpw, gensalt
+from fastapi import HTTPException
 from backend.app.services.auth_service import AuthService
 from backend.app.schemas.user import UserCreate
+from backend.app.repositories import users_repo
+from backend.app.utils import auth, passwords
+from backend.app.utils.passwords import PasswordHasher, hash_rounds
 
 def test_create_user_success():
     service = AuthService()
@@ -17,8 +22,7 @@ def test_create_user_success():
     with patch("backend.app.services.auth_service.UsersRepo") as mock_repo:
         mock_repo.get_user_by_email.return_value = None
         mock_repo.get_user_by_username.return_value = None
-        mock_repo.get_all_users.return_value = []
-        mock_repo.add_user.return_value = None
+        mock_repo.add_user.side_effect = lambda data: {"user_id": 1, **data}
 
         user = service.create_user(user_data)
 
@@ -155,4 +159,102 @@ def test_change_password_wrong_old_password():
         }
 
         with pytest.raises(ValueError, match="Incorrect password"):
-            service.change_password(1, "wrongpass", "newpass")
\ No newline at end of file
+            service.change_password(1, "wrongpass", "newpass")
+
+@pytest.fixture
+def users_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(users_repo, "DATA_PATH", tmp_path / "users.json")
+    users_repo.UsersRepo.save_users([
+        {"user_id": 1, "username": "alice", "email": "a@example.com", "isAdmin": False},
+        {"user_id": 2, "username": "root", "email": "r@example.com", "isAdmin": True},
+    ])
+    return users_repo
+
+def test_current_user_is_served_from_cache_until_written(users_file):
+    header = f"Bearer {auth.create_access_token(1)}"
+
+    assert auth.get_current_user(header)["username"] == "alice"
+    with patch.object(auth.jwt, "decode") as decode, \
+         patch("backend.app.repositories.storage.JsonCollection.get") as read:
+        assert auth.get_current_user(header)["username"] == "alice"
+        decode.assert_not_called()
+        read.assert_not_called()
+
+    users_file.UsersRepo.update_user(1, {"username": "alice2"})
+    assert auth.get_current_user(header)["username"] == "alice2"
+
+    users_file.UsersRepo.delete_user(1)
+    with pytest.raises(HTTPException) as e:
+        auth.get_current_user(header)
+    assert e.value.status_code == 401
+
+def test_invalid_token_is_rejected(users_file):
+    for header in (None, "Bearer not-a-token"):
+        with pytest.raises(HTTPException) as e:
+            auth.get_current_user(header)
+        assert e.value.status_code == 401
+
+def test_admin_claim_needs_no_lookup(users_file):
+    header = f"Bearer {auth.create_access_token(2, is_admin=True)}"
+
+    with patch.object(users_file.UsersRepo, "get_cached_user") as lookup:
+        assert auth.get_admin_claims(header)["user_id"] == 2
+        lookup.assert_not_called()
+
+def test_admin_check_without_claim_uses_user_record(users_file):
+    assert auth.get_admin_claims(f"Bearer {auth.create_access_token(2)}")["admin"] is True
+    with pytest.raises(HTTPException) as e:
+        auth.get_admin_claims(f"Bearer {auth.create_access_token(1)}")
+    assert e.value.status_code == 403
+
+def test_login_token_carries_admin_claim():
+    hashed = hashpw("secret".encode(), gensalt(4)).decode()
+    user_dict = {"user_id": 2, "username": "root", "password": hashed, "email": "r@example.com",
+                 "isAdmin": True, "createdAt": "2025-01-01T12:00:00"}
+
+    with patch("backend.app.services.auth_service.UsersRepo") as mock_repo:
+        mock_repo.get_user_by_email.return_value = user_dict
+        result = AuthService().login("r@example.com", "secret")
+
+    assert auth.decode_token(f"Bearer {result['access_token']}")["admin"] is True
+
+def test_login_upgrades_weaker_hash():
+    hasher = PasswordHasher(threads=1, rounds=5)
+    user_dict = {"user_id": 1, "username": "testuser", "password": hashpw(b"secret", gensalt(4)).decode(),
+                 "email": "test@example.com", "isAdmin": False, "createdAt": "2025-01-01T12:00:00"}
+
+    with patch("backend.app.services.auth_service.UsersRepo") as mock_repo, \
+         patch("backend.app.services.auth_service.password_hasher", hasher):
+        mock_repo.get_user_by_email.return_value = user_dict
+        assert AuthService().login("test@example.com", "secret") is not None
+        assert AuthService().login("test@example.com", "wrong") is None
+
+    mock_repo.update_user.assert_called_once()
+    upgraded = mock_repo.update_user.call_args[0][1]["password"]
+    assert hash_rounds(upgraded) == 5
+    assert hasher.verify("secret", upgraded)
+
+def test_calibrated_cost_stays_in_bounds():
+    hasher = PasswordHasher(threads=1)
+    assert hasher.calibrate(target_ms=0) == passwords.DEFAULT_ROUNDS
+    assert hasher.calibrate(target_ms=0, floor=14) == 14
+    with patch.object(passwords, "hashpw"), patch.object(passwords.time, "perf_counter", side_effect=[0.0, 0.01]):
+        # 10ms at MIN_ROUNDS: 80ms fits three more doublings
+        assert hasher.calibrate(target_ms=80) == passwords.MIN_ROUNDS + 3
+
+def test_only_bcrypt_runs_on_the_pool():
+    hasher = PasswordHasher(threads=2, rounds=4)
+    threads = []
+    hashpw = passwords.hashpw
+
+    def record(*args):
+        threads.append(threading.current_thread().name)
+        return hashpw(*args)
+
+    with patch.object(passwords, "hashpw", record):
+        hashed = hasher.hash("pw")
+    hasher.shutdown()
+
+    assert threads[0].startswith("bcrypt") and not threading.current_thread().name.startswith("bcrypt")
+    assert hasher.verify("pw", hashed) and not hasher.verify("pw", "not-a-hash")
+    assert passwords.highest_rounds([hashed, "not-a-hash"]) == 4
@@ -0,0 +1,157 @@
+import json
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from backend.app.services import email_service
+from backend.app.services.email_service import EmailService, EmailOutboxWorkers
+from backend.app.repositories.email_outbox_repo import EmailOutboxRepo
+from backend.app.utils.http_client import CircuitBreaker, CircuitOpenError
+
+class FakeSendGrid(BaseHTTPRequestHandler):
+    received = []
+    fail_next = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if FakeSendGrid.fail_next:
+            FakeSendGrid.fail_next -= 1
+            self.send_response(503)
+        else:
+            FakeSendGrid.received.append(body)
+            self.send_response(202)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def sendgrid(monkeypatch):
+    FakeSendGrid.received = []
+    FakeSendGrid.fail_next = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeSendGrid)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    monkeypatch.setattr(email_service, "SENDGRID_URL", f"http://127.0.0.1:{server.server_port}/v3/mail/send")
+    yield FakeSendGrid
+    server.shutdown()
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    monkeypatch.setattr("backend.app.repositories.email_outbox_repo.DATA_PATH", tmp_path / "email_outbox.json")
+    monkeypatch.setattr("backend.app.repositories.email_outbox_repo.DEAD_LETTER_PATH", tmp_path / "email_dead_letters.json")
+    monkeypatch.setattr(email_service, "EMAIL_BACKOFF_BASE", 0)
+    workers = EmailOutboxWorkers()
+    monkeypatch.setattr(email_service, "outbox_workers", workers)
+    monkeypatch.setattr(email_service.sendgrid, "breaker", CircuitBreaker("sendgrid", failure_threshold=5, reset_timeout=30))
+    return workers
+
+def test_enqueue_only_stores_the_email(outbox, sendgrid):
+    EmailService.enqueue_email("a@test.com", "Receipt", "<p>hi</p>")
+
+    assert sendgrid.received == []
+    assert EmailOutboxRepo.stats()["pending"] == 1
+
+def test_claiming_a_batch_only_appends_to_the_journal(outbox, tmp_path):
+    for n in range(3):
+        EmailService.enqueue_email(f"{n}@test.com", f"Receipt {n}", "<p>hi</p>")
+
+    claimed = EmailOutboxRepo.claim_due(limit=2, lease_seconds=30)
+
+    assert [m["subject"] for m in claimed] == ["Receipt 0", "Receipt 1"]
+    assert not (tmp_path / "email_outbox.json").exists()
+    lines = (tmp_path / "email_outbox.journal").read_text().splitlines()
+    assert [json.loads(line)["op"] for line in lines] == ["add", "add", "add", "update", "update"]
+    assert EmailOutboxRepo.stats()["sending"] == 2
+
+def test_worker_delivers_and_removes(outbox, sendgrid):
+    EmailService.enqueue_email("a@test.com", "Receipt", "<p>hi</p>")
+
+    assert outbox.process_once() == 1
+    assert sendgrid.received[0]["personalizations"][0]["to"] == [{"email": "a@test.com"}]
+    assert sendgrid.received[0]["subject"] == "Receipt"
+    assert EmailOutboxRepo.stats()["pending"] == 0
+
+def test_failures_back_off_then_dead_letter(outbox, sendgrid, monkeypatch):
+    monkeypatch.setattr(email_service, "EMAIL_MAX_ATTEMPTS", 3)
+    sendgrid.fail_next = 1
+    EmailService.enqueue_email("a@test.com", "Retry me", "<p>hi</p>")
+
+    outbox.process_once()
+    assert EmailOutboxRepo.stats()["retrying"] == 1
+    outbox.process_once()
+    assert [m["subject"] for m in sendgrid.received] == ["Retry me"]
+
+    sendgrid.fail_next = 3
+    EmailService.enqueue_email("b@test.com", "Give up", "<p>hi</p>")
+    for _ in range(3):
+        outbox.process_once()
+
+    stats = EmailOutboxRepo.stats()
+    assert stats["pending"] == 0 and stats["dead_letters"] == 1
+    dead = EmailOutboxRepo.load_dead_letters()[0]
+    assert dead["subject"] == "Give up" and dead["attempts"] == 3 and "503" in dead["last_error"]
+
+def test_backoff_grows_exponentially_and_is_capped(monkeypatch):
+    monkeypatch.setattr(email_service, "EMAIL_BACKOFF_BASE", 2)
+    monkeypatch.setattr(email_service, "EMAIL_BACKOFF_MAX", 10)
+    assert [EmailService.backoff(n) for n in (1, 2, 3, 4)] == [2, 4, 8, 10]
+
+def test_background_workers_drain_the_outbox(outbox, sendgrid):
+    outbox.start(2)
+    try:
+        EmailService.enqueue_email("a@test.com", "One", "<p>1</p>")
+        EmailService.enqueue_email("b@test.com", "Two", "<p>2</p>")
+        for _ in range(100):
+            if len(sendgrid.received) == 2:
+                break
+            threading.Event().wait(0.05)
+    finally:
+        outbox.stop()
+
+    assert sorted(m["subject"] for m in sendgrid.received) == ["One", "Two"]
+
+def test_breaker_opens_after_threshold_then_lets_one_trial_through():
+    now = [0.0]
+    breaker = CircuitBreaker("dep", failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    def down():
+        raise ConnectionError("down")
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(down)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError) as e:
+        breaker.call(lambda: "never called")
+    assert e.value.status_code == 503 and e.value.headers["Retry-After"] == "10"
+
+    now[0] = 10
+    assert breaker.state == "half_open"
+    breaker.before()
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 20
+    assert breaker.call(lambda: "up") == "up"
+    assert breaker.state == "closed"
+
+def test_breaker_ignores_errors_that_are_not_outages():
+    breaker = CircuitBreaker("dep", failure_threshold=1)
+    with pytest.raises(ValueError):
+        breaker.call(int, "x", failures=(ConnectionError,))
+    assert breaker.state == "closed"
+
+def test_open_breaker_fails_fast_and_keeps_attempts(outbox, sendgrid, monkeypatch):
+    monkeypatch.setattr(email_service.sendgrid, "breaker", CircuitBreaker("sendgrid", failure_threshold=2, reset_timeout=30))
+    sendgrid.fail_next = 2
+    EmailService.enqueue_email("a@test.com", "First", "<p>1</p>")
+    EmailService.enqueue_email("b@test.com", "Second", "<p>2</p>")
+    outbox.process_once()
+    assert email_service.sendgrid.breaker.state == "open"
+
+    EmailService.enqueue_email("c@test.com", "Third", "<p>3</p>")
+    outbox.process_once()
+
+    assert sendgrid.received == [] and sendgrid.fail_next == 0
+    third = next(m for m in EmailOutboxRepo._collection().all() if m["subject"] == "Third")
+    assert third["attempts"] == 0 and "unavailable" in third["last_error"]
@@ -100,8 +100,7 @@ def test_create_item_id_collision():
 
 def test_get_item_by_id_success():
     with patch("backend.app.services.items_service.ProductsRepo") as mock_repo:
-        mock_repo.product_exists.return_value = True
-        mock_repo.load_all.return_value = [{
+        mock_repo.get_products.return_value = {
             "product_id": "123",
             "product_name": "Laptop",
             "category": "Electronics",
@@ -119,14 +118,14 @@ def test_get_item_by_id_success():
             "img_link": "i",
             "product_link": "l",
             "quantity": 8
-        }]
+        }
 
         item = ItemsService.get_item_by_id("123")
         assert item.product_id == "123"
 
 def test_get_item_by_id_not_found():
     with patch("backend.app.services.items_service.ProductsRepo") as mock_repo:
-        mock_repo.product_exists.return_value = False
+        mock_repo.get_products.return_value = None
 
         with pytest.raises(HTTPException):
             ItemsService.get_item_by_id("BAD")
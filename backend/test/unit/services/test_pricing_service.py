@@ -0,0 +1,36 @@
+import pytest
+from fastapi import HTTPException
+from backend.app.services.pricing_service import PricedCart, TAX_RATE, parse_price
+
+PRODUCTS = {
+    "p1": {"product_id": "p1", "product_name": "Mouse", "discounted_price": "$1,010.50", "actual_price": "$2,000", "quantity": 5},
+    "p2": {"product_id": "p2", "product_name": "Keyboard", "discounted_price": "30", "actual_price": "50", "quantity": 1}
+}
+
+def test_parse_price_handles_thousands_separator():
+    assert parse_price("$1,010.50") == 1010.5
+
+def test_priced_cart_totals():
+    priced = PricedCart(1, [{"product_id": "p1", "quantity": 2}, {"product_id": "p2", "quantity": 1}], PRODUCTS, "USD")
+
+    assert [line["subtotal"] for line in priced.lines] == [2021.0, 30.0]
+    assert priced.subtotal == 2051.0
+    assert priced.tax == round(2051.0 * TAX_RATE, 2)
+    assert priced.total == round(priced.subtotal + priced.tax, 2)
+    assert priced.summary()["currency"] == "usd"
+
+def test_missing_products_are_left_out_of_summary_but_block_orders():
+    priced = PricedCart(1, [{"product_id": "p1", "quantity": 1}, {"product_id": "gone", "quantity": 1}], PRODUCTS)
+
+    assert [line["product_id"] for line in priced.summary()["items"]] == ["p1"]
+    with pytest.raises(ValueError):
+        priced.order()
+    with pytest.raises(HTTPException):
+        priced.check_stock()
+
+def test_check_stock_uses_resolved_products():
+    PricedCart(1, [{"product_id": "p1", "quantity": 5}], PRODUCTS).check_stock()
+
+    with pytest.raises(HTTPException) as e:
+        PricedCart(1, [{"product_id": "p2", "quantity": 2}], PRODUCTS).check_stock()
+    assert "Only 1 left" in e.value.detail
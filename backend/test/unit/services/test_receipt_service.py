@@ -0,0 +1,71 @@
+import time
+import pytest
+from concurrent.futures import Future
+from unittest.mock import patch, MagicMock
+from backend.app.services import receipt_service
+from backend.app.services.receipt_service import ReceiptService
+from backend.app.services.pricing_service import PricedCart
+
+@pytest.fixture(autouse=True)
+def empty_image_cache():
+    receipt_service.image_cache.clear()
+    yield
+    receipt_service.image_cache.clear()
+
+def slow_head(delay, status=200):
+    def head(url, **kwargs):
+        time.sleep(delay)
+        return MagicMock(status_code=404 if "missing" in url else status)
+    return head
+
+def test_check_images_runs_concurrently_and_caches():
+    urls = [f"http://img.test/{i}.jpg" for i in range(10)] + ["http://img.test/missing.jpg"]
+
+    with patch("backend.app.services.receipt_service.image_cdn.head", side_effect=slow_head(0.2)) as mock_head:
+        start = time.perf_counter()
+        results = ReceiptService.check_images(urls)
+        assert time.perf_counter() - start < 1.0
+        assert mock_head.call_count == 11
+
+        assert results["http://img.test/3.jpg"] is True
+        assert results["http://img.test/missing.jpg"] is False
+
+        ReceiptService.check_images(urls)
+        assert mock_head.call_count == 11
+
+def test_check_images_gives_up_after_timeout(monkeypatch):
+    monkeypatch.setattr(receipt_service, "IMAGE_CHECK_TIMEOUT", 0.1)
+
+    with patch("backend.app.services.receipt_service.image_cdn.head", side_effect=slow_head(1.0)):
+        start = time.perf_counter()
+        assert ReceiptService.check_images(["http://img.test/slow.jpg"]) == {"http://img.test/slow.jpg": False}
+        assert time.perf_counter() - start < 0.9
+
+def test_finished_check_only_forgets_its_own_in_flight_entry():
+    url = "http://img.test/race.jpg"
+    old, new = Future(), Future()
+    receipt_service._in_flight[url] = new
+    receipt_service._forget_in_flight(url, old)
+    assert receipt_service._in_flight[url] is new
+    receipt_service._forget_in_flight(url, new)
+    assert url not in receipt_service._in_flight
+
+    # a check that is already done when its callback is added must not block on the lock
+    done = Future()
+    done.set_result(True)
+    with patch.object(receipt_service._image_pool, "submit", return_value=done):
+        assert ReceiptService._check_in_background(url) is done
+    assert url not in receipt_service._in_flight
+
+def test_build_order_marks_unreachable_images():
+    products = {
+        "p1": {"product_id": "p1", "product_name": "Mouse", "discounted_price": "10", "img_link": "http://img.test/p1.jpg"},
+        "p2": {"product_id": "p2", "product_name": "Pad", "discounted_price": "5", "img_link": "http://img.test/missing.jpg"}
+    }
+    priced = PricedCart(1, [{"product_id": "p1", "quantity": 1}, {"product_id": "p2", "quantity": 2}], products)
+
+    with patch("backend.app.services.receipt_service.image_cdn.head", side_effect=slow_head(0)):
+        order = ReceiptService.build_order(1, priced)
+
+    assert [item["image"] for item in order["items"]] == ["http://img.test/p1.jpg", None]
+    assert order["total"] == priced.total
@@ -0,0 +1,127 @@
+import multiprocessing
+import threading
+import pytest
+from unittest.mock import patch
+from fastapi import HTTPException
+from backend.app.services.reservation_service import ReservationTable
+from backend.app.services.pricing_service import PricedCart
+from backend.app.services.transactions_service import TransactionsService
+
+PRODUCTS = {"p1": {"product_id": "p1", "product_name": "Mouse", "discounted_price": "10", "quantity": 3}}
+
+@pytest.fixture(autouse=True)
+def reservations_file(tmp_path, monkeypatch):
+    monkeypatch.setattr("backend.app.repositories.reservations_repo.DATA_PATH", tmp_path / "stock_reservations.json")
+
+def cart(quantity):
+    return PricedCart(1, [{"product_id": "p1", "quantity": quantity}], PRODUCTS)
+
+def _buy(key, won):
+    try:
+        ReservationTable().reserve(key, {"p1": 1}, cart(1).check_stock)
+        won.put(key)
+    except HTTPException:
+        pass
+
+def test_holds_count_against_stock():
+    table = ReservationTable()
+    table.reserve("t1", {"p1": 2}, cart(2).check_stock)
+
+    with pytest.raises(HTTPException) as e:
+        table.reserve("t2", {"p1": 2}, cart(2).check_stock)
+    assert e.value.status_code == 400 and "Only 1 left" in e.value.detail
+
+    table.reserve("t2", {"p1": 1}, cart(1).check_stock)
+    assert table.held("p1") == 3
+
+def test_confirm_and_release_drop_the_hold():
+    table = ReservationTable()
+    table.reserve("t1", {"p1": 2}, cart(2).check_stock)
+    table.reserve("t2", {"p1": 1}, cart(1).check_stock)
+
+    assert table.confirm("t1") is True
+    assert table.release("t2") is True
+    assert table.release("t2") is False
+    assert table.held("p1") == 0
+    assert table.stats() == {"reservations": 0, "products_held": 0, "units_held": 0}
+
+def test_expired_holds_are_swept():
+    now = [0.0]
+    table = ReservationTable(clock=lambda: now[0])
+    table.reserve("t1", {"p1": 3}, cart(3).check_stock, ttl=10)
+    table.reserve("t2", {"p1": 0}, lambda held: None, ttl=30)
+
+    now[0] = 9.9
+    assert table.held("p1") == 3
+    now[0] = 10
+    assert table.held("p1") == 0
+    assert table.stats()["reservations"] == 1
+    table.reserve("t3", {"p1": 3}, cart(3).check_stock)
+
+def test_concurrent_buyers_never_oversell():
+    table = ReservationTable()
+    won = []
+
+    def buy(i):
+        try:
+            table.reserve(f"t{i}", {"p1": 1}, cart(1).check_stock)
+            won.append(i)
+        except HTTPException:
+            pass
+
+    threads = [threading.Thread(target=buy, args=(i,)) for i in range(50)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(won) == 3
+    assert table.held("p1") == 3
+
+def test_workers_share_holds_and_release_each_others():
+    context = multiprocessing.get_context("fork")
+    won = context.Queue()
+    buyers = [context.Process(target=_buy, args=(f"t{i}", won)) for i in range(8)]
+    for p in buyers:
+        p.start()
+    for p in buyers:
+        p.join()
+
+    winners = sorted(won.get(timeout=5) for _ in range(3))
+    table = ReservationTable()
+    assert table.held("p1") == 3
+
+    # the order is finalized by a worker other than the one holding the stock
+    finalizer = context.Process(target=table.confirm, args=(winners[0],))
+    finalizer.start()
+    finalizer.join()
+    assert table.held("p1") == 2
+    assert table.stats()["reservations"] == 2
+
+def test_failed_payment_intent_releases_its_hold():
+    table = ReservationTable()
+    with patch("backend.app.services.transactions_service.reservations", table), \
+         patch.object(TransactionsService, "price_cart", return_value=cart(3)), \
+         patch("backend.app.services.transactions_service.ProductsRepo.get_many", return_value=PRODUCTS), \
+         patch("backend.app.services.transactions_service.TransactionsRepo") as repo, \
+         patch("backend.app.services.transactions_service.stripe_call", side_effect=RuntimeError("stripe down")):
+        with pytest.raises(RuntimeError):
+            TransactionsService.create_payment_intent(1)
+
+    assert table.held("p1") == 0
+    assert repo.update_transaction.call_args[0][1] == {"status": "failed"}
+
+def test_payment_intent_checks_stock_read_under_the_lock():
+    table = ReservationTable()
+    # priced while 3 were left; another order has since taken 2
+    current = {"p1": dict(PRODUCTS["p1"], quantity=1)}
+    with patch("backend.app.services.transactions_service.reservations", table), \
+         patch.object(TransactionsService, "price_cart", return_value=cart(2)), \
+         patch("backend.app.services.transactions_service.ProductsRepo.get_many", return_value=current), \
+         patch("backend.app.services.transactions_service.TransactionsRepo") as repo:
+        with pytest.raises(HTTPException) as e:
+            TransactionsService.create_payment_intent(1)
+
+    assert "Only 1 left" in e.value.detail
+    assert table.held("p1") == 0
+    repo.add_transaction.assert_not_called()
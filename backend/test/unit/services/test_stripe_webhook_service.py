@@ -0,0 +1,122 @@
+import json
+import pytest
+from unittest.mock import patch
+from backend.app.services import stripe_webhook_service
+from backend.app.services.stripe_webhook_service import StripeWebhookService, StripeEventWorkers
+from backend.app.repositories.stripe_events_repo import StripeEventsRepo
+from backend.app.repositories.transactions_repo import TransactionsRepo
+
+def succeeded(event_id, intent_id="pi_1", transaction_id="t1"):
+    return {
+        "id": event_id,
+        "type": "payment_intent.succeeded",
+        "data": {"object": {"id": intent_id, "amount": 2240, "metadata": {"transaction_id": transaction_id}}}
+    }
+
+@pytest.fixture
+def workers(tmp_path, monkeypatch):
+    monkeypatch.setattr("backend.app.repositories.stripe_events_repo.DATA_PATH", tmp_path / "stripe_events.json")
+    transactions = tmp_path / "transactions.json"
+    transactions.write_text(json.dumps([{
+        "transaction_id": "t1", "user_id": 1, "status": "pending", "payment_intent_id": "pi_1",
+        "items": [{"product_id": "p1", "quantity": 2, "subtotal": 20.0}]
+    }]))
+    monkeypatch.setattr("backend.app.repositories.transactions_repo.DATA_PATH", transactions)
+    monkeypatch.setattr(stripe_webhook_service, "STRIPE_EVENT_BACKOFF_MAX", 0)
+    workers = StripeEventWorkers()
+    monkeypatch.setattr(stripe_webhook_service, "stripe_event_workers", workers)
+    return workers
+
+@pytest.fixture
+def side_effects():
+    with patch("backend.app.services.transactions_service.ProductsRepo") as products, \
+         patch("backend.app.services.transactions_service.CartRepo") as carts, \
+         patch("backend.app.services.transactions_service.EmailService") as email, \
+         patch("backend.app.services.transactions_service.ReceiptService"):
+        yield products, carts, email
+
+def test_ingest_only_records_and_dedupes_by_event_id(workers, side_effects):
+    products, _, _ = side_effects
+
+    assert StripeWebhookService.ingest(succeeded("evt_1")) is True
+    assert StripeWebhookService.ingest(succeeded("evt_1")) is False
+
+    assert StripeEventsRepo.stats()["pending"] == 1
+    products.adjust_stock.assert_not_called()
+    assert TransactionsRepo.get_transaction_by_id("t1")["status"] == "pending"
+
+def test_worker_fulfils_once_across_redeliveries(workers, side_effects):
+    products, carts, email = side_effects
+    StripeWebhookService.ingest(succeeded("evt_1"))
+    StripeWebhookService.ingest(succeeded("evt_1"))
+    # a different event for the same payment, e.g. the manual confirm path already ran
+    StripeWebhookService.ingest(succeeded("evt_2"))
+
+    assert workers.process_once() == 2
+
+    products.adjust_stock.assert_called_once_with({"p1": -2})
+    carts.clear_cart.assert_called_once_with(1)
+    email.enqueue_email.assert_called_once()
+    assert TransactionsRepo.get_transaction_by_id("t1")["status"] == "completed"
+    assert StripeEventsRepo.stats()["processed"] == 2
+
+def test_failed_events_are_retried_then_marked_failed(workers, side_effects, monkeypatch):
+    products, _, _ = side_effects
+    monkeypatch.setattr(stripe_webhook_service, "STRIPE_EVENT_MAX_ATTEMPTS", 2)
+    products.adjust_stock.side_effect = OSError("disk full")
+    StripeWebhookService.ingest(succeeded("evt_1"))
+
+    workers.process_once()
+    assert StripeEventsRepo.get("evt_1")["attempts"] == 1
+    assert TransactionsRepo.get_transaction_by_id("t1")["status"] == "pending"
+
+    workers.process_once()
+    stored = StripeEventsRepo.get("evt_1")
+    assert stored["status"] == "failed" and "disk full" in stored["last_error"]
+
+def test_prune_keeps_recent_and_unprocessed_events(workers, side_effects):
+    StripeWebhookService.ingest(succeeded("evt_1"))
+    StripeWebhookService.ingest(succeeded("evt_2", intent_id="pi_2", transaction_id="t2"))
+    StripeEventsRepo.mark_processed("evt_1")
+
+    assert StripeEventsRepo.prune(older_than=0) == 0
+    assert StripeEventsRepo.prune(older_than=float("inf")) == 1
+    assert StripeEventsRepo.get("evt_1") is None and StripeEventsRepo.get("evt_2") is not None
+
+def test_inbox_only_appends_and_forgets_processed_payloads(workers, side_effects, tmp_path):
+    StripeWebhookService.ingest(succeeded("evt_1"))
+    StripeWebhookService.ingest(succeeded("evt_1"))
+    workers.process_once()
+    StripeEventsRepo.prune(older_than=float("inf"))
+
+    assert not (tmp_path / "stripe_events.json").exists()
+    lines = (tmp_path / "stripe_events.journal").read_text().splitlines()
+    assert [json.loads(line)["op"] for line in lines] == ["add", "update", "update", "delete"]
+    assert json.loads(lines[2])["updates"]["event"] is None
+
+def test_event_waits_for_a_live_fulfilment_claim_and_takes_over_a_stale_one(workers, side_effects, monkeypatch):
+    products, _, _ = side_effects
+    TransactionsRepo.claim_for_fulfillment("t1")
+    StripeWebhookService.ingest(succeeded("evt_1"))
+
+    workers.process_once()
+    assert StripeEventsRepo.get("evt_1")["status"] == "pending"
+    products.adjust_stock.assert_not_called()
+
+    # the worker holding the claim died
+    TransactionsRepo.update_transaction("t1", {"fulfilling_since": 0})
+    workers.process_once()
+    assert TransactionsRepo.get_transaction_by_id("t1")["status"] == "completed"
+    products.adjust_stock.assert_called_once_with({"p1": -2})
+
+def test_retried_event_does_not_take_stock_twice(workers, side_effects):
+    products, carts, _ = side_effects
+    carts.clear_cart.side_effect = [OSError("disk full"), None]
+    StripeWebhookService.ingest(succeeded("evt_1"))
+
+    workers.process_once()
+    assert TransactionsRepo.get_transaction_by_id("t1")["status"] == "pending"
+
+    workers.process_once()
+    assert TransactionsRepo.get_transaction_by_id("t1")["status"] == "completed"
+    products.adjust_stock.assert_called_once_with({"p1": -2})
@@ -0,0 +1,127 @@
+import json
+import threading
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from backend.app.repositories import subscriptions_repo, transactions_repo
+from backend.app.repositories.subscriptions_repo import SubscriptionsRepo
+from backend.app.repositories.transactions_repo import TransactionsRepo
+from backend.app.services import subscriptions_service
+from backend.app.services.subscriptions_service import RenewalScheduler, process_subscriptions
+
+START = datetime(2024, 1, 1, 12, 0)
+PRODUCTS = {
+    "p1": {"product_id": "p1", "product_name": "Coffee", "discounted_price": "$12.50", "actual_price": "$15.00"},
+}
+
+def subscription(sid, due_in_days, product_id="p1", active=True):
+    return {
+        "id": sid, "user_id": "7", "product_id": product_id, "interval_days": 30,
+        "next_renewal": (START + timedelta(days=due_in_days)).isoformat(), "active": active
+    }
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(subscriptions_repo, "DATA_PATH", tmp_path / "subscriptions.json")
+    monkeypatch.setattr(transactions_repo, "DATA_PATH", tmp_path / "transactions.json")
+    with patch.object(subscriptions_service.ProductsRepo, "get_many",
+                      side_effect=lambda ids: {i: PRODUCTS[i] for i in ids if i in PRODUCTS}):
+        yield tmp_path
+
+class Clock:
+    def __init__(self):
+        self.now = START
+
+    def __call__(self):
+        return self.now
+
+def test_active_subscriptions_use_the_active_flag(store):
+    SubscriptionsRepo.save_subscriptions([subscription(1, -1), subscription(2, -1, active=False), subscription(3, 1)])
+    assert [s["id"] for s in SubscriptionsRepo.get_active_subscriptions(START)] == [1]
+
+def test_scheduler_renews_only_due_subscriptions_in_one_append(store):
+    SubscriptionsRepo.save_subscriptions([
+        subscription(1, -2), subscription(2, -1), subscription(3, 5), subscription(4, -1, active=False)
+    ])
+    clock = Clock()
+    scheduler = RenewalScheduler(clock=clock)
+
+    assert scheduler.process_due() == 2
+    transactions = TransactionsRepo.load_transactions()
+    assert [(t["subscription_id"], t["amount"], t["status"]) for t in transactions] == [(1, 12.5, "pending"), (2, 12.5, "pending")]
+    assert len((store / "transactions.journal").read_text().splitlines()) == 2
+
+    renewals = {s["id"]: s["next_renewal"] for s in SubscriptionsRepo.load_subscriptions()}
+    assert renewals[1] == renewals[2] == (START + timedelta(days=30)).isoformat()
+    assert scheduler.process_due() == 0
+
+    stats = scheduler.stats()
+    assert stats["scheduled"] == 3
+    assert stats["next_renewal"] == (START + timedelta(days=5)).isoformat()
+    assert stats["last_lag_seconds"] == stats["max_lag_seconds"] == 2 * 86400
+
+    clock.now = START + timedelta(days=5, seconds=30)
+    assert scheduler.stats()["lag_seconds"] == 30
+    assert scheduler.process_due() == 1
+
+def test_batches_are_bounded(store):
+    SubscriptionsRepo.save_subscriptions([subscription(i, -1) for i in range(1, 6)])
+    scheduler = RenewalScheduler(clock=Clock(), batch_size=2)
+
+    assert [scheduler.process_due() for _ in range(4)] == [2, 2, 1, 0]
+    assert len(TransactionsRepo.load_transactions()) == 5
+
+def test_missing_product_is_skipped_but_rescheduled(store):
+    SubscriptionsRepo.save_subscriptions([subscription(1, -1, product_id="gone")])
+
+    assert RenewalScheduler(clock=Clock()).process_due() == 1
+    assert TransactionsRepo.load_transactions() == []
+    assert SubscriptionsRepo.load_subscriptions()[0]["next_renewal"] == (START + timedelta(days=30)).isoformat()
+
+def test_two_schedulers_charge_each_renewal_once(store):
+    SubscriptionsRepo.save_subscriptions([subscription(1, -1), subscription(2, -1)])
+    first, second = RenewalScheduler(clock=Clock()), RenewalScheduler(clock=Clock())
+    first.load()
+    second.load()
+
+    assert first.process_due() == 2
+    assert second.process_due() == 0
+    assert len(TransactionsRepo.load_transactions()) == 2
+    assert second.stats()["next_renewal"] == (START + timedelta(days=30)).isoformat()
+
+def test_new_subscription_from_another_worker_is_picked_up(store):
+    SubscriptionsRepo.save_subscriptions([subscription(1, 10)])
+    clock = Clock()
+    scheduler = RenewalScheduler(clock=clock)
+    assert scheduler.process_due() == 0
+
+    subs = SubscriptionsRepo.load_subscriptions() + [subscription(2, -1)]
+    SubscriptionsRepo.save_subscriptions(subs)
+    assert scheduler.process_due() == 1
+    assert scheduler.stats()["scheduled"] == 2
+
+def test_process_subscriptions_renews_everything_due(store):
+    SubscriptionsRepo.save_subscriptions([subscription(i, -1) for i in range(1, 4)] + [subscription(4, 3)])
+    with patch.object(subscriptions_service, "RENEWAL_BATCH_SIZE", 2):
+        assert process_subscriptions(START) == 3
+    assert len(json.loads((store / "subscriptions.json").read_text())) == 4
+    assert len(TransactionsRepo.load_transactions()) == 3
+
+def test_thread_wakes_when_a_renewal_falls_due(store):
+    SubscriptionsRepo.save_subscriptions([])
+    scheduler = RenewalScheduler(resync_interval=60)
+    scheduler.start()
+    try:
+        sub = SubscriptionsRepo._collection().insert({
+            "id": 1, "user_id": "7", "product_id": "p1", "interval_days": 30,
+            "next_renewal": (datetime.now() + timedelta(seconds=0.2)).isoformat(), "active": True
+        })
+        scheduler.schedule(sub)
+        deadline = datetime.now() + timedelta(seconds=5)
+        while scheduler.stats()["renewed"] == 0 and datetime.now() < deadline:
+            threading.Event().wait(0.05)
+    finally:
+        scheduler.stop()
+
+    assert scheduler.stats()["renewed"] == 1
+    assert scheduler.stats()["last_lag_seconds"] < 5
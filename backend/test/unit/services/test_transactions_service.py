@@ -3,7 +3,8 @@ from unittest.mock import patch
 from backend.app.services.transactions_service import (
     TransactionsService,
     parse_price,
-    TAX_RATE
+    TAX_RATE,
+    stock_deltas
 )
 
 def test_parse_price_valid():
@@ -52,10 +53,11 @@ def test_get_cart_summary_basic():
 
         mock_cart.get_cart.return_value = cart
         mock_cart.cart_exists.return_value = True
-        mock_prod.get_products.side_effect = lambda pid: product_p1 if pid == "p1" else product_p2
+        mock_prod.get_many.return_value = {"p1": product_p1, "p2": product_p2}
 
         summary = TransactionsService.get_cart_summary(1)
 
+        mock_prod.get_many.assert_called_once_with(["p1", "p2"])
         assert summary["subtotal"] == 50.0
         assert summary["tax"] == round(50.0 * TAX_RATE, 2)
         assert summary["total"] == round(50.0 * (1 + TAX_RATE), 2)
@@ -92,7 +94,7 @@ def test_get_cart_summary_skips_missing_products():
 
         mock_cart.get_cart.return_value = cart
         mock_cart.cart_exists.return_value = True
-        mock_prod.get_products.side_effect = lambda pid: product_p1 if pid == "p1" else None
+        mock_prod.get_many.return_value = {"p1": product_p1}
 
         summary = TransactionsService.get_cart_summary(42)
 
@@ -105,7 +107,7 @@ def test_get_cart_summary_empty_cart():
 
         mock_cart.get_cart.return_value = {"items": []}
         mock_cart.cart_exists.return_value = True
-        mock_prod.get_products.return_value = None
+        mock_prod.get_many.return_value = {}
 
         summary = TransactionsService.get_cart_summary(7)
 
@@ -138,3 +140,12 @@ def test_checkout_success():
         assert receipt["products"] == mock_summary["items"]
         assert receipt["status"] == "completed"
         assert "date" in receipt
+
+def test_stock_deltas_sums_lines_of_the_same_product():
+    items = [
+        {"product_id": "p1", "quantity": 2},
+        {"product_id": "p2", "quantity": 1},
+        {"product_id": "p1", "quantity": 3}
+    ]
+    assert stock_deltas(items, -1) == {"p1": -5, "p2": -1}
+    assert stock_deltas(items, 1) == {"p1": 5, "p2": 1}